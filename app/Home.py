@@ -9,6 +9,12 @@ Course: MIS5460 Advanced Business Analytics, Fall 2025
 
 import streamlit as st
 from pathlib import Path
+import sys
+
+# Add app directory to path for imports
+sys.path.append(str(Path(__file__).parent))
+
+from utils.preload import start_city_preload, WARM, WARMING, FAILED
 
 # Page configuration
 st.set_page_config(
@@ -18,6 +24,32 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Warm every city's models, vibe tables and k-NN index in the background
+# so the first click on a city page doesn't pay the cold-load cost
+preloader = start_city_preload()
+
+def render_preload_status():
+    """Show the warm/cold state of each city's models"""
+    status = preloader.status()
+    for column, city in zip(st.columns(3), ['london', 'austin', 'nyc']):
+        city_status = status[city]
+        with column:
+            if city_status['state'] == WARM:
+                st.caption(f"🟢 Models warm (loaded in {city_status['seconds']:.1f}s)")
+            elif city_status['state'] == WARMING:
+                st.caption("🟡 Warming up models...")
+            elif city_status['state'] == FAILED:
+                st.caption(f"🔴 Warm-up failed: {', '.join(city_status['errors'])} (loads on first use)")
+            else:
+                st.caption("⚪ Models cold")
+
+@st.fragment(run_every=1)
+def render_preload_status_live():
+    """Poll the warm-up status until every city is done, then redraw statically"""
+    if preloader.is_done():
+        st.rerun()
+    render_preload_status()
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -167,6 +199,12 @@ with col3:
     if st.button("🗺️ View NYC Vibe Map", use_container_width=True):
         st.switch_page("pages/4_🗺️_Vibe_Maps.py")
 
+# Model warm-up status per city
+if preloader.is_done():
+    render_preload_status()
+else:
+    render_preload_status_live()
+
 st.markdown("---")
 
 # About Section
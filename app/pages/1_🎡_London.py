@@ -17,20 +17,19 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import json
 from pathlib import Path
 import sys
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.model_loader import get_neighborhoods, get_vibe_for_neighborhood, get_average_price
+from utils.model_loader import get_neighborhoods, get_vibe_for_neighborhood, get_average_price, get_training_data_memory, get_city_pool_stats
 from utils.predictor import (
-    get_knn_price_recommendation,
-    generate_revenue_curve,
-    get_optimization_summary,
-    predict_occupancy
+    analyze_property,
+    predict_occupancy,
+    lookup_price_tester_occupancy
 )
+from utils.latency import start_trace, finish_trace, stage_timer, render_latency_sidebar
 
 # Page config
 st.set_page_config(
@@ -54,6 +53,12 @@ if 'knn_result' not in st.session_state:
     st.session_state.knn_result = {}
 if 'vibe_data' not in st.session_state:
     st.session_state.vibe_data = {}
+if 'price_tester_curve' not in st.session_state:
+    st.session_state.price_tester_curve = None
+if 'estimated_price' not in st.session_state:
+    st.session_state.estimated_price = None
+if 'latency_analysis' not in st.session_state:
+    st.session_state.latency_analysis = None
 
 # =============================================================================
 # CUSTOM CSS
@@ -112,17 +117,6 @@ st.title("🎡 London Property Pricing")
 st.markdown("**Data-driven price recommendations powered by 96,871 London listings**")
 st.markdown("---")
 
-# =============================================================================
-# PROPERTY INPUT FORM - NOW IN MAIN AREA (NOT SIDEBAR!)
-# =============================================================================
-st.markdown('<div class="property-section">', unsafe_allow_html=True)
-st.subheader("📝 Property Details")
-
-# Load data
-BASE_DIR = Path(__file__).parent.parent.parent
-with open(BASE_DIR / 'data/amenities_master_list.json', 'r') as f:
-    amenities_data = json.load(f)
-
 TOP_AMENITIES = [
     "Wifi", "Kitchen", "Washer", "Dryer", "Air conditioning", "Heating",
     "TV", "Iron", "Hair dryer", "Smoke alarm", "Carbon monoxide alarm",
@@ -137,121 +131,206 @@ TOP_AMENITIES = [
     "Smoking allowed", "Suitable for events", "Family/kid friendly"
 ]
 
-neighborhoods = get_neighborhoods('london')
+# =============================================================================
+# PROPERTY INPUT FORM - NOW IN MAIN AREA (NOT SIDEBAR!)
+# Fragment: editing inputs reruns only the form, not the results below
+# =============================================================================
+@st.fragment
+def render_property_form():
+    st.markdown('<div class="property-section">', unsafe_allow_html=True)
+    st.subheader("📝 Property Details")
 
-# Row 1: Basic property details (4 columns)
-col1, col2, col3, col4 = st.columns(4)
+    neighborhoods = get_neighborhoods('london')
 
-with col1:
-    property_type = st.selectbox(
-        "Property Type",
-        ["Entire home/apt", "Private room", "Shared room", "Hotel room"]
-    )
+    # Row 1: Basic property details (4 columns)
+    col1, col2, col3, col4 = st.columns(4)
 
-with col2:
-    neighbourhood = st.selectbox("Neighborhood", neighborhoods)
+    with col1:
+        property_type = st.selectbox(
+            "Property Type",
+            ["Entire home/apt", "Private room", "Shared room", "Hotel room"]
+        )
 
-with col3:
-    accommodates = st.number_input("Guests", min_value=1, max_value=16, value=2)
-    bedrooms = st.number_input("Bedrooms", min_value=0, max_value=10, value=1)
-
-with col4:
-    bathrooms = st.number_input("Bathrooms", min_value=0.0, max_value=10.0, value=1.0, step=0.5)
-    beds = st.number_input("Beds", min_value=0, max_value=20, value=1)
-
-# Row 2: Amenities (expandable)
-with st.expander("🏠 Amenities (click to expand)", expanded=False):
-    st.caption("All amenities are pre-selected by default. Remove any that don't apply to your property.")
-    selected_amenities = st.multiselect(
-        "Amenities",
-        TOP_AMENITIES,
-        default=TOP_AMENITIES,  # Pre-select all amenities
-        label_visibility="collapsed"
-    )
-    amenities_count = len(selected_amenities)
-    st.info(f"✓ {amenities_count} amenities selected")
+    with col2:
+        neighbourhood = st.selectbox("Neighborhood", neighborhoods)
 
-# Row 3: Price and analyze button
-col1, col2 = st.columns([2, 1])
+    with col3:
+        accommodates = st.number_input("Guests", min_value=1, max_value=16, value=2)
+        bedrooms = st.number_input("Bedrooms", min_value=0, max_value=10, value=1)
+
+    with col4:
+        bathrooms = st.number_input("Bathrooms", min_value=0.0, max_value=10.0, value=1.0, step=0.5)
+        beds = st.number_input("Beds", min_value=0, max_value=20, value=1)
+
+    # Row 2: Amenities (expandable)
+    with st.expander("🏠 Amenities (click to expand)", expanded=False):
+        st.caption("All amenities are pre-selected by default. Remove any that don't apply to your property.")
+        selected_amenities = st.multiselect(
+            "Amenities",
+            TOP_AMENITIES,
+            default=TOP_AMENITIES,  # Pre-select all amenities
+            label_visibility="collapsed"
+        )
+        amenities_count = len(selected_amenities)
+        st.info(f"✓ {amenities_count} amenities selected")
 
-with col1:
-    # Get average price for this property type and neighborhood
-    avg_price = get_average_price('london', neighbourhood=neighbourhood, property_type=property_type)
-    estimated_price = st.number_input(
-        "💷 Estimated Price (per night)",
-        min_value=10,
-        max_value=1000,
-        value=avg_price,
-        step=5,
-        help=f"Pre-filled with average (£{avg_price}) for {property_type} in {neighbourhood}"
-    )
+    # Row 3: Price and analyze button
+    col1, col2 = st.columns([2, 1])
 
-with col2:
-    st.write("")  # Spacing
-    st.write("")  # Spacing
-    calculate_button = st.button("🎯 Analyze Property", type="primary", use_container_width=True)
+    with col1:
+        # Get average price for this property type and neighborhood
+        avg_price = get_average_price('london', neighbourhood=neighbourhood, property_type=property_type)
+        estimated_price = st.number_input(
+            "💷 Estimated Price (per night)",
+            min_value=10,
+            max_value=1000,
+            value=avg_price,
+            step=5,
+            help=f"Pre-filled with average (£{avg_price}) for {property_type} in {neighbourhood}"
+        )
 
-st.markdown('</div>', unsafe_allow_html=True)
+    with col2:
+        st.write("")  # Spacing
+        st.write("")  # Spacing
+        calculate_button = st.button("🎯 Analyze Property", type="primary", use_container_width=True)
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # =========================================================================
+    # BUTTON HANDLER - SET SESSION STATE
+    # =========================================================================
+    if calculate_button:
+        start_trace('analyze', city='london')
+        with st.spinner("🔄 Analyzing property and market data..."):
+            # Get vibe data
+            vibe_data = get_vibe_for_neighborhood('london', neighbourhood)
+
+            if vibe_data is None:
+                st.error(f"No vibe data found for {neighbourhood}")
+                st.stop()
+
+            # Build property data dict
+            property_data = {
+                'property_type': property_type,
+                'room_type': property_type,
+                'neighbourhood': neighbourhood,
+                'accommodates': accommodates,
+                'bedrooms': bedrooms,
+                'bathrooms': bathrooms,
+                'beds': beds,
+                'amenities_count': amenities_count,
+                'minimum_nights': 1,
+                'maximum_nights': 30,
+                'vibe_score': vibe_data['vibe_score'],
+                'walkability_score': vibe_data['walkability_score'],
+                'safety_score': vibe_data['safety_score'],
+                'nightlife_score': vibe_data['nightlife_score'],
+                'quietness_score': vibe_data['quietness_score'],
+                'family_friendly_score': vibe_data['family_friendly_score'],
+                'local_authentic_score': vibe_data['local_authentic_score'],
+                'convenience_score': vibe_data['convenience_score'],
+                'food_scene_score': vibe_data['food_scene_score'],
+                'liveliness_score': vibe_data['liveliness_score'],
+                'charm_score': vibe_data['charm_score'],
+                'neighbourhood_encoded': 0,
+                'host_listings_count': 1,
+            }
+
+            # Run analyses (k-NN comps and XGBoost revenue curve in parallel)
+            analysis = analyze_property(
+                'london', property_data, estimated_price,
+                int(estimated_price * 0.5), int(estimated_price * 2.0),
+                n_points=200
+            )
+
+            # Store in session state
+            st.session_state.calculated = True
+            st.session_state.property_data = property_data
+            st.session_state.revenue_curve = analysis['revenue_curve']
+            st.session_state.optimization = analysis['optimization']
+            st.session_state.knn_result = analysis['knn_result']
+            st.session_state.vibe_data = vibe_data
+            st.session_state.price_tester_curve = analysis['price_tester_curve']
+            st.session_state.estimated_price = estimated_price
+
+        st.session_state.latency_analysis = finish_trace()
+        st.success("✅ Analysis complete!")
+        st.rerun()
+
+render_property_form()
 
 # =============================================================================
-# BUTTON HANDLER - SET SESSION STATE
+# INTERACTIVE PRICE TESTER - FRAGMENT (SLIDER - NOW PERSISTS!)
+# Moving the slider reruns only this panel, not the whole page
 # =============================================================================
-if calculate_button:
-    with st.spinner("🔄 Analyzing property and market data..."):
-        # Get vibe data
-        vibe_data = get_vibe_for_neighborhood('london', neighbourhood)
-        
-        if vibe_data is None:
-            st.error(f"No vibe data found for {neighbourhood}")
-            st.stop()
-        
-        # Build property data dict
-        property_data = {
-            'property_type': property_type,
-            'room_type': property_type,
-            'neighbourhood': neighbourhood,
-            'accommodates': accommodates,
-            'bedrooms': bedrooms,
-            'bathrooms': bathrooms,
-            'beds': beds,
-            'amenities_count': amenities_count,
-            'minimum_nights': 1,
-            'maximum_nights': 30,
-            'vibe_score': vibe_data['vibe_score'],
-            'walkability_score': vibe_data['walkability_score'],
-            'safety_score': vibe_data['safety_score'],
-            'nightlife_score': vibe_data['nightlife_score'],
-            'quietness_score': vibe_data['quietness_score'],
-            'family_friendly_score': vibe_data['family_friendly_score'],
-            'local_authentic_score': vibe_data['local_authentic_score'],
-            'convenience_score': vibe_data['convenience_score'],
-            'food_scene_score': vibe_data['food_scene_score'],
-            'liveliness_score': vibe_data['liveliness_score'],
-            'charm_score': vibe_data['charm_score'],
-            'neighbourhood_encoded': 0,
-            'host_listings_count': 1,
+@st.fragment
+def render_price_tester(property_data, optimization, estimated_price):
+    st.markdown("## 🎚️ Interactive Price Tester")
+    st.caption("Test different prices and see real-time predictions")
+
+    min_slider = int(estimated_price * 0.5)
+    max_slider = int(estimated_price * 2.0)
+
+    # SLIDER IS NOW OUTSIDE THE CALCULATE BUTTON BLOCK!
+    # Session state keeps it visible even after reruns
+    test_price = st.slider(
+        "Test Price (£/night)",
+        min_value=min_slider,
+        max_value=max_slider,
+        value=int(optimization['optimal_price']),
+        step=5,
+        key='price_slider'
+    )
+
+    # Real-time prediction at test price (precomputed curve, model only outside its range)
+    test_occ = lookup_price_tester_occupancy(st.session_state.price_tester_curve, test_price)
+    if test_occ is None:
+        test_occ = predict_occupancy('london', property_data, test_price)
+    test_revenue = test_price * test_occ * 30
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Test Price", f"£{test_price}")
+    with col2:
+        occ_delta = (test_occ - optimization['current_occ']) * 100
+        st.metric("Predicted Occupancy", f"{test_occ*100:.1f}%",
+                 delta=f"{occ_delta:+.1f} ppts")
+    with col3:
+        rev_delta = ((test_revenue - optimization['current_revenue']) / optimization['current_revenue']) * 100
+        st.metric("Monthly Revenue", f"£{test_revenue:.0f}",
+                 delta=f"{rev_delta:+.1f}%")
+
+    # Occupancy gauge
+    fig_gauge = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=test_occ * 100,
+        title={'text': "Predicted Occupancy"},
+        gauge={
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "#08519c"},
+            'steps': [
+                {'range': [0, 50], 'color': "#ffcccc"},
+                {'range': [50, 75], 'color': "#ffffcc"},
+                {'range': [75, 100], 'color': "#ccffcc"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 75
+            }
         }
-        
-        # Run analyses
-        knn_result = get_knn_price_recommendation('london', property_data)
-        revenue_curve = generate_revenue_curve('london', property_data, estimated_price, n_points=50)
-        optimization = get_optimization_summary(revenue_curve, estimated_price)
-        
-        # Store in session state
-        st.session_state.calculated = True
-        st.session_state.property_data = property_data
-        st.session_state.revenue_curve = revenue_curve
-        st.session_state.optimization = optimization
-        st.session_state.knn_result = knn_result
-        st.session_state.vibe_data = vibe_data
-        
-    st.success("✅ Analysis complete!")
-    st.rerun()
+    ))
+
+    fig_gauge.update_layout(height=250)
+    with stage_timer('render_occupancy_gauge'):
+        st.plotly_chart(fig_gauge, use_container_width=True)
 
 # =============================================================================
 # RESULTS DISPLAY - ONLY IF CALCULATED (SESSION STATE CHECK)
 # =============================================================================
 if st.session_state.calculated:
+    start_trace('render', city='london')
     
     # Retrieve from session state
     property_data = st.session_state.property_data
@@ -321,7 +400,8 @@ if st.session_state.calculated:
             height=400
         )
         
-        st.plotly_chart(fig_radar, use_container_width=True)
+        with stage_timer('render_vibe_radar'):
+            st.plotly_chart(fig_radar, use_container_width=True)
     
     with col3:
         st.markdown("**Top Vibe Dimensions:**")
@@ -445,7 +525,8 @@ if st.session_state.calculated:
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    with stage_timer('render_revenue_chart'):
+        st.plotly_chart(fig, use_container_width=True)
     
     # Key insights
     col1, col2, col3 = st.columns(3)
@@ -462,68 +543,12 @@ if st.session_state.calculated:
     st.markdown("---")
     
     # =========================================================================
-    # SECTION 4: INTERACTIVE PRICE TESTER (SLIDER - NOW PERSISTS!)
+    # SECTION 4: INTERACTIVE PRICE TESTER (FRAGMENT - SLIDER RERUNS ONLY THIS PANEL)
     # =========================================================================
-    st.markdown("## 🎚️ Interactive Price Tester")
-    st.caption("Test different prices and see real-time predictions")
-    
-    min_slider = int(estimated_price * 0.5)
-    max_slider = int(estimated_price * 2.0)
-    
-    # SLIDER IS NOW OUTSIDE THE CALCULATE BUTTON BLOCK!
-    # Session state keeps it visible even after reruns
-    test_price = st.slider(
-        "Test Price (£/night)",
-        min_value=min_slider,
-        max_value=max_slider,
-        value=int(optimization['optimal_price']),
-        step=5,
-        key='price_slider'
-    )
-    
-    # Real-time prediction at test price
-    test_occ = predict_occupancy('london', property_data, test_price)
-    test_revenue = test_price * test_occ * 30
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric("Test Price", f"£{test_price}")
-    with col2:
-        occ_delta = (test_occ - optimization['current_occ']) * 100
-        st.metric("Predicted Occupancy", f"{test_occ*100:.1f}%",
-                 delta=f"{occ_delta:+.1f} ppts")
-    with col3:
-        rev_delta = ((test_revenue - optimization['current_revenue']) / optimization['current_revenue']) * 100
-        st.metric("Monthly Revenue", f"£{test_revenue:.0f}",
-                 delta=f"{rev_delta:+.1f}%")
-    
-    # Occupancy gauge
-    fig_gauge = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=test_occ * 100,
-        title={'text': "Predicted Occupancy"},
-        gauge={
-            'axis': {'range': [None, 100]},
-            'bar': {'color': "#08519c"},
-            'steps': [
-                {'range': [0, 50], 'color': "#ffcccc"},
-                {'range': [50, 75], 'color': "#ffffcc"},
-                {'range': [75, 100], 'color': "#ccffcc"}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': 75
-            }
-        }
-    ))
-    
-    fig_gauge.update_layout(height=250)
-    st.plotly_chart(fig_gauge, use_container_width=True)
-    
+    render_price_tester(property_data, optimization, st.session_state.estimated_price)
+
     st.markdown("---")
-    
+
     # =========================================================================
     # SECTION 5: FINAL RECOMMENDATIONS
     # =========================================================================
@@ -605,6 +630,11 @@ if st.session_state.calculated:
     5. **Adjust seasonally** - increase during high-demand periods
     """)
 
+# =============================================================================
+# LATENCY BREAKDOWN - SIDEBAR, DEBUG FLAG ONLY (?debug=latency)
+# =============================================================================
+render_latency_sidebar(st.session_state.latency_analysis, finish_trace(), memory=get_training_data_memory(), pool=get_city_pool_stats())
+
 # =============================================================================
 # FOOTER NAVIGATION
 # =============================================================================
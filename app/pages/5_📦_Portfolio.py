@@ -0,0 +1,143 @@
+"""
+PORTFOLIO PRICING PAGE
+
+Batch pricing for property managers: upload a CSV of listings and get the
+k-NN price band and revenue-optimal price for every row at once.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import streamlit as st
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.model_loader import get_neighborhoods
+from utils.portfolio import price_portfolio, PORTFOLIO_COLUMNS, MAX_PORTFOLIO_ROWS
+from utils.latency import start_trace, finish_trace, render_latency_sidebar
+
+# Page config
+st.set_page_config(
+    page_title="Portfolio Pricing",
+    page_icon="📦",
+    layout="wide"
+)
+
+CITY_LABELS = {'london': '🎡 London', 'austin': '🤠 Austin', 'nyc': '🗽 NYC'}
+CITY_CURRENCIES = {'london': '£'}  # Others are priced in dollars
+
+# Initialize session state
+if 'portfolio_results' not in st.session_state:
+    st.session_state.portfolio_results = None
+if 'portfolio_latency' not in st.session_state:
+    st.session_state.portfolio_latency = None
+
+# Header
+st.title("📦 Portfolio Pricing")
+st.markdown("Price 50-500 units at a time: upload a CSV and get a price band and optimal price for every listing")
+
+# =============================================================================
+# UPLOAD
+# =============================================================================
+col1, col2 = st.columns([1, 2])
+
+with col1:
+    city = st.selectbox("City", list(CITY_LABELS), format_func=CITY_LABELS.get)
+
+    # Template with the city's own neighbourhood labels
+    template = pd.DataFrame({
+        'listing_id': ['unit-1', 'unit-2'],
+        'neighbourhood': get_neighborhoods(city)[:2],
+        'room_type': ['Entire home/apt', 'Private room'],
+        'accommodates': [4, 2],
+        'bedrooms': [2, 1],
+        'bathrooms': [1.0, 1.0],
+        'beds': [2, 1],
+        'amenities_count': [30, 20],
+        'current_price': [150, 80]
+    })
+    st.download_button(
+        "📄 Download CSV template",
+        template.to_csv(index=False),
+        file_name=f'portfolio_template_{city}.csv',
+        mime='text/csv',
+        use_container_width=True
+    )
+
+with col2:
+    uploaded = st.file_uploader("Portfolio CSV", type='csv')
+    st.caption(
+        f"Columns: {', '.join(PORTFOLIO_COLUMNS)} (only neighbourhood is required; missing values use the "
+        f"single-property form defaults and the median price). Other columns are passed through. "
+        f"Up to {MAX_PORTFOLIO_ROWS:,} rows."
+    )
+
+if uploaded is not None:
+    listings = pd.read_csv(uploaded)
+    st.caption(f"{len(listings):,} listings loaded")
+
+    if st.button("🎯 Price Portfolio", type="primary"):
+        start_trace('portfolio', city=city, rows=len(listings))
+        progress_bar = st.progress(0.0, text="Pricing portfolio...")
+
+        def report_progress(done, total):
+            progress_bar.progress(done / total, text=f"Priced {done:,} / {total:,} listings")
+
+        start = time.perf_counter()
+        try:
+            results = price_portfolio(city, listings, progress=report_progress)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        elapsed = time.perf_counter() - start
+
+        progress_bar.empty()
+        st.session_state.portfolio_results = {'city': city, 'table': results, 'seconds': elapsed}
+        st.session_state.portfolio_latency = finish_trace()
+
+# =============================================================================
+# RESULTS
+# =============================================================================
+portfolio = st.session_state.portfolio_results
+
+if portfolio is not None:
+    results = portfolio['table']
+    priced = results[results['error'].isna()]
+
+    st.markdown("---")
+    st.markdown(f"### 📊 {CITY_LABELS[portfolio['city']]} Portfolio Results")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Listings Priced", f"{len(priced):,} / {len(results):,}",
+                help=f"{len(priced) / max(portfolio['seconds'], 1e-9):,.0f} listings per second")
+    currency = CITY_CURRENCIES.get(portfolio['city'], '$')
+    if len(priced) > 0:
+        current_total, optimal_total = priced['current_revenue'].sum(), priced['optimal_revenue'].sum()
+        col2.metric("Current Revenue", f"{currency}{current_total:,.0f}/mo")
+        col3.metric("Optimal Revenue", f"{currency}{optimal_total:,.0f}/mo")
+        col4.metric("Portfolio Revenue Lift",
+                    f"{(optimal_total - current_total) / current_total * 100:.1f}%" if current_total > 0 else "n/a")
+
+    if len(priced) == 0:
+        st.error("No listing could be priced (see the error column)")
+    elif len(priced) < len(results):
+        st.warning(f"{len(results) - len(priced)} listings could not be priced (see the error column)")
+
+    st.dataframe(results, hide_index=True, use_container_width=True)
+
+    st.download_button(
+        "⬇️ Download results CSV",
+        results.to_csv(index=False),
+        file_name=f"portfolio_pricing_{portfolio['city']}.csv",
+        mime='text/csv',
+        type='primary'
+    )
+
+# =============================================================================
+# LATENCY BREAKDOWN - SIDEBAR, DEBUG FLAG ONLY (?debug=latency)
+# =============================================================================
+render_latency_sidebar(st.session_state.portfolio_latency)
@@ -0,0 +1,483 @@
+"""
+HEADLESS PRICING SERVICE
+
+Standalone HTTP/JSON API over the pricing engine (utils/predictor.py), so
+other systems can call the models and we can load-test them without the
+Streamlit pages. Built on asyncio from the standard library; Streamlit is
+never imported.
+
+Run from the project root:
+    python app/pricing_service.py
+
+VIBE_SERVICE_HOST / VIBE_SERVICE_PORT / VIBE_SERVICE_WORKERS override the
+address and the worker threads per city.
+
+Endpoints (JSON in, JSON out):
+    GET  /health
+    GET  /stats
+    POST /v1/{city}/knn                {"listing": {...}}
+    POST /v1/{city}/occupancy          {"listing": {...}, "prices": [120, 150]}
+    POST /v1/{city}/revenue-curve      {"listing": {...}, "current_price": 150, "n_points": 50}
+    POST /v1/{city}/optimize           {"listing": {...}, "current_price": 150}
+    POST /v1/{city}/batch/{operation}  {"items": [<body of one of the above>, ...]}
+
+A listing needs a neighbourhood (key or dropdown label). Its vibe scores
+are filled in from the city's vibe table, and any other feature that is
+left out takes the default of the app's property form. current_price
+defaults to the median price pre-filled by the app.
+
+Each city has its own worker pool, so a burst on one market doesn't queue
+requests for the others; models are shared through the city model pool
+(utils/city_pool.py).
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add app directory to path for imports
+sys.path.append(str(Path(__file__).parent))
+
+from utils import predictor
+from utils.predictor import (
+    get_knn_price_recommendation,
+    predict_occupancy_batch,
+    generate_revenue_curve,
+    get_optimization_summary,
+    get_prediction_cache_stats
+)
+from utils.model_loader import (
+    load_models,
+    load_feature_layouts,
+    load_price_splits,
+    load_price_sweep_evaluator,
+    load_vibe_index,
+    load_knn_index,
+    load_price_table,
+    get_vibe_for_neighborhood,
+    parse_neighbourhood_for_city,
+    get_average_price,
+    get_city_pool_stats
+)
+from utils.portfolio import VIBE_FEATURES, LISTING_DEFAULTS
+from utils.knn_index import KNN_FEATURES
+from utils.latency import get_latency_totals
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+HOST = os.environ.get('VIBE_SERVICE_HOST', '127.0.0.1')
+PORT = int(os.environ.get('VIBE_SERVICE_PORT', 8080))
+WORKERS_PER_CITY = int(os.environ.get('VIBE_SERVICE_WORKERS', 4))
+
+CITIES = ('london', 'austin', 'nyc')
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH_ITEMS = 1000
+BATCH_CHUNK_ITEMS = 25  # Items per worker task in a batch
+MAX_OCCUPANCY_PRICES = 2000
+DEFAULT_CURVE_POINTS = 50
+MAX_CURVE_POINTS = 1000
+
+# Loaders run at startup so the first request doesn't pay for them
+WARMUP_LOADERS = (
+    load_models,
+    load_feature_layouts,
+    load_price_splits,
+    load_price_sweep_evaluator,
+    load_vibe_index,
+    load_knn_index,
+    load_price_table
+)
+
+logger = logging.getLogger('pricing_service')
+
+class RequestError(Exception):
+    """Client error returned as a JSON error response"""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+# ============================================================================
+# PRICING OPERATIONS (run on the city's worker threads)
+# ============================================================================
+
+def _numeric_listing_fields(city):
+    """Listing fields the models read as numbers (model features, k-NN features, numeric defaults)"""
+    layouts = load_feature_layouts(city)
+    fields = set(layouts['xgboost'].feature_names) | set(layouts['ols'].feature_names) | set(KNN_FEATURES)
+    fields |= {name for name, value in LISTING_DEFAULTS.items() if not isinstance(value, str)}
+    return fields
+
+def build_property_data(city, listing):
+    """
+    Turn a request listing into the property dict the predictor expects
+
+    Args:
+        city: City name
+        listing: dict with neighbourhood and optional property features
+
+    Returns:
+        Property data dict with vibe scores filled in
+    """
+    if not isinstance(listing, dict):
+        raise RequestError("'listing' must be an object")
+    if not listing.get('neighbourhood'):
+        raise RequestError("'listing.neighbourhood' is required")
+
+    neighbourhood = parse_neighbourhood_for_city(city, str(listing['neighbourhood']))
+    vibe_data = get_vibe_for_neighborhood(city, neighbourhood)
+    if vibe_data is None:
+        raise RequestError(f"No vibe data found for {listing['neighbourhood']}", HTTPStatus.NOT_FOUND)
+
+    property_data = dict(LISTING_DEFAULTS)
+    property_data.update({k: v for k, v in listing.items() if v is not None})
+
+    # Numeric features must be numbers (or numeric strings / booleans)
+    for field in _numeric_listing_fields(city) & property_data.keys():
+        try:
+            value = float(property_data[field])
+        except (TypeError, ValueError):
+            value = math.nan
+        if not math.isfinite(value):
+            raise RequestError(f"'listing.{field}' must be a finite number")
+        if isinstance(property_data[field], str):
+            property_data[field] = value
+    property_data.setdefault('property_type', property_data['room_type'])
+    property_data['neighbourhood'] = neighbourhood
+    for feature in VIBE_FEATURES:
+        property_data[feature] = vibe_data[feature]
+
+    return property_data
+
+def _current_price(city, body, property_data):
+    """Requested current price, or the app's median pre-fill"""
+    price = body.get('current_price')
+    if price is None:
+        return get_average_price(city, property_data['neighbourhood'], property_data['room_type'])
+    if isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price) or price <= 0:
+        raise RequestError("'current_price' must be a positive finite number")
+    return price
+
+def op_knn(city, body):
+    """k-NN price band"""
+    property_data = build_property_data(city, body.get('listing'))
+    return get_knn_price_recommendation(city, property_data)
+
+def op_occupancy(city, body):
+    """Predicted occupancy at each requested price"""
+    property_data = build_property_data(city, body.get('listing'))
+
+    prices = body.get('prices')
+    if not isinstance(prices, list) or not prices or len(prices) > MAX_OCCUPANCY_PRICES:
+        raise RequestError(f"'prices' must be a list of 1-{MAX_OCCUPANCY_PRICES} numbers")
+    if any(isinstance(price, bool) for price in prices):
+        raise RequestError("'prices' must be a list of numbers")
+    try:
+        prices = np.asarray(prices, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise RequestError("'prices' must be a list of numbers")
+    if prices.ndim != 1 or not np.isfinite(prices).all():
+        raise RequestError("'prices' must be a list of finite numbers")
+
+    return {
+        'prices': prices,
+        'occupancy': predict_occupancy_batch(city, property_data, prices)
+    }
+
+def op_revenue_curve(city, body):
+    """Revenue curve over 0.5x-2x the current price, with its optimum"""
+    property_data = build_property_data(city, body.get('listing'))
+    current_price = _current_price(city, body, property_data)
+
+    breakpoints = body.get('breakpoints', True)
+    if not isinstance(breakpoints, bool):
+        raise RequestError("'breakpoints' must be true or false")
+
+    # Without the split edges the curve is only the evenly spaced points
+    min_points = 0 if breakpoints else 2
+    n_points = body.get('n_points', DEFAULT_CURVE_POINTS)
+    if isinstance(n_points, bool) or not isinstance(n_points, int) or not min_points <= n_points <= MAX_CURVE_POINTS:
+        raise RequestError(f"'n_points' must be an integer in {min_points}-{MAX_CURVE_POINTS}")
+
+    revenue_curve = generate_revenue_curve(
+        city, property_data, current_price, n_points=n_points, breakpoints=breakpoints
+    )
+    return {
+        'curve': revenue_curve,
+        'optimization': get_optimization_summary(revenue_curve, current_price)
+    }
+
+def op_optimize(city, body):
+    """Optimal price (exact over the model's price splits) and k-NN band"""
+    property_data = build_property_data(city, body.get('listing'))
+    current_price = _current_price(city, body, property_data)
+
+    revenue_curve = generate_revenue_curve(city, property_data, current_price, n_points=0, breakpoints=True)
+    return {
+        'optimization': get_optimization_summary(revenue_curve, current_price),
+        'knn': get_knn_price_recommendation(city, property_data)
+    }
+
+OPERATIONS = {
+    'knn': op_knn,
+    'occupancy': op_occupancy,
+    'revenue-curve': op_revenue_curve,
+    'optimize': op_optimize
+}
+
+def run_batch_chunk(operation, city, items):
+    """Run one operation on a chunk of batch items, capturing per-item errors"""
+    results = []
+    for item in items:
+        try:
+            if not isinstance(item, dict):
+                raise RequestError("Each batch item must be an object")
+            results.append({'ok': True, 'result': operation(city, item)})
+        except RequestError as e:
+            results.append({'ok': False, 'error': str(e)})
+        except Exception as e:
+            logger.exception("Batch item failed")
+            results.append({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+    return results
+
+def to_json_safe(value):
+    """
+    Convert predictor output to plain JSON types
+
+    Args:
+        value: dict / list / numpy / pandas value
+
+    Returns:
+        JSON-serializable value (NaN and inf become null)
+    """
+    if isinstance(value, dict):
+        return {str(k): to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return to_json_safe(value.to_dict('list'))
+    if isinstance(value, (np.ndarray, pd.Series)):
+        return to_json_safe(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class PricingService:
+    """
+    asyncio HTTP/1.1 server routing JSON requests to per-city worker pools
+
+    Args:
+        cities: Cities to serve
+        workers_per_city: Worker threads per city
+    """
+
+    def __init__(self, cities=CITIES, workers_per_city=WORKERS_PER_CITY):
+        self.cities = tuple(cities)
+        self.executors = {
+            city: ThreadPoolExecutor(max_workers=workers_per_city, thread_name_prefix=f'pricing-{city}')
+            for city in self.cities
+        }
+        self.started_at = time.time()
+        self.requests = 0
+        self.warm = {city: False for city in self.cities}
+
+    async def warm_up(self):
+        """Load every city's models on its own pool (failures are logged, not fatal)"""
+        loop = asyncio.get_running_loop()
+
+        async def warm_city(city):
+            start = time.perf_counter()
+            for loader in WARMUP_LOADERS:
+                try:
+                    await loop.run_in_executor(self.executors[city], loader, city)
+                except Exception as e:
+                    logger.warning("Warm-up of %s failed in %s: %s", city, loader.__name__, e)
+                    return
+            self.warm[city] = True
+            logger.info("Warmed %s in %.2fs", city, time.perf_counter() - start)
+
+        await asyncio.gather(*(warm_city(city) for city in self.cities))
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection (keep-alive) until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (
+                    headers.get('connection', '').lower() != 'close'
+                    and (version == 'HTTP/1.1' or headers.get('connection', '').lower() == 'keep-alive')
+                )
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.dispatch(method, target.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        """Write one JSON response"""
+        data = json.dumps(payload).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body):
+        """
+        Route a request
+
+        Returns:
+            Tuple of (HTTPStatus, JSON-safe payload)
+        """
+        self.requests += 1
+        parts = [p for p in path.split('/') if p]
+
+        try:
+            if parts == ['health']:
+                return HTTPStatus.OK, {'status': 'ok', 'cities': self.warm}
+            if parts == ['stats']:
+                return HTTPStatus.OK, to_json_safe(self.stats())
+
+            if len(parts) < 3 or parts[0] != 'v1':
+                raise RequestError(f"Unknown path: {path}", HTTPStatus.NOT_FOUND)
+            if method != 'POST':
+                raise RequestError("Use POST", HTTPStatus.METHOD_NOT_ALLOWED)
+
+            city = parts[1]
+            if city not in self.executors:
+                raise RequestError(f"Unknown city: {city} (expected one of {list(self.cities)})", HTTPStatus.NOT_FOUND)
+
+            is_batch = len(parts) == 4 and parts[2] == 'batch'
+            operation = OPERATIONS.get(parts[3] if is_batch else parts[2])
+            if operation is None or len(parts) != (4 if is_batch else 3):
+                raise RequestError(f"Unknown path: {path}", HTTPStatus.NOT_FOUND)
+
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError("Body must be valid JSON")
+            if not isinstance(request, dict):
+                raise RequestError("Body must be a JSON object")
+
+            if is_batch:
+                payload = await self.run_batch(operation, city, request.get('items'))
+            else:
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(self.executors[city], operation, city, request)
+
+            return HTTPStatus.OK, to_json_safe(payload)
+
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            logger.exception("Request failed: %s %s", method, path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+
+    async def run_batch(self, operation, city, items):
+        """Split a batch into chunks across the city's workers, keeping item order"""
+        if not isinstance(items, list) or not items:
+            raise RequestError("'items' must be a non-empty list")
+        if len(items) > MAX_BATCH_ITEMS:
+            raise RequestError(f"At most {MAX_BATCH_ITEMS} items per batch", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        loop = asyncio.get_running_loop()
+        chunks = [items[i:i + BATCH_CHUNK_ITEMS] for i in range(0, len(items), BATCH_CHUNK_ITEMS)]
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(self.executors[city], run_batch_chunk, operation, city, chunk)
+            for chunk in chunks
+        ))
+
+        results = [result for chunk in chunk_results for result in chunk]
+        return {
+            'count': len(results),
+            'errors': sum(not r['ok'] for r in results),
+            'results': results
+        }
+
+    def stats(self):
+        """Service counters plus city pool, prediction cache and stage timings"""
+        return {
+            'uptime_s': time.time() - self.started_at,
+            'requests': self.requests,
+            'warm': self.warm,
+            'city_pool': get_city_pool_stats(),
+            'prediction_cache': get_prediction_cache_stats(),
+            'stages': get_latency_totals()
+        }
+
+async def serve(host=HOST, port=PORT):
+    """Start the service and run until cancelled"""
+    service = PricingService()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logger.info("Pricing service listening on http://%s:%d", host, port)
+
+    await service.warm_up()
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    # Surface occupancy errors to the client instead of the 0.5 fallback
+    predictor.RAISE_PREDICTION_ERRORS = True
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,207 @@
+"""
+APPROXIMATE NEAREST-NEIGHBOR INDEX
+
+NumPy inverted-file (IVF) index for the k-NN comps search on large pools.
+
+The listings are clustered with k-means into n_lists cells; a query only
+scans the n_probe cells whose centroids are closest to it, so the cost
+grows with n_probe * (n / n_lists) instead of n. Raising n_probe trades
+latency for recall (n_probe = n_lists is an exact search). Distances to
+the returned neighbors are exact Euclidean distances.
+
+IVFIndex mirrors the parts of sklearn's NearestNeighbors the comps code
+uses (fit, kneighbors, n_samples_fit_), so it drops into the k-NN index
+artifact and scripts/03_high_demand_twins_knn.py as a backend, and it
+pickles with the rest of the artifact.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+# Search backends for the comps index
+KNN_BACKENDS = ['exact', 'ivf']
+
+# Defaults: ~4*sqrt(n) cells, scan 8 of them. ANN_RECALL_REPORT.md measured
+# recall@25 >= 0.995 on every pool at n_probe = 8 (4 drops NYC to 0.988), at
+# 1.9x the exact search speed on NYC and 1.2x on the 500k pooled set; on
+# Austin-sized pools IVF is no faster than exact (0.8x), so keep 'exact' there
+IVF_LISTS_PER_SQRT_N = 4
+IVF_N_PROBE = 8
+
+# k-means training settings
+KMEANS_ITERATIONS = 20
+KMEANS_MAX_TRAIN_POINTS_PER_LIST = 64
+ASSIGN_CHUNK_ROWS = 4096  # Rows scored against all centroids at once
+
+def _sq_distances_to(X, centroids, centroid_sq_norms):
+    """Squared distances (up to the per-row |x|^2 constant) from rows to centroids"""
+    return centroid_sq_norms[None, :] - 2.0 * (X @ centroids.T)
+
+def _assign(X, centroids):
+    """Nearest centroid for every row, in chunks to bound memory"""
+    centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(X), dtype=np.int64)
+    for start in range(0, len(X), ASSIGN_CHUNK_ROWS):
+        chunk = X[start:start + ASSIGN_CHUNK_ROWS]
+        labels[start:start + len(chunk)] = _sq_distances_to(chunk, centroids, centroid_sq_norms).argmin(axis=1)
+    return labels
+
+def kmeans(X, n_clusters, n_iter=KMEANS_ITERATIONS, random_state=42):
+    """
+    Lloyd's k-means on a sample of the rows
+
+    Args:
+        X: (n, d) array
+        n_clusters: Number of centroids
+        n_iter: Lloyd iterations
+        random_state: Seed for sampling and initialization
+
+    Returns:
+        (n_clusters, d) array of centroids
+    """
+    rng = np.random.default_rng(random_state)
+
+    n_train = min(len(X), n_clusters * KMEANS_MAX_TRAIN_POINTS_PER_LIST)
+    sample = X[rng.choice(len(X), size=n_train, replace=False)] if n_train < len(X) else X
+
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+
+        sums = np.column_stack([
+            np.bincount(labels, weights=sample[:, j], minlength=n_clusters) for j in range(sample.shape[1])
+        ])
+
+        # Empty cells are re-seeded on random sample points
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = sample[rng.choice(len(sample), size=empty.sum(), replace=False)]
+
+    return centroids
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbor index
+
+    Args:
+        n_lists: Number of k-means cells (default ~4*sqrt(n))
+        n_probe: Cells scanned per query (higher = better recall, slower)
+        dtype: Storage dtype for the indexed rows (float32 halves memory)
+        random_state: Seed for k-means
+    """
+
+    def __init__(self, n_lists=None, n_probe=IVF_N_PROBE, dtype=np.float64, random_state=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.dtype = dtype
+        self.random_state = random_state
+
+    def fit(self, X):
+        """
+        Cluster the rows and build the inverted lists
+
+        Args:
+            X: (n, d) array of (scaled) features
+
+        Returns:
+            self
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        n = len(X)
+
+        n_lists = self.n_lists or int(IVF_LISTS_PER_SQRT_N * np.sqrt(n))
+        self.n_lists_ = int(min(max(n_lists, 1), n))
+
+        self.centroids_ = kmeans(X, self.n_lists_, random_state=self.random_state)
+        self.centroid_sq_norms_ = np.einsum('ij,ij->i', self.centroids_, self.centroids_)
+        labels = _assign(X, self.centroids_)
+
+        # Store rows grouped by cell so each cell is one contiguous slice
+        self.order_ = np.argsort(labels, kind='stable')
+        self.data_ = X[self.order_]
+        self.sq_norms_ = np.einsum('ij,ij->i', self.data_, self.data_, dtype=np.float64)
+        self.cell_sizes_ = np.bincount(labels, minlength=self.n_lists_)
+        self.offsets_ = np.concatenate([[0], np.cumsum(self.cell_sizes_)])
+        self.row_ids_ = np.arange(n)
+
+        self.n_samples_fit_ = n
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def _search_one(self, x, cell_scores, n_neighbors, n_probe):
+        """Nearest neighbors of a single query row given its centroid scores"""
+        cells = np.argpartition(cell_scores, n_probe - 1)[:n_probe] if n_probe < self.n_lists_ else np.arange(self.n_lists_)
+
+        # Probe more cells (nearest first) if these hold fewer than n_neighbors rows
+        if self.cell_sizes_[cells].sum() < n_neighbors:
+            cell_order = np.argsort(cell_scores)
+            n_cells = int(np.searchsorted(np.cumsum(self.cell_sizes_[cell_order]), n_neighbors)) + 1
+            cells = cell_order[:n_cells]
+
+        candidates = np.concatenate([self.row_ids_[self.offsets_[c]:self.offsets_[c + 1]] for c in cells])
+        sq_dist = self.sq_norms_[candidates] - 2.0 * (self.data_[candidates] @ x)
+
+        if len(candidates) > n_neighbors:
+            top = np.argpartition(sq_dist, n_neighbors - 1)[:n_neighbors]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(sq_dist[top], kind='stable')]
+
+        rows = candidates[top]
+        distances = np.sqrt(((self.data_[rows] - x) ** 2).sum(axis=1, dtype=np.float64))
+        return distances, self.order_[rows]
+
+    def kneighbors(self, X, n_neighbors=5, n_probe=None):
+        """
+        Find the approximate nearest neighbors of each query row
+
+        Args:
+            X: (n_queries, d) array
+            n_neighbors: Neighbors per query
+            n_probe: Override the index's n_probe for this call
+
+        Returns:
+            Tuple of (distances, positions) arrays of shape (n_queries, n_neighbors),
+            sorted by distance; positions index the rows passed to fit()
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=self.dtype))
+        n_neighbors = min(n_neighbors, self.n_samples_fit_)
+        n_probe = min(n_probe or self.n_probe, self.n_lists_)
+
+        distances = np.empty((len(X), n_neighbors), dtype=np.float64)
+        positions = np.empty((len(X), n_neighbors), dtype=np.int64)
+        for start in range(0, len(X), ASSIGN_CHUNK_ROWS):
+            chunk = X[start:start + ASSIGN_CHUNK_ROWS]
+            cell_scores = _sq_distances_to(chunk, self.centroids_, self.centroid_sq_norms_)
+            for i, x in enumerate(chunk):
+                distances[start + i], positions[start + i] = self._search_one(x, cell_scores[i], n_neighbors, n_probe)
+
+        return distances, positions
+
+def make_neighbors_model(X, backend='exact', **kwargs):
+    """
+    Fit a neighbors model with the requested backend
+
+    Args:
+        X: (n, d) array of (scaled) features
+        backend: 'exact' (sklearn NearestNeighbors) or 'ivf' (IVFIndex)
+        **kwargs: Passed to the backend's constructor
+
+    Returns:
+        Fitted model with kneighbors() and n_samples_fit_
+    """
+    if backend == 'exact':
+        model = NearestNeighbors(metric='euclidean', **kwargs)
+    elif backend == 'ivf':
+        model = IVFIndex(**kwargs)
+    else:
+        raise ValueError(f"Unknown k-NN backend: {backend} (expected one of {KNN_BACKENDS})")
+
+    return model.fit(X)
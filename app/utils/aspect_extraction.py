@@ -0,0 +1,244 @@
+"""
+ASPECT EXTRACTION
+
+Single-pass aspect mention extraction for the vibe score generator
+(scripts/01_*, step 6).
+
+An aspect is mentioned wherever a review word contains one of its
+keywords (so 'walk' matches 'walking' and 'sidewalk'). Rather than
+re-splitting every review once per aspect and testing every word against
+every keyword, AspectMatcher compiles all keywords of all aspects into
+one Aho-Corasick automaton. Each review is split once, and each distinct
+word is run through the automaton once; the aspects it matches are
+memoized, so the common vocabulary costs a dict lookup. The memo is
+capped and starts over when full: the long tail of rare tokens in a full
+city corpus would otherwise grow it without limit. The work is linear in the text volume, whatever
+the number of aspects.
+
+Context windows overlap (a review mentioning 'restaurant' and 'food' a few
+words apart) and common phrases recur across reviews, so window
+polarities go through WINDOW_POLARITY_CACHE, a bounded LRU keyed on the
+normalized window text. The cache lives at module level: it is shared by
+every aspect and by every city scored in the same process.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+from .prediction_cache import PredictionCache
+
+# Words on each side of a mention that make up its context window
+CONTEXT_WORDS = 5
+
+# Window polarity cache caps (a million windows take roughly 200 MB with their keys;
+# byte accounting only covers the cached floats, so the entry cap is the one that binds)
+WINDOW_CACHE_MAX_ENTRIES = 1_000_000
+WINDOW_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+WINDOW_POLARITY_CACHE = PredictionCache(WINDOW_CACHE_MAX_ENTRIES, WINDOW_CACHE_MAX_BYTES)
+
+# Words memoized per AspectMatcher before the memo is cleared (the common
+# review vocabulary is a few tens of thousands of words; roughly 30 MB at the cap)
+WORD_MEMO_MAX_ENTRIES = 200_000
+
+# Reviews whose windows are collected before a batch polarity call
+ASPECT_BATCH_SIZE = 10000
+
+def textblob_polarity(text):
+    """
+    Polarity of a context window using TextBlob
+
+    Args:
+        text: Window text
+
+    Returns:
+        Polarity (-1 to 1)
+    """
+    return TextBlob(text).sentiment.polarity
+
+def normalize_window(text):
+    """
+    Canonical form of a context window for cache keys
+
+    Args:
+        text: Window text
+
+    Returns:
+        Lowercase text with single spaces
+    """
+    return ' '.join(text.lower().split())
+
+def cached_polarity(polarity, cache=WINDOW_POLARITY_CACHE):
+    """
+    Wrap a polarity function so repeated windows are scored once
+
+    Args:
+        polarity: Function scoring a window (-1 to 1); it must only depend
+                  on the normalized window text
+        cache: PredictionCache to use (keys include the function name, so
+               several polarity backends can share one cache)
+
+    Returns:
+        Function with the same signature as polarity
+    """
+    namespace = f'{polarity.__module__}.{polarity.__qualname__}'
+
+    def scorer(text):
+        key = (namespace, normalize_window(text))
+        value = cache.get(key)
+        if value is None:
+            value = polarity(key[1])
+            cache.put(key, value)
+        return value
+
+    return scorer
+
+class AspectMatcher:
+    """
+    Aho-Corasick automaton over the keywords of every aspect
+
+    Args:
+        aspect_keywords: dict of aspect -> list of keywords
+        memo_entries: Distinct words memoized before the memo is cleared
+    """
+
+    def __init__(self, aspect_keywords, memo_entries=WORD_MEMO_MAX_ENTRIES):
+        self.aspects = list(aspect_keywords)
+
+        # Trie of every keyword; outputs hold the aspect indices ending there
+        self._goto = [{}]
+        outputs = [set()]
+        for index, keywords in enumerate(aspect_keywords.values()):
+            for keyword in keywords:
+                node = 0
+                for char in keyword.lower():
+                    if char not in self._goto[node]:
+                        self._goto.append({})
+                        outputs.append(set())
+                        self._goto[node][char] = len(self._goto) - 1
+                    node = self._goto[node][char]
+                outputs[node].add(index)
+
+        # Failure links (breadth first), merging the outputs of suffixes
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                outputs[child] |= outputs[self._fail[child]]
+
+        self._outputs = [tuple(sorted(found)) for found in outputs]
+        self.memo_entries = memo_entries
+        self._word_aspects = {}
+
+    def aspects_for_word(self, word):
+        """
+        Get the aspects whose keywords occur inside a word
+
+        Args:
+            word: Lowercase word
+
+        Returns:
+            Tuple of aspect indices (into self.aspects), sorted
+        """
+        found = self._word_aspects.get(word)
+        if found is None:
+            matched = set()
+            node = 0
+            for char in word:
+                while node and char not in self._goto[node]:
+                    node = self._fail[node]
+                node = self._goto[node].get(char, 0)
+                matched.update(self._outputs[node])
+            found = tuple(sorted(matched))
+            if len(self._word_aspects) >= self.memo_entries:
+                # A plain dict reset keeps the hot path cheaper than an LRU
+                self._word_aspects.clear()
+            self._word_aspects[word] = found
+        return found
+
+    def find_mentions(self, text, context_words=CONTEXT_WORDS):
+        """
+        Find every aspect mention of a review in one pass
+
+        Args:
+            text: Review text
+            context_words: Words on each side of a mention in its window
+
+        Returns:
+            dict of aspect index -> list of (word position, context window),
+            only for the aspects that are mentioned, in text order
+        """
+        words = text.lower().split()
+        mentions = {}
+        for i, word in enumerate(words):
+            found = self.aspects_for_word(word)
+            if not found:
+                continue
+            window = ' '.join(words[max(0, i - context_words):i + context_words + 1])
+            for index in found:
+                mentions.setdefault(index, []).append((i, window))
+        return mentions
+
+def extract_aspect_sentiments(texts, matcher, polarity=textblob_polarity, context_words=CONTEXT_WORDS,
+                              cache=WINDOW_POLARITY_CACHE, batch_polarity=None, batch_size=ASPECT_BATCH_SIZE):
+    """
+    Mention flag, mean window sentiment and mention count for every aspect
+
+    Args:
+        texts: Sequence of cleaned review texts
+        matcher: AspectMatcher over the aspect keywords
+        polarity: Function scoring a context window (-1 to 1)
+        context_words: Words on each side of a mention in its window
+        cache: PredictionCache for window polarities (None to disable)
+        batch_polarity: Optional function scoring a list of windows at once
+                        (e.g. LexiconSentiment.polarity); replaces polarity
+                        and the cache
+        batch_size: Reviews whose windows are scored together by batch_polarity
+
+    Returns:
+        DataFrame with {aspect}_mentioned, {aspect}_sentiment and
+        {aspect}_count columns, one row per text (sentiment is 0 when the
+        aspect isn't mentioned)
+    """
+    if batch_polarity is None and cache is not None:
+        polarity = cached_polarity(polarity, cache)
+
+    n_aspects = len(matcher.aspects)
+    mentioned = np.zeros((len(texts), n_aspects), dtype=bool)
+    sentiment = np.zeros((len(texts), n_aspects))
+    count = np.zeros((len(texts), n_aspects), dtype=np.int64)
+
+    for start in range(0, len(texts), batch_size):
+        batch = [matcher.find_mentions(text, context_words) if text else {} for text in texts[start:start + batch_size]]
+
+        score = polarity
+        if batch_polarity is not None:
+            # Each distinct window of the batch is scored once, in one call
+            windows = list({window: None for mentions in batch for hits in mentions.values() for _, window in hits})
+            score = dict(zip(windows, batch_polarity(windows))).__getitem__
+
+        for row, mentions in enumerate(batch, start=start):
+            for index, hits in mentions.items():
+                mentioned[row, index] = True
+                sentiment[row, index] = np.mean([score(window) for _, window in hits])
+                count[row, index] = len(hits)
+
+    columns = {}
+    for index, aspect in enumerate(matcher.aspects):
+        columns[f'{aspect}_mentioned'] = mentioned[:, index]
+        columns[f'{aspect}_sentiment'] = sentiment[:, index]
+        columns[f'{aspect}_count'] = count[:, index]
+    return pd.DataFrame(columns)
@@ -0,0 +1,254 @@
+"""
+CITY MODEL POOL
+
+Memory-budgeted, thread-safe LRU pool of per-city model bundles.
+
+Everything the app loads for a city (models, k-NN index, vibe table,
+training data, ...) is stored as a component of that city's bundle. The
+pool tracks the approximate byte size of every bundle and, once the total
+goes over the memory ceiling, evicts whole cities least-recently-used
+first, so one server can host many markets while only the busy ones stay
+resident. An evicted city is simply reloaded on its next request.
+
+Sizes are measured when a component loads. A component that fills a
+cache as it is used (the price sweep evaluator's resolved listings)
+reports that cache's live size through a cache_nbytes() method; the pool
+re-reads it on every lookup, so the growth counts against the ceiling.
+
+Loader functions are wrapped with CityModelPool.cached(), which plays the
+role st.cache_resource used to: the first argument is the city, the other
+arguments become part of the component key, and concurrent requests for
+the same component load it once. Cached values are shared by every
+session, so treat them as read-only.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import functools
+import sys
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+
+from .prediction_cache import estimate_nbytes
+
+def estimate_object_nbytes(value, _seen=None):
+    """
+    Approximate memory held by a loaded model, index or table
+
+    Extends estimate_nbytes to model objects: XGBoost boosters are sized
+    by their serialized trees, sklearn trees by their arrays, and other
+    objects by walking their attributes. Shared objects are counted once.
+
+    Args:
+        value: Any loaded object
+
+    Returns:
+        Size in bytes
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, (dict, MappingProxyType)):
+        return sys.getsizeof(value) + sum(
+            estimate_object_nbytes(k, _seen) + estimate_object_nbytes(v, _seen) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_object_nbytes(v, _seen) for v in value)
+    if hasattr(value, 'save_raw'):
+        # xgboost.Booster: trees live in native memory
+        return len(value.save_raw())
+    if hasattr(value, 'get_arrays'):
+        # sklearn KDTree / BallTree
+        return sys.getsizeof(value) + sum(a.nbytes for a in value.get_arrays() if isinstance(a, np.ndarray))
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_object_nbytes(vars(value), _seen)
+    return estimate_nbytes(value)
+
+def live_cache_nbytes(value):
+    """
+    Get the live size of a component's internal cache
+
+    Args:
+        value: Loaded component
+
+    Returns:
+        value.cache_nbytes() if the component has one, else 0
+    """
+    cache_nbytes = getattr(value, 'cache_nbytes', None)
+    return cache_nbytes() if callable(cache_nbytes) else 0
+
+class CityModelPool:
+    """
+    LRU pool of per-city bundles under a memory ceiling
+
+    Args:
+        max_bytes: Approximate memory ceiling for all resident bundles. The
+                   city being loaded is never evicted, so a single bundle
+                   larger than the ceiling still loads (alone).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+        # city -> {component key: (value, nbytes without its live cache)}
+        self._bundles = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}  # (city, component key) -> lock held while loading
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, city):
+        with self._lock:
+            return city in self._bundles
+
+    def _lookup(self, city, key):
+        """Return (True, value) and mark the city most recently used, or (False, None)"""
+        bundle = self._bundles.get(city)
+        if bundle is None or key not in bundle:
+            return False, None
+
+        self._bundles.move_to_end(city)
+        return True, bundle[key][0]
+
+    def _city_nbytes(self, city):
+        """Current size of a city's bundle, live caches included (pool lock held)"""
+        return sum(nbytes + live_cache_nbytes(value) for value, nbytes in self._bundles[city].values())
+
+    def _total_nbytes(self):
+        """Current size of every resident bundle (pool lock held)"""
+        return sum(self._city_nbytes(city) for city in self._bundles)
+
+    def get_or_load(self, city, key, loader):
+        """
+        Get a component of a city's bundle, loading it on a miss
+
+        Args:
+            city: City name
+            key: Hashable component key (e.g. ('load_models',))
+            loader: Zero-argument function that loads the component
+
+        Returns:
+            The cached component
+        """
+        with self._lock:
+            found, value = self._lookup(city, key)
+            if found:
+                self.hits += 1
+                # Components' caches grow between loads; re-check the budget
+                self._evict_over_budget(keep=city)
+                return value
+            self.misses += 1
+            load_lock = self._load_locks.setdefault((city, key), threading.Lock())
+
+        # Load outside the pool lock so other cities and components aren't
+        # blocked; the per-component lock makes concurrent misses load once
+        with load_lock:
+            with self._lock:
+                found, value = self._lookup(city, key)
+                if found:
+                    return value
+
+            value = loader()
+            nbytes = estimate_object_nbytes(value) - live_cache_nbytes(value)
+
+            with self._lock:
+                self._bundles.setdefault(city, {})[key] = (value, nbytes)
+                self._bundles.move_to_end(city)
+                self.loads += 1
+                self._evict_over_budget(keep=city)
+
+        return value
+
+    def _evict_over_budget(self, keep):
+        """Evict least recently used cities (other than keep) until under the ceiling"""
+        while self._total_nbytes() > self.max_bytes:
+            victim = next((city for city in self._bundles if city != keep), None)
+            if victim is None:
+                break
+            self._drop(victim)
+            self.evictions += 1
+
+    def _drop(self, city):
+        """Remove a city's bundle (pool lock held)"""
+        self._bundles.pop(city, None)
+
+    def evict(self, city):
+        """
+        Drop a city's bundle now
+
+        Args:
+            city: City name
+
+        Returns:
+            True if the city was resident
+        """
+        with self._lock:
+            if city not in self._bundles:
+                return False
+            self._drop(city)
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        """Drop every bundle (counters are kept)"""
+        with self._lock:
+            self._bundles.clear()
+
+    def cached(self, name=None):
+        """
+        Decorator that stores a loader's results in the pool
+
+        The wrapped function's first argument must be the city; the
+        remaining arguments are part of the component key, so they must be
+        hashable.
+
+        Args:
+            name: Component name (defaults to the function name)
+        """
+        def decorator(func):
+            component = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(city, *args, **kwargs):
+                key = (component,) + args + tuple(sorted(kwargs.items()))
+                return self.get_or_load(city, key, lambda: func(city, *args, **kwargs))
+
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        """
+        Get pool counters and per-city sizes
+
+        Returns:
+            dict with cities (city -> {'components', 'bytes'}, least recently
+            used first), bytes, max_bytes, hits, misses, loads, evictions and
+            hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cities': {
+                    city: {'components': len(bundle), 'bytes': self._city_nbytes(city)}
+                    for city, bundle in self._bundles.items()
+                },
+                'bytes': self._total_nbytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,116 @@
+"""
+FEATURE LAYOUT
+
+Compiled feature-vector builder for the occupancy and OLS models.
+
+A FeatureLayout fixes a model's column order once, keeps a name -> column
+index map and a row of default values, and writes property dicts straight
+into a preallocated NumPy buffer. This replaces building a one-row
+DataFrame from a dict comprehension on every prediction.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import threading
+
+import numpy as np
+
+class FeatureLayout:
+    """
+    Fixed column layout for one model's feature vector
+
+    Args:
+        feature_names: Column order expected by the model
+        defaults: Optional dict of feature -> value used when a feature is missing (else 0)
+        dtype: Buffer dtype (float32 matches what XGBoost uses internally)
+    """
+
+    def __init__(self, feature_names, defaults=None, dtype=np.float32):
+        defaults = defaults or {}
+
+        self.feature_names = list(feature_names)
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+        self.dtype = dtype
+        self.defaults = np.array([defaults.get(f, 0) for f in self.feature_names], dtype=dtype)
+
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.feature_names)
+
+    def buffer(self):
+        """
+        Get this thread's preallocated single-row buffer
+
+        The buffer is reused by the next fill() on the same thread; copy it
+        if the values need to outlive that call.
+
+        Returns:
+            1-D numpy array with one slot per feature
+        """
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            buf = np.empty(len(self.feature_names), dtype=self.dtype)
+            self._local.buffer = buf
+        return buf
+
+    def fill(self, values, out=None):
+        """
+        Write a feature dict into a buffer in model column order
+
+        Keys that aren't model features are ignored; features missing from
+        the dict take their default value.
+
+        Args:
+            values: dict of feature name -> value
+            out: Optional destination array (defaults to this thread's buffer)
+
+        Returns:
+            The filled array
+        """
+        if out is None:
+            out = self.buffer()
+
+        out[:] = self.defaults
+        for name, value in values.items():
+            i = self.index.get(name)
+            if i is not None:
+                out[i] = value
+
+        return out
+
+    def fill_frame(self, frame):
+        """
+        Build a feature matrix from a DataFrame with one property per row
+
+        Columns that aren't model features are ignored; features without a
+        column take their default value.
+
+        Args:
+            frame: DataFrame of property features
+
+        Returns:
+            (n_rows, n_features) numpy array in model column order
+        """
+        X = self.tile(self.defaults, len(frame))
+        for name, i in self.index.items():
+            if name in frame.columns:
+                X[:, i] = frame[name].to_numpy(dtype=self.dtype)
+        return X
+
+    def tile(self, row, n_rows):
+        """
+        Allocate an (n_rows, n_features) matrix with every row set to row
+
+        Args:
+            row: Filled single-row array
+            n_rows: Number of rows
+
+        Returns:
+            2-D numpy array
+        """
+        X = np.empty((n_rows, len(self.feature_names)), dtype=self.dtype)
+        X[:] = row
+        return X
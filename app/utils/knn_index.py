@@ -0,0 +1,271 @@
+"""
+K-NN COMPS INDEX
+
+Builds, saves and loads the pre-fitted k-NN comps index used by the app.
+
+The index bundles the fitted StandardScaler, the fitted neighbors model
+(exact sklearn NearestNeighbors, or the IVF backend from ann_index.py for
+large comp pools) and the price / demand columns of the training listings, so a
+price-band query never has to touch the training parquet.
+
+A second NearestNeighbors model over the high-demand listings only backs
+the guaranteed-k comps search: when too few of the k nearest listings are
+high-demand, the next-nearest high-demand comps are read straight from
+their own index (see high_demand_search).
+
+This module has no Streamlit dependency so the build script in
+scripts/03b_build_knn_index.py can import it directly.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from .ann_index import make_neighbors_model
+
+BASE_DIR = Path(__file__).parent.parent.parent
+
+# Bump whenever the artifact layout or the feature list changes
+KNN_INDEX_VERSION = 3
+
+# Default search backend ('exact' or 'ivf', see ann_index.py)
+KNN_BACKEND = 'exact'
+
+# Features for k-NN (match original script)
+KNN_FEATURES = [
+    'bedrooms', 'bathrooms', 'accommodates', 'amenities_count',
+    'vibe_score', 'walkability_score', 'safety_score', 'nightlife_score',
+    'quietness_score', 'family_friendly_score', 'local_authentic_score',
+    'convenience_score', 'food_scene_score', 'liveliness_score', 'charm_score'
+]
+
+def get_knn_index_path(city):
+    """
+    Get the artifact path for a city's k-NN index
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        Path to the versioned index file in data/{city}/models/
+    """
+    return BASE_DIR / f'data/{city}/models/knn_comps_index_v{KNN_INDEX_VERSION}.pkl'
+
+def build_knn_index(train_data, backend=KNN_BACKEND, **backend_params):
+    """
+    Fit the scaler and neighbor index on the training listings
+
+    Args:
+        train_data: DataFrame with training features
+        backend: 'exact' or 'ivf' (approximate, for large comp pools)
+        **backend_params: Passed to the backend (e.g. n_lists, n_probe for ivf)
+
+    Returns:
+        dict with backend, scaler, knn, knn_high_demand, high_demand_positions,
+        features, medians, prices and high_demand
+    """
+    # Filter train data to required features + price + high_demand
+    features = [f for f in KNN_FEATURES if f in train_data.columns]
+    train_subset = train_data[features + ['price_clean', 'high_demand_90']].dropna()
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(train_subset[features].to_numpy(dtype=np.float64))
+
+    knn = make_neighbors_model(X_train_scaled, backend, **backend_params)
+
+    # Separate index over high-demand listings for the filtered comps search
+    high_demand = train_subset['high_demand_90'].to_numpy(dtype=np.int8)
+    high_demand_positions = np.flatnonzero(high_demand == 1)
+
+    knn_high_demand = None
+    if len(high_demand_positions) > 0:
+        knn_high_demand = make_neighbors_model(X_train_scaled[high_demand_positions], backend, **backend_params)
+
+    return {
+        'version': KNN_INDEX_VERSION,
+        'backend': backend,
+        'features': features,
+        'medians': {f: float(train_subset[f].median()) for f in features},
+        'scaler': scaler,
+        'knn': knn,
+        'knn_high_demand': knn_high_demand,
+        'high_demand_positions': high_demand_positions,
+        'prices': train_subset['price_clean'].to_numpy(dtype=np.float64),
+        'high_demand': high_demand,
+    }
+
+def save_knn_index(index, path):
+    """
+    Serialize a k-NN index to disk
+
+    Args:
+        index: dict from build_knn_index
+        path: Destination path
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_knn_index(path):
+    """
+    Read a k-NN index from disk
+
+    Args:
+        path: Path to the index file
+
+    Returns:
+        dict from build_knn_index, or None if missing or built by another version
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+
+    if index.get('version') != KNN_INDEX_VERSION:
+        return None
+
+    return index
+
+def _scale_query(index, property_data):
+    """Scale one property into the index's feature space"""
+    features = index['features']
+    x = np.array([[property_data.get(f, index['medians'][f]) for f in features]], dtype=np.float64)
+    return index['scaler'].transform(x)
+
+def _scale_queries(index, properties):
+    """Scale a DataFrame of properties into the index's feature space (missing / NaN -> median)"""
+    X = np.column_stack([
+        properties[f].astype(np.float64).fillna(index['medians'][f]).to_numpy() if f in properties.columns
+        else np.full(len(properties), index['medians'][f], dtype=np.float64)
+        for f in index['features']
+    ])
+    return index['scaler'].transform(X)
+
+def query_knn_index(index, property_data, n_neighbors):
+    """
+    Find the nearest training listings for a property
+
+    Args:
+        index: dict from build_knn_index
+        property_data: dict with property features (missing ones use training medians)
+        n_neighbors: Number of neighbors to return
+
+    Returns:
+        Tuple of (distances, positions) arrays for the single query
+    """
+    distances, positions = index['knn'].kneighbors(_scale_query(index, property_data), n_neighbors=n_neighbors)
+    return distances[0], positions[0]
+
+def high_demand_search(knn_all, knn_high_demand, high_demand_positions, X, n_neighbors, min_comps):
+    """
+    Guaranteed-k filtered search for high-demand comps
+
+    Returns the high-demand listings among the n_neighbors nearest listings
+    overall, exactly as filtering a plain k-NN query would (ties at the
+    k-th distance are cut the same way), topped up with the next-nearest
+    high-demand listings until there are at least min_comps. Distances are
+    the true distances to each comp.
+
+    Args:
+        knn_all: NearestNeighbors fitted on every listing
+        knn_high_demand: NearestNeighbors fitted on the high-demand listings only
+        high_demand_positions: Sorted positions of the high-demand listings
+                               among the rows knn_all was fitted on
+        X: (n_queries, n_features) scaled query matrix
+        n_neighbors: Size of the overall neighborhood (k)
+        min_comps: Minimum number of high-demand comps to return
+
+    Returns:
+        Tuple of (distances, positions, counts, n_within):
+            distances / positions: (n_queries, m) arrays sorted by distance,
+                positions index the high-demand subset; only the first
+                counts[i] entries of row i are comps
+            counts: Number of comps per query
+            n_within: How many of them are among the overall k nearest
+    """
+    n_high_demand = knn_high_demand.n_samples_fit_
+    width = min(max(n_neighbors, min_comps), n_high_demand)
+
+    # Overall k-NN, then the high-demand subset position of each neighbor
+    distances_all, positions_all = knn_all.kneighbors(X, n_neighbors=min(n_neighbors, knn_all.n_samples_fit_))
+    subset = np.minimum(np.searchsorted(high_demand_positions, positions_all), n_high_demand - 1)
+    is_high_demand = high_demand_positions[subset] == positions_all
+    n_within = is_high_demand.sum(axis=1)
+
+    # Move each row's high-demand neighbors to the front, keeping distance order
+    order = np.argsort(~is_high_demand, axis=1, kind='stable')[:, :width]
+    distances = np.take_along_axis(distances_all, order, axis=1)
+    positions = np.take_along_axis(subset, order, axis=1)
+    counts = np.minimum(n_within, width)
+
+    # Sparse areas: append the nearest high-demand listings not already in
+    sparse_rows = np.flatnonzero(n_within < min(min_comps, n_high_demand))
+    if len(sparse_rows) > 0:
+        n_fetch = min(2 * min_comps, n_high_demand)
+        extra_distances, extra_positions = knn_high_demand.kneighbors(X[sparse_rows], n_neighbors=n_fetch)
+        for row, row_distances, row_positions in zip(sparse_rows, extra_distances, extra_positions):
+            count = counts[row]
+            new = ~np.isin(row_positions, positions[row, :count])
+            needed = min(min_comps, n_high_demand) - count
+            distances[row, count:count + needed] = row_distances[new][:needed]
+            positions[row, count:count + needed] = row_positions[new][:needed]
+            counts[row] = count + min(needed, int(new.sum()))
+
+    return distances, positions, counts, n_within
+
+def query_high_demand_comps(index, property_data, n_neighbors, min_comps):
+    """
+    Find the high-demand comps for a property (see high_demand_search)
+
+    Args:
+        index: dict from build_knn_index
+        property_data: dict with property features (missing ones use training medians)
+        n_neighbors: Size of the overall neighborhood (k)
+        min_comps: Minimum number of high-demand comps to return
+
+    Returns:
+        Tuple of (distances, positions, n_within) for the single query;
+        positions index the index's prices / high_demand arrays
+    """
+    if index['knn_high_demand'] is None:
+        return np.array([]), np.array([], dtype=np.int64), 0
+
+    distances, positions, counts, n_within = high_demand_search(
+        index['knn'], index['knn_high_demand'], index['high_demand_positions'], _scale_query(index, property_data),
+        n_neighbors, min_comps
+    )
+    count = counts[0]
+    return distances[0, :count], index['high_demand_positions'][positions[0, :count]], int(n_within[0])
+
+def query_high_demand_comps_batch(index, properties, n_neighbors, min_comps):
+    """
+    Find the high-demand comps for many properties in one search
+
+    Args:
+        index: dict from build_knn_index
+        properties: DataFrame with one property per row (missing feature
+                    columns and NaN values use training medians)
+        n_neighbors: Size of the overall neighborhood (k)
+        min_comps: Minimum number of high-demand comps to return
+
+    Returns:
+        Tuple of (distances, positions, counts, n_within) as in
+        high_demand_search, with positions indexing the index's prices /
+        high_demand arrays; only the first counts[i] entries of row i are comps
+    """
+    n = len(properties)
+    if index['knn_high_demand'] is None or n == 0:
+        return np.empty((n, 0)), np.empty((n, 0), dtype=np.int64), np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+
+    distances, positions, counts, n_within = high_demand_search(
+        index['knn'], index['knn_high_demand'], index['high_demand_positions'], _scale_queries(index, properties),
+        n_neighbors, min_comps
+    )
+    return distances, index['high_demand_positions'][positions], counts, n_within
@@ -0,0 +1,251 @@
+"""
+LATENCY INSTRUMENTATION
+
+Lightweight per-stage timing for the Analyze Property flow.
+
+Functions decorated with @timed (and blocks wrapped in stage_timer) record
+their wall time and call count into the trace that is active on the
+current thread (Streamlit runs each session's script on its own thread),
+plus process-wide totals. finish_trace() closes the trace and appends a
+summary line to logs/latency.jsonl for offline analysis.
+
+The sidebar breakdown is only shown when VIBE_LATENCY_DEBUG=1 is set or
+the page is opened with ?debug=latency. Streamlit is only imported by the
+sidebar helpers, so the headless pricing service can use the timers.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent.parent.parent
+LATENCY_LOG_PATH = BASE_DIR / 'logs' / 'latency.jsonl'
+
+# Debug flag: environment variable or ?debug=latency query parameter
+LATENCY_DEBUG_ENV = 'VIBE_LATENCY_DEBUG'
+LATENCY_DEBUG_QUERY = 'latency'
+
+_local = threading.local()
+_totals = {}
+_totals_lock = threading.Lock()
+
+def _record(stage, elapsed_ms):
+    """Add one call to the active trace and to the process-wide totals"""
+    trace = getattr(_local, 'trace', None)
+
+    # One lock for both: a trace can be shared with worker threads (use_trace)
+    with _totals_lock:
+        if trace is not None:
+            summary = trace['stages'].setdefault(stage, {'calls': 0, 'ms': 0.0})
+            summary['calls'] += 1
+            summary['ms'] += elapsed_ms
+
+        total = _totals.setdefault(stage, {'calls': 0, 'ms': 0.0})
+        total['calls'] += 1
+        total['ms'] += elapsed_ms
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a block of code as one stage
+
+    Args:
+        stage: Stage name shown in the breakdown
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, (time.perf_counter() - start) * 1000)
+
+def timed(stage=None):
+    """
+    Decorator that times every call of a function as one stage
+
+    Place it above @st.cache_data / @st.cache_resource so cache hits are
+    timed too.
+
+    Args:
+        stage: Stage name (defaults to the function name)
+    """
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+def start_trace(name, **context):
+    """
+    Start collecting stages on this thread (replaces any unfinished trace)
+
+    Args:
+        name: Trace name (e.g. 'analyze', 'render')
+        **context: Extra fields written to the log (e.g. city)
+    """
+    _local.trace = {
+        'name': name,
+        'context': context,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'start': time.perf_counter(),
+        'stages': {}
+    }
+
+def current_trace():
+    """
+    Get this thread's active trace, to hand to worker threads
+
+    Returns:
+        The trace, or None if no trace was started
+    """
+    return getattr(_local, 'trace', None)
+
+@contextmanager
+def use_trace(trace):
+    """
+    Record stages on this (worker) thread into another thread's trace
+
+    Args:
+        trace: Trace from current_trace() on the submitting thread (None
+               records into the totals only)
+    """
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield
+    finally:
+        _local.trace = previous
+
+def finish_trace(log_path=LATENCY_LOG_PATH):
+    """
+    Close this thread's trace and append it to the JSONL log
+
+    Args:
+        log_path: JSONL file to append to (None to skip logging)
+
+    Returns:
+        dict with trace, started_at, total_ms, stages and context fields,
+        or None if no trace was started
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return None
+    _local.trace = None
+
+    record = {
+        'trace': trace['name'],
+        **trace['context'],
+        'started_at': trace['started_at'],
+        'total_ms': round((time.perf_counter() - trace['start']) * 1000, 3),
+        'stages': {
+            stage: {'calls': s['calls'], 'ms': round(s['ms'], 3)}
+            for stage, s in trace['stages'].items()
+        }
+    }
+
+    if log_path is not None:
+        try:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError:
+            pass  # Read-only deployments still get the sidebar breakdown
+
+    return record
+
+def get_latency_totals():
+    """
+    Get process-wide call counts and wall time per stage
+
+    Returns:
+        dict of stage -> {'calls', 'ms'}
+    """
+    with _totals_lock:
+        return {stage: dict(total) for stage, total in _totals.items()}
+
+def is_latency_debug_enabled():
+    """
+    Check whether the latency breakdown should be shown
+
+    Returns:
+        True if the env var is set or the page has ?debug=latency
+    """
+    if os.environ.get(LATENCY_DEBUG_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+
+    import streamlit as st
+    return st.query_params.get('debug') == LATENCY_DEBUG_QUERY
+
+def render_latency_sidebar(*records, memory=None, pool=None):
+    """
+    Show a per-stage latency breakdown in the sidebar (debug flag only)
+
+    Stage times are inclusive, so nested stages (e.g. load_models inside
+    predict_occupancy_batch) are also counted in their caller.
+
+    Args:
+        *records: Trace records from finish_trace (None entries are skipped)
+        memory: Optional dict of city -> {'rows', 'columns', 'bytes'} for
+                the loaded training data
+        pool: Optional city pool stats (from get_city_pool_stats)
+    """
+    if not is_latency_debug_enabled():
+        return
+
+    import streamlit as st
+    with st.sidebar:
+        st.markdown("### ⏱️ Latency Breakdown")
+        for record in records:
+            if record is None:
+                continue
+
+            st.caption(f"**{record['trace']}** · {record['total_ms']:.1f} ms total · {record['started_at']}")
+            st.dataframe(
+                pd.DataFrame([
+                    {'stage': stage, 'calls': s['calls'], 'ms': s['ms']}
+                    for stage, s in record['stages'].items()
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
+
+        if memory:
+            st.markdown("### 💾 Training Data Memory")
+            st.dataframe(
+                pd.DataFrame([
+                    {'city': city, 'rows': m['rows'], 'columns': m['columns'], 'MB': round(m['bytes'] / 1e6, 2)}
+                    for city, m in memory.items()
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
+
+        if pool:
+            st.markdown("### 🏙️ City Model Pool")
+            st.caption(
+                f"{pool['bytes'] / 1e6:.1f} / {pool['max_bytes'] / 1e6:.0f} MB · "
+                f"{pool['hits']} hits · {pool['misses']} misses · {pool['loads']} loads · "
+                f"{pool['evictions']} evictions"
+            )
+            st.dataframe(
+                pd.DataFrame([
+                    {'city': city, 'components': c['components'], 'MB': round(c['bytes'] / 1e6, 2)}
+                    for city, c in pool['cities'].items()
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
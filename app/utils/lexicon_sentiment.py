@@ -0,0 +1,265 @@
+"""
+LEXICON SENTIMENT ENGINE
+
+Vectorized re-implementation of TextBlob's default (pattern) polarity.
+
+TextBlob walks every document word by word in Python, building objects
+as it goes, which caps the vibe pipeline at a couple of thousand reviews
+per second per core. LexiconSentiment compiles the lexicon TextBlob
+ships with (en-sentiment.xml, read from the installed package, so
+nothing is downloaded) into per-token arrays and scores a whole batch
+of texts at once:
+
+1. All texts are tokenized with one regex pass and the tokens are mapped
+   to lexicon ids with pd.factorize.
+2. Pattern's rules are applied to the flat token stream as array
+   operations: a known word following a modifier ("very good") merges
+   into the modifier's assessment scaled by its intensity; negations
+   ("not good", "not very good") flip and halve the polarity and invert
+   the intensity; "!" boosts the previous assessment; emoticons count as
+   assessments of their own.
+3. A sparse (texts x assessments) matrix product averages the
+   assessments of every text.
+
+Two simplifications make the rules array-friendly: one-letter unknown
+tokens are dropped (pattern lets negations reach across them) and a
+modifier only reaches the next word, or the word after a negation
+("really not good"). compare_with_textblob() measures how closely the
+engine tracks TextBlob on a sample so the trade-off stays visible.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from textblob import TextBlob
+from textblob._text import EMOTICONS
+from textblob.en import sentiment as pattern_sentiment
+
+NEGATIONS = ('no', 'not', 'never')
+
+# Texts tokenized per regex call (bounds the memory of the token stream)
+LEXICON_BATCH_SIZE = 20000
+
+# Separator placed between texts when a batch is tokenized in one pass
+_TEXT_BREAK = '\x01'
+
+class LexiconSentiment:
+    """
+    Batch polarity and subjectivity from TextBlob's bundled lexicon
+    """
+
+    def __init__(self):
+        if dict.__len__(pattern_sentiment) == 0:
+            pattern_sentiment.load()
+
+        words = dict(pattern_sentiment)
+        emoticons = {
+            emoticon.lower(): polarity
+            for (_, polarity), group in EMOTICONS.items() for emoticon in group
+            if not emoticon.isalpha()  # pattern skips alphabetic ones ('xD')
+        }
+
+        # Token ids: lexicon words, then negations, emoticons, '!' and the
+        # shared id of every other word
+        self.vocab = {}
+        rows = []
+        for word, senses in words.items():
+            polarity, subjectivity, intensity = senses[None]
+            self.vocab[word] = len(rows)
+            rows.append((polarity, subjectivity, intensity, True, 'RB' in senses, False, False))
+        for word in NEGATIONS:
+            if word not in self.vocab:
+                self.vocab[word] = len(rows)
+                rows.append((0.0, 0.0, 1.0, False, False, True, False))
+        for emoticon, polarity in emoticons.items():
+            if emoticon not in self.vocab:
+                self.vocab[emoticon] = len(rows)
+                rows.append((polarity, 1.0, 1.0, False, False, False, True))
+        self.exclamation_id = self.vocab['!'] = len(rows)
+        rows.append((0.0, 0.0, 1.0, False, False, False, False))
+        self.unknown_id = len(rows)
+        rows.append((0.0, 0.0, 1.0, False, False, False, False))
+        self.break_id = len(rows)
+        self.vocab[_TEXT_BREAK] = self.break_id
+        rows.append((0.0, 0.0, 1.0, False, False, False, False))
+
+        table = np.array(rows, dtype=np.float64)
+        self.polarity_of = table[:, 0]
+        self.subjectivity_of = table[:, 1]
+        self.intensity_of = table[:, 2]
+        self.is_known = table[:, 3].astype(bool)
+        self.is_modifier = table[:, 4].astype(bool)
+        self.is_negation = table[:, 5].astype(bool)
+        self.is_emoticon = table[:, 6].astype(bool)
+
+        # Words are matched first; the lookahead on an emoticon's first
+        # character keeps the long emoticon alternation off the hot path
+        # (emoticons starting with a word character, like '8-)', are split)
+        emoticons = [e for e in sorted(emoticons, key=len, reverse=True) if not re.match(r'\w', e)]
+        first_chars = re.escape(''.join(sorted({e[0] for e in emoticons})))
+        emoticon_pattern = '|'.join(re.escape(e) for e in emoticons)
+        self._token_re = re.compile(f'\\w+|!|{_TEXT_BREAK}|(?<!\\w)(?=[{first_chars}])(?:{emoticon_pattern})(?!\\w)')
+
+    def _tokenize(self, texts):
+        """Token ids and text index of every kept token of a batch"""
+        joined = f' {_TEXT_BREAK} '.join('' if t is None or t != t else str(t) for t in texts).lower()
+        tokens = self._token_re.findall(joined)
+
+        codes, uniques = pd.factorize(pd.Series(tokens, dtype=object), sort=False)
+        lookup = np.array([
+            self.vocab.get(token, self.unknown_id if len(token) > 1 else -1) for token in uniques
+        ], dtype=np.int64)
+        ids = lookup[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+
+        is_break = ids == self.break_id
+        text_index = np.cumsum(is_break)
+        keep = (ids >= 0) & ~is_break
+        return ids[keep], text_index[keep]
+
+    def _score_batch(self, texts):
+        """(polarity, subjectivity) arrays for one batch of texts"""
+        ids, text_index = self._tokenize(texts)
+        n_texts = len(texts)
+        if len(ids) == 0:
+            return np.zeros(n_texts), np.zeros(n_texts)
+
+        same_text = np.r_[False, text_index[1:] == text_index[:-1]]
+        same_text2 = np.r_[False, False, text_index[2:] == text_index[:-2]]
+        prev_ids = np.r_[self.break_id, ids[:-1]]
+        prev2_ids = np.r_[self.break_id, self.break_id, ids[:-2]]
+
+        known = self.is_known[ids]
+        negated = same_text & self.is_negation[prev_ids]
+
+        # Modifier reaching this word directly or across a negation
+        via_negation = negated & same_text2 & self.is_modifier[prev2_ids]
+        modified = known & ((same_text & self.is_modifier[prev_ids]) | via_negation)
+        modifier_ids = np.where(via_negation, prev2_ids, prev_ids)
+
+        # A negated modifier inverts its intensity ("not very good")
+        modifier_negated = np.r_[False, negated[:-1]] & ~via_negation
+        modifier_negated |= via_negation & np.r_[False, False, negated[:-2]]
+        intensity = self.intensity_of[modifier_ids]
+        intensity = np.where(modifier_negated, 1.0 / intensity, intensity)
+
+        polarity = np.where(modified, np.clip(self.polarity_of[ids] * intensity, -1.0, 1.0), self.polarity_of[ids])
+        subjectivity = np.where(
+            modified, np.clip(self.subjectivity_of[ids] * intensity, -1.0, 1.0), self.subjectivity_of[ids]
+        )
+
+        # Assessments: a known word not merged into a preceding modifier, or an emoticon
+        emoticon = self.is_emoticon[ids]
+        head = (known & ~modified) | emoticon
+        group = np.cumsum(head) - 1
+        n_groups = int(head.sum())
+        if n_groups == 0:
+            return np.zeros(n_texts), np.zeros(n_texts)
+
+        # The last word of a merged chain sets the assessment's scores
+        member = known | emoticon
+        member_group = group[member]
+        last = np.r_[member_group[1:] != member_group[:-1], True]
+        group_polarity = np.zeros(n_groups)
+        group_subjectivity = np.zeros(n_groups)
+        group_polarity[member_group[last]] = polarity[member][last]
+        group_subjectivity[member_group[last]] = subjectivity[member][last]
+        group_negated = np.bincount(member_group, weights=(negated & known)[member], minlength=n_groups) > 0
+        group_text = text_index[head]
+
+        # Each '!' boosts the latest assessment of its text
+        exclamation = (ids == self.exclamation_id) & (group >= 0)
+        boosted = group[exclamation]
+        boosted = boosted[group_text[boosted] == text_index[exclamation]]
+        boosts = np.bincount(boosted, minlength=n_groups)
+        group_polarity = np.clip(group_polarity * 1.25 ** boosts, -1.0, 1.0)
+
+        # "not good" = slightly bad, "not bad" = slightly good
+        group_polarity = np.where(group_negated, group_polarity * -0.5, group_polarity)
+
+        # Average the assessments of each text with one sparse product
+        membership = sparse.csr_matrix(
+            (np.ones(n_groups), (group_text, np.arange(n_groups))), shape=(n_texts, n_groups)
+        )
+        totals = membership @ np.column_stack([group_polarity, group_subjectivity, np.ones(n_groups)])
+        counts = np.maximum(totals[:, 2], 1.0)
+        return totals[:, 0] / counts, totals[:, 1] / counts
+
+    def score(self, texts, batch_size=LEXICON_BATCH_SIZE):
+        """
+        Score polarity and subjectivity of many texts
+
+        Args:
+            texts: Sequence of texts (None / NaN score 0)
+            batch_size: Texts tokenized per pass
+
+        Returns:
+            Tuple of (polarity, subjectivity) arrays in the order of texts
+        """
+        texts = list(texts)
+        polarity = np.zeros(len(texts))
+        subjectivity = np.zeros(len(texts))
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            polarity[start:start + len(batch)], subjectivity[start:start + len(batch)] = self._score_batch(batch)
+        return polarity, subjectivity
+
+    def polarity(self, texts, batch_size=LEXICON_BATCH_SIZE):
+        """
+        Score the polarity of many texts (e.g. aspect context windows)
+
+        Args:
+            texts: Sequence of texts
+            batch_size: Texts tokenized per pass
+
+        Returns:
+            Array of polarities (-1 to 1)
+        """
+        return self.score(texts, batch_size)[0]
+
+def compare_with_textblob(engine, texts, sample_size=2000, random_seed=42):
+    """
+    Validate the lexicon engine against TextBlob on a sample of texts
+
+    Args:
+        engine: LexiconSentiment
+        texts: Sequence of texts to sample from
+        sample_size: Texts scored by both engines
+        random_seed: Sampling seed
+
+    Returns:
+        dict with n, polarity_corr, subjectivity_corr, polarity_mae,
+        sign_agreement (share of texts whose polarity sign matches),
+        textblob_per_sec, lexicon_per_sec and speedup
+    """
+    texts = list(texts)
+    rng = np.random.default_rng(random_seed)
+    sample = [texts[i] for i in rng.choice(len(texts), size=min(sample_size, len(texts)), replace=False)]
+
+    start = time.perf_counter()
+    reference = np.array([TextBlob(str(t)).sentiment for t in sample], dtype=np.float64).reshape(-1, 2)
+    textblob_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    polarity, subjectivity = engine.score(sample)
+    lexicon_seconds = time.perf_counter() - start
+
+    def corr(a, b):
+        return float(np.corrcoef(a, b)[0, 1]) if len(a) > 1 and a.std() > 0 and b.std() > 0 else float('nan')
+
+    return {
+        'n': len(sample),
+        'polarity_corr': corr(polarity, reference[:, 0]),
+        'subjectivity_corr': corr(subjectivity, reference[:, 1]),
+        'polarity_mae': float(np.abs(polarity - reference[:, 0]).mean()) if len(sample) else float('nan'),
+        'sign_agreement': float((np.sign(polarity) == np.sign(reference[:, 0])).mean()) if len(sample) else float('nan'),
+        'textblob_per_sec': len(sample) / max(textblob_seconds, 1e-9),
+        'lexicon_per_sec': len(sample) / max(lexicon_seconds, 1e-9),
+        'speedup': textblob_seconds / max(lexicon_seconds, 1e-9)
+    }
@@ -0,0 +1,113 @@
+"""
+NATIVE MODEL FORMATS
+
+Exports and loads the app's models without pickle.
+
+The XGBoost occupancy booster is saved in XGBoost's own UBJSON format
+(stable across XGBoost upgrades, loaded straight into a Booster without
+the scikit-learn wrapper), and the stage-1 OLS model as a tiny .npz of
+its coefficients, intercept and feature names.
+
+This module has no Streamlit dependency so the training scripts can
+import it directly.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+# Native artifact names next to the pickles in data/{city}/models/
+XGBOOST_NATIVE_FILE = 'xgboost_with_vibe.ubj'
+OLS_ARRAYS_FILE = 'ols_price_control.npz'
+
+class LinearModel:
+    """
+    Minimal linear model restored from exported arrays
+
+    Exposes the attributes of sklearn's LinearRegression the app uses.
+
+    Args:
+        coef: Coefficient per feature
+        intercept: Intercept
+        feature_names: Feature order of coef
+    """
+
+    def __init__(self, coef, intercept, feature_names):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    def predict(self, X):
+        """
+        Predict with the linear model
+
+        Args:
+            X: (n, n_features) array in feature_names_in_ order
+
+        Returns:
+            numpy array of predictions
+        """
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+def export_xgboost_native(model, path):
+    """
+    Save an XGBoost model's booster in the native format
+
+    Args:
+        model: xgboost.XGBModel or xgboost.Booster
+        path: Destination (.ubj for binary UBJSON, .json for text)
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    booster.save_model(str(path))
+
+def load_xgboost_native(path):
+    """
+    Load a booster saved by export_xgboost_native
+
+    Args:
+        path: Path to the .ubj / .json model
+
+    Returns:
+        xgboost.Booster (feature names included)
+    """
+    import xgboost as xgb
+
+    return xgb.Booster(model_file=str(path))
+
+def export_ols_arrays(model, path, feature_names=None):
+    """
+    Save a fitted linear model's coefficients as a .npz file
+
+    Args:
+        model: Fitted LinearRegression (or LinearModel)
+        path: Destination .npz path
+        feature_names: Feature order (defaults to model.feature_names_in_)
+    """
+    if feature_names is None:
+        feature_names = model.feature_names_in_
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        path,
+        coef=np.asarray(model.coef_, dtype=np.float64),
+        intercept=np.float64(model.intercept_),
+        feature_names=np.asarray(feature_names, dtype=str)
+    )
+
+def load_ols_arrays(path):
+    """
+    Load a linear model saved by export_ols_arrays
+
+    Args:
+        path: Path to the .npz file
+
+    Returns:
+        LinearModel
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        return LinearModel(arrays['coef'], arrays['intercept'], arrays['feature_names'].tolist())
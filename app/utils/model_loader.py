@@ -6,14 +6,45 @@ Handles loading of trained models and data for predictions
 Author: Vibe-Aware Pricing Team
 """
 
+import os
 import pickle
+import re
+import threading
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import json
+import logging
 from pathlib import Path
-import streamlit as st
+
+from .knn_index import KNN_FEATURES, build_knn_index, get_knn_index_path, read_knn_index
+from .price_splits import get_split_thresholds
+from .price_sweep import PriceSweepEvaluator
+from .feature_layout import FeatureLayout
+from .price_table import build_price_table, get_price_table_path, read_price_table, lookup_median_price
+from .latency import timed
+from .model_export import XGBOOST_NATIVE_FILE, OLS_ARRAYS_FILE, load_xgboost_native, load_ols_arrays
+from .city_pool import CityModelPool
 
 BASE_DIR = Path(__file__).parent.parent.parent
 
+# Training parquet columns the app actually reads (k-NN comps + price lookups)
+TRAINING_COLUMNS = KNN_FEATURES + ['price_clean', 'high_demand_90', 'neighbourhood', 'room_type']
+
+# Memory ceiling for the resident city bundles (models, indexes, vibe
+# tables, training data); least recently used cities are evicted beyond it
+CITY_POOL_MAX_MB_ENV = 'VIBE_CITY_POOL_MAX_MB'
+CITY_POOL_MAX_BYTES = int(os.environ.get(CITY_POOL_MAX_MB_ENV, 512)) * 1024 * 1024
+
+CITY_POOL = CityModelPool(CITY_POOL_MAX_BYTES)
+
+logger = logging.getLogger(__name__)
+
+# Resident size of each loaded training frame: city -> {'rows', 'columns', 'bytes'}
+_training_memory = {}
+_training_memory_lock = threading.Lock()
+
 # Austin zip code to neighborhood name mapping
 AUSTIN_ZIP_TO_NAME = {
     "78701": "Downtown Austin",
@@ -62,7 +93,8 @@ AUSTIN_ZIP_TO_NAME = {
     "78613": "Cedar Park West"
 }
 
-@st.cache_resource
+@timed()
+@CITY_POOL.cached()
 def load_models(city):
     """
     Load trained models for a city
@@ -70,29 +102,154 @@ def load_models(city):
     Args:
         city: City name (london, austin, nyc)
 
+    Prefers the native exports written by the training scripts
+    (xgboost_with_vibe.ubj, ols_price_control.npz) and falls back to the
+    pickles for cities that haven't been re-exported.
+
     Returns:
-        dict with xgboost_model, ols_model
+        dict with xgboost (xgboost.Booster) and ols (linear model with
+        coef_, intercept_, feature_names_in_)
     """
     data_dir = BASE_DIR / f'data/{city}'
     models_dir = data_dir / 'models'
 
     models = {}
 
-    # Load XGBoost model (with vibe)
-    xgb_path = models_dir / 'xgboost_with_vibe.pkl'
-    with open(xgb_path, 'rb') as f:
-        models['xgboost'] = pickle.load(f)
+    # Load XGBoost booster (with vibe)
+    xgb_native_path = models_dir / XGBOOST_NATIVE_FILE
+    if xgb_native_path.exists():
+        models['xgboost'] = load_xgboost_native(xgb_native_path)
+    else:
+        with open(models_dir / 'xgboost_with_vibe.pkl', 'rb') as f:
+            models['xgboost'] = pickle.load(f).get_booster()
 
     # Load OLS model (for price residuals)
-    ols_path = models_dir / 'ols_price_control.pkl'
-    with open(ols_path, 'rb') as f:
-        models['ols'] = pickle.load(f)
+    ols_arrays_path = models_dir / OLS_ARRAYS_FILE
+    if ols_arrays_path.exists():
+        models['ols'] = load_ols_arrays(ols_arrays_path)
+    else:
+        with open(models_dir / 'ols_price_control.pkl', 'rb') as f:
+            models['ols'] = pickle.load(f)
 
-    # Note: k-NN model is built on-the-fly in predictor.py, no need to load
+    # Note: k-NN comps index is loaded separately by load_knn_index
 
     return models
 
-@st.cache_data
+@timed()
+@CITY_POOL.cached()
+def load_knn_index(city):
+    """
+    Load the pre-fitted k-NN comps index for a city
+
+    Reads data/{city}/models/knn_comps_index_v*.pkl (built by
+    scripts/03b_build_knn_index.py). If the artifact is missing or was
+    built by an older version, a warning is logged and the index is fitted
+    once from the full-precision training features (as the build script
+    does, not the downcast load_training_data frame) and kept in memory
+    for this process.
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        dict with scaler, knn, features, medians, prices and high_demand
+    """
+    index_path = get_knn_index_path(city)
+    index = read_knn_index(index_path)
+
+    if index is None:
+        logger.warning("k-NN index %s is missing or stale; fitting it in memory "
+                       "(run scripts/03b_build_knn_index.py to persist it)", index_path)
+        train_file = BASE_DIR / f'data/{city}/processed/features_{city}_train.parquet'
+        available = set(pq.read_schema(train_file).names)
+        columns = [c for c in KNN_FEATURES + ['price_clean', 'high_demand_90'] if c in available]
+        index = build_knn_index(pd.read_parquet(train_file, columns=columns))
+
+    return index
+
+@timed()
+@CITY_POOL.cached()
+def load_price_table(city):
+    """
+    Load the precomputed median price table for a city
+
+    Reads data/{city}/models/median_price_table_v*.json (built by
+    scripts/03b_build_knn_index.py). If the artifact is missing or stale,
+    the table is computed once from the training data.
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        dict from build_price_table
+    """
+    table = read_price_table(get_price_table_path(city))
+
+    if table is None:
+        table = build_price_table(load_training_data(city))
+
+    return table
+
+@timed()
+@CITY_POOL.cached()
+def load_price_splits(city):
+    """
+    Load the price-dependent split thresholds of a city's XGBoost model
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        dict of feature name -> sorted split thresholds
+    """
+    booster = load_models(city)['xgboost']
+    return get_split_thresholds(booster)
+
+@timed()
+@CITY_POOL.cached()
+def load_price_sweep_evaluator(city):
+    """
+    Load the partial tree evaluator for a city's XGBoost model
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        PriceSweepEvaluator, or None if the booster isn't supported
+    """
+    booster = load_models(city)['xgboost']
+    try:
+        return PriceSweepEvaluator(booster)
+    except ValueError:
+        return None
+
+@timed()
+@CITY_POOL.cached()
+def load_feature_layouts(city):
+    """
+    Load the compiled feature layouts for a city's models
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        dict with xgboost and ols FeatureLayout objects
+    """
+    models = load_models(city)
+
+    ols_features = getattr(
+        models['ols'], 'feature_names_in_',
+        ['neighbourhood_encoded', 'minimum_nights', 'host_listings_count']
+    )
+
+    return {
+        'xgboost': FeatureLayout(models['xgboost'].feature_names),
+        # OLS stays float64 to match LinearRegression.predict
+        'ols': FeatureLayout(ols_features, dtype=np.float64)
+    }
+
+@timed()
+@CITY_POOL.cached()
 def load_vibe_data(city):
     """
     Load neighborhood vibe scores
@@ -111,13 +268,46 @@ def load_vibe_data(city):
 
     return vibes
 
-@st.cache_data
-def load_training_data(city):
+def compact_dtypes(df):
+    """
+    Downcast a DataFrame to compact dtypes
+
+    Floats become float32, integers the smallest integer type that holds
+    them, and string columns categoricals.
+
+    Args:
+        df: DataFrame to compact (modified in place)
+
+    Returns:
+        The same DataFrame
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_float_dtype(dtype):
+            df[col] = df[col].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_string_dtype(dtype) or dtype == object:
+            df[col] = df[col].astype('category')
+
+    return df
+
+@timed()
+@CITY_POOL.cached()
+def load_training_data(city, columns=tuple(TRAINING_COLUMNS), downcast=True):
     """
     Load training data for reference
 
+    Only the requested columns are read from the parquet file, and by
+    default they are downcast to compact dtypes. The frame is shared by
+    every session, so treat it as read-only.
+
     Args:
         city: City name (london, austin, nyc)
+        columns: Columns to read (None reads every column); columns the
+                 file doesn't have are skipped
+        downcast: Downcast floats to float32, ints to the smallest int type
+                  and strings to categoricals
 
     Returns:
         DataFrame with training features
@@ -125,9 +315,95 @@ def load_training_data(city):
     data_dir = BASE_DIR / f'data/{city}'
     train_file = data_dir / f'processed/features_{city}_train.parquet'
 
-    return pd.read_parquet(train_file)
+    if columns is not None:
+        available = set(pq.read_schema(train_file).names)
+        columns = [c for c in columns if c in available]
+
+    train_data = pd.read_parquet(train_file, columns=columns)
+    if downcast:
+        train_data = compact_dtypes(train_data)
+
+    with _training_memory_lock:
+        _training_memory[city] = {
+            'rows': len(train_data),
+            'columns': train_data.shape[1],
+            'bytes': int(train_data.memory_usage(deep=True).sum())
+        }
+
+    return train_data
+
+def get_training_data_memory():
+    """
+    Report the resident memory of each city's loaded training data
+
+    Returns:
+        dict of city -> {'rows', 'columns', 'bytes'} for cities currently
+        in the city pool
+    """
+    with _training_memory_lock:
+        return {city: dict(info) for city, info in _training_memory.items() if city in CITY_POOL}
+
+def get_city_pool_stats():
+    """
+    Get the city pool's per-city sizes and load / eviction / hit counters
+
+    Returns:
+        dict from CityModelPool.stats
+    """
+    return CITY_POOL.stats()
+
+def get_display_name(city, neighbourhood):
+    """
+    Get the dropdown label for a neighbourhood key
+
+    For Austin, zip codes become friendly names like "Downtown Austin (78701)"
+    For other cities, the name is used as-is
 
-@st.cache_data
+    Args:
+        city: City name
+        neighbourhood: Neighbourhood key as stored in the vibe data
+
+    Returns:
+        Display name
+    """
+    if city == 'austin':
+        name = AUSTIN_ZIP_TO_NAME.get(str(neighbourhood), f"Austin {neighbourhood}")
+        return f"{name} ({neighbourhood})"
+    return neighbourhood
+
+@timed()
+@CITY_POOL.cached()
+def load_vibe_index(city):
+    """
+    Build the immutable per-city vibe lookup index
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        dict (read-only) with:
+            records: neighbourhood key -> read-only vibe record
+            display_names: sorted tuple of dropdown labels
+            display_to_key / key_to_display: label <-> key maps
+    """
+    vibes = load_vibe_data(city)
+
+    records = {}
+    for record in vibes.to_dict('records'):
+        # First row wins for duplicated neighbourhoods
+        records.setdefault(record['neighbourhood'], MappingProxyType(record))
+
+    key_to_display = {key: get_display_name(city, key) for key in records}
+    display_to_key = {display: key for key, display in key_to_display.items()}
+
+    return MappingProxyType({
+        'records': MappingProxyType(records),
+        'display_names': tuple(sorted(display_to_key)),
+        'display_to_key': MappingProxyType(display_to_key),
+        'key_to_display': MappingProxyType(key_to_display)
+    })
+
+@timed()
 def get_neighborhoods(city):
     """
     Get list of neighborhoods for a city
@@ -141,20 +417,9 @@ def get_neighborhoods(city):
     Returns:
         Sorted list of neighborhood names
     """
-    vibes = load_vibe_data(city)
-    neighborhoods = vibes['neighbourhood'].unique().tolist()
-
-    if city == 'austin':
-        # Convert zip codes to friendly names with zip in parentheses
-        friendly_names = []
-        for zip_code in neighborhoods:
-            name = AUSTIN_ZIP_TO_NAME.get(str(zip_code), f"Austin {zip_code}")
-            friendly_names.append(f"{name} ({zip_code})")
-        return sorted(friendly_names)
-    else:
-        return sorted(neighborhoods)
+    return list(load_vibe_index(city)['display_names'])
 
-@st.cache_data
+@timed()
 def get_vibe_for_neighborhood(city, neighbourhood):
     """
     Get vibe scores for a specific neighborhood
@@ -166,19 +431,22 @@ def get_vibe_for_neighborhood(city, neighbourhood):
     Returns:
         dict with vibe scores
     """
-    vibes = load_vibe_data(city)
-    row = vibes[vibes['neighbourhood'] == neighbourhood]
+    record = load_vibe_index(city)['records'].get(neighbourhood)
 
-    if len(row) == 0:
+    if record is None:
         return None
 
-    return row.iloc[0].to_dict()
+    return dict(record)
 
-@st.cache_data
+@timed()
 def get_average_price(city, neighbourhood=None, property_type=None):
     """
     Get average price for a city, optionally filtered by neighborhood and property type
 
+    Served from the precomputed median price table: the median of the
+    listings matching the given filters, or the city-wide median when
+    none match.
+
     Args:
         city: City name
         neighbourhood: Optional neighborhood name
@@ -187,27 +455,8 @@ def get_average_price(city, neighbourhood=None, property_type=None):
     Returns:
         Average price as integer
     """
-    train_data = load_training_data(city)
-
-    # Filter data
-    filtered = train_data.copy()
-
-    if neighbourhood and 'neighbourhood' in filtered.columns:
-        filtered = filtered[filtered['neighbourhood'] == neighbourhood]
-
-    if property_type and 'room_type' in filtered.columns:
-        filtered = filtered[filtered['room_type'] == property_type]
-
-    # Get median price (more robust than mean)
-    if 'price_clean' in filtered.columns and len(filtered) > 0:
-        return int(filtered['price_clean'].median())
-
-    # Fallback to overall median if no matches
-    if 'price_clean' in train_data.columns:
-        return int(train_data['price_clean'].median())
-
-    # Final fallback
-    return 100
+    # Median price (more robust than mean)
+    return int(lookup_median_price(load_price_table(city), neighbourhood, property_type))
 
 def extract_zip_from_friendly_name(friendly_name):
     """
@@ -219,7 +468,6 @@ def extract_zip_from_friendly_name(friendly_name):
     Returns:
         Zip code as string, or original name if no match
     """
-    import re
     match = re.search(r'\((\d{5})\)$', friendly_name)
     if match:
         return match.group(1)
@@ -239,6 +487,10 @@ def parse_neighbourhood_for_city(city, neighbourhood_display):
     Returns:
         Actual neighbourhood value for backend queries
     """
+    key = load_vibe_index(city)['display_to_key'].get(neighbourhood_display)
+    if key is not None:
+        return key
+
     if city == 'austin':
         return extract_zip_from_friendly_name(neighbourhood_display)
     return neighbourhood_display
@@ -0,0 +1,169 @@
+"""
+PORTFOLIO PRICING
+
+Prices a whole portfolio of listings (e.g. an uploaded CSV) at once.
+
+prepare_portfolio() turns the raw table into model-ready property rows:
+neighbourhoods are resolved to the city's vibe keys, vibe scores are
+filled in and missing features take the app form's defaults. Rows that
+can't be priced keep an error message instead of failing the upload.
+price_portfolio() then runs the vectorized k-NN and revenue optimization
+in chunks, reporting progress after each one.
+
+This module has no Streamlit dependency so the pricing service and the
+scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import numpy as np
+import pandas as pd
+
+from .model_loader import load_vibe_index, load_price_table, parse_neighbourhood_for_city
+from .knn_index import KNN_FEATURES
+from .price_table import lookup_median_price
+from .predictor import get_knn_price_recommendations_batch, optimize_prices_batch, PORTFOLIO_CURVE_POINTS
+from .latency import timed
+
+# Rows priced per vectorized call (progress is reported after each chunk)
+PORTFOLIO_CHUNK_ROWS = 100
+MAX_PORTFOLIO_ROWS = 5000
+
+# Features taken from the city's vibe table
+VIBE_FEATURES = [f for f in KNN_FEATURES if f.endswith('_score')]
+
+# Defaults of the app's property form for features a listing leaves out
+LISTING_DEFAULTS = {
+    'room_type': 'Entire home/apt',
+    'accommodates': 2,
+    'bedrooms': 1,
+    'bathrooms': 1.0,
+    'beds': 1,
+    'amenities_count': 48,
+    'minimum_nights': 1,
+    'maximum_nights': 30,
+    'neighbourhood_encoded': 0,
+    'host_listings_count': 1
+}
+
+# Columns read from an uploaded portfolio (neighbourhood is required)
+PORTFOLIO_COLUMNS = ['neighbourhood', 'room_type', 'accommodates', 'bedrooms', 'bathrooms', 'beds',
+                     'amenities_count', 'current_price']
+
+# Columns price_portfolio adds after the input columns
+KNN_COLUMNS = ['knn_price_low', 'knn_price_mid', 'knn_price_high', 'knn_n_neighbors', 'knn_confidence']
+OPTIMIZATION_COLUMNS = ['current_occ', 'current_revenue', 'optimal_price', 'optimal_occ', 'optimal_revenue',
+                        'revenue_lift_pct', 'price_change_pct', 'safe_band_low', 'safe_band_high', 'has_safe_band']
+RESULT_COLUMNS = KNN_COLUMNS + OPTIMIZATION_COLUMNS
+
+NUMERIC_COLUMNS = ['accommodates', 'bedrooms', 'bathrooms', 'beds', 'amenities_count', 'current_price',
+                   'minimum_nights', 'maximum_nights', 'host_listings_count']
+
+def prepare_portfolio(city, listings):
+    """
+    Build model-ready property rows from a portfolio table
+
+    Args:
+        city: City name
+        listings: DataFrame with a neighbourhood column (key or dropdown
+                  label) and optionally the other PORTFOLIO_COLUMNS
+
+    Returns:
+        Tuple of (properties, errors): properties is a DataFrame with the
+        input columns plus filled features and current_price; errors is a
+        Series of messages (None for rows that can be priced)
+    """
+    if 'neighbourhood' not in listings.columns:
+        raise ValueError("The portfolio needs a 'neighbourhood' column")
+    if len(listings) > MAX_PORTFOLIO_ROWS:
+        raise ValueError(f"At most {MAX_PORTFOLIO_ROWS:,} listings per portfolio")
+
+    properties = listings.copy()
+    errors = pd.Series([None] * len(properties), index=properties.index, dtype=object)
+
+    for col, default in LISTING_DEFAULTS.items():
+        if col not in properties.columns:
+            properties[col] = default
+        else:
+            properties[col] = properties[col].where(properties[col].notna(), default)
+    if 'property_type' not in properties.columns:
+        properties['property_type'] = properties['room_type']
+
+    for col in NUMERIC_COLUMNS:
+        if col in properties.columns:
+            values = pd.to_numeric(properties[col], errors='coerce')
+            bad = values.isna() & properties[col].notna()
+            errors[bad & errors.isna()] = f"Non-numeric {col}"
+            properties[col] = values
+
+    # Resolve neighbourhoods once per distinct value, then fill vibe scores
+    records = load_vibe_index(city)['records']
+    raw_names = properties['neighbourhood'].fillna('').astype(str).str.strip()
+    keys = {name: parse_neighbourhood_for_city(city, name) for name in raw_names.unique()}
+    properties['neighbourhood'] = raw_names.map(keys)
+
+    known = properties['neighbourhood'].isin(records.keys())
+    errors[~known & errors.isna()] = 'Unknown neighbourhood: ' + raw_names[~known & errors.isna()]
+    for feature in VIBE_FEATURES:
+        properties[feature] = properties['neighbourhood'].map(
+            lambda key: records[key][feature] if key in records else np.nan
+        ).astype(np.float64)
+
+    # Missing current prices use the app's median pre-fill
+    if 'current_price' not in properties.columns:
+        properties['current_price'] = np.nan
+    missing_price = properties['current_price'].isna() & errors.isna()
+    if missing_price.any():
+        table = load_price_table(city)
+        properties.loc[missing_price, 'current_price'] = [
+            int(lookup_median_price(table, n, r))
+            for n, r in zip(properties.loc[missing_price, 'neighbourhood'], properties.loc[missing_price, 'room_type'])
+        ]
+    errors[(properties['current_price'] <= 0) & errors.isna()] = 'current_price must be positive'
+
+    return properties, errors
+
+@timed()
+def price_portfolio(city, listings, n_points=PORTFOLIO_CURVE_POINTS, chunk_rows=PORTFOLIO_CHUNK_ROWS, progress=None):
+    """
+    Price every listing of a portfolio (k-NN band + revenue-optimal price)
+
+    Args:
+        city: City name
+        listings: Raw portfolio DataFrame (see prepare_portfolio)
+        n_points: Extra evenly spaced prices per listing between 0.5x and 2.0x
+        chunk_rows: Listings per vectorized call
+        progress: Optional callback(done, total) called after each chunk
+
+    Returns:
+        DataFrame with the input columns followed by the k-NN band, the
+        optimization summary (RESULT_COLUMNS, empty for rows that can't be
+        priced) and an error column, one row per listing. Input columns
+        named like a result column are kept with an '_input' suffix.
+    """
+    properties, errors = prepare_portfolio(city, listings)
+    valid = properties[errors.isna()]
+
+    results = []
+    for start in range(0, len(valid), chunk_rows):
+        chunk = valid.iloc[start:start + chunk_rows]
+
+        knn = pd.DataFrame(get_knn_price_recommendations_batch(city, chunk), index=chunk.index)
+        knn = knn.reindex(columns=['price_low', 'price_mid', 'price_high', 'n_neighbors', 'confidence'])
+        knn.columns = ['knn_' + c for c in knn.columns]
+
+        optimization = optimize_prices_batch(city, chunk, chunk['current_price'].to_numpy(), n_points=n_points)
+        results.append(pd.concat([knn, optimization.drop(columns='current_price')], axis=1))
+
+        if progress is not None:
+            progress(min(start + chunk_rows, len(valid)), len(valid))
+
+    priced = pd.concat(results) if results else pd.DataFrame(index=valid.index)
+    priced = priced.reindex(columns=RESULT_COLUMNS)
+
+    output = listings.rename(columns={col: f'{col}_input' for col in RESULT_COLUMNS if col in listings.columns})
+    output['neighbourhood_key'] = properties['neighbourhood']
+    output['current_price'] = properties['current_price']
+    output = output.join(priced)
+    output['error'] = errors
+    return output
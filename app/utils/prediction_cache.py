@@ -0,0 +1,179 @@
+"""
+PREDICTION CACHE
+
+Bounded, thread-safe LRU cache shared by every session of the app.
+
+Many hosts in the same neighbourhood submit near-identical properties, so
+predictions are keyed on a canonical, quantized tuple of the property
+features rather than on the raw dict: key order doesn't matter and float
+noise below the quantization step maps to the same entry. Entries are
+evicted least-recently-used first once either the entry cap or the byte
+cap is reached.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Decimal places kept for float features in cache keys
+KEY_DECIMALS = 4
+
+def _quantize(value, decimals=KEY_DECIMALS):
+    """Map one feature value to a hashable, canonical form"""
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if value != value:  # NaN
+            return 'nan'
+        return round(value, decimals) + 0.0  # + 0.0 folds -0.0 into 0.0
+    if isinstance(value, str) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_quantize(v, decimals) for v in value)
+    return repr(value)
+
+def make_cache_key(namespace, city, property_data, *extra, decimals=KEY_DECIMALS):
+    """
+    Build a canonical cache key for a prediction
+
+    Args:
+        namespace: Which prediction this is (e.g. 'knn', 'occupancy')
+        city: City name
+        property_data: dict with property features
+        *extra: Additional hashable key parts (e.g. bytes of a price grid)
+        decimals: Decimal places kept for float features
+
+    Returns:
+        Hashable tuple
+    """
+    features = tuple(sorted((str(k), _quantize(v, decimals)) for k, v in property_data.items()))
+    return (namespace, city, features) + extra
+
+def estimate_nbytes(value):
+    """
+    Approximate memory held by a cached value
+
+    Args:
+        value: numpy array, DataFrame, dict/list of those, or a scalar
+
+    Returns:
+        Size in bytes
+    """
+    if isinstance(value, np.ndarray):
+        # getsizeof only includes the data buffer when the array owns it
+        return sys.getsizeof(value) + (0 if value.flags.owndata else value.nbytes)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+class PredictionCache:
+    """
+    LRU cache with an entry cap, a byte cap and hit/miss counters
+
+    Args:
+        max_entries: Maximum number of cached predictions
+        max_bytes: Maximum approximate memory held by cached values
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Look up a cached value and mark it most recently used
+
+        Args:
+            key: Key from make_cache_key
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Store a value, evicting least recently used entries to stay within the caps
+
+        Values larger than max_bytes on their own are not cached.
+
+        Args:
+            key: Key from make_cache_key
+            value: Value to cache (treat as read-only once stored)
+        """
+        nbytes = estimate_nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+
+            while len(self._entries) > self.max_entries or self._nbytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict with entries, bytes, hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._nbytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -6,14 +6,27 @@ Handles k-NN price recommendations and XGBoost occupancy predictions
 Author: Vibe-Aware Pricing Team
 """
 
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+import sys
+import warnings
 import numpy as np
 import pandas as pd
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import StandardScaler
 from pathlib import Path
-import streamlit as st
 
-from .model_loader import load_models, load_training_data, load_vibe_data, get_vibe_for_neighborhood
+from .model_loader import (
+    load_models,
+    load_knn_index,
+    load_price_splits,
+    load_price_sweep_evaluator,
+    load_feature_layouts,
+    load_vibe_data,
+    get_vibe_for_neighborhood
+)
+from .knn_index import query_high_demand_comps, query_high_demand_comps_batch
+from .prediction_cache import PredictionCache, make_cache_key
+from .latency import timed, current_trace, use_trace
+from .price_splits import get_price_breakpoints
 
 BASE_DIR = Path(__file__).parent.parent.parent
 
@@ -21,6 +34,24 @@ BASE_DIR = Path(__file__).parent.parent.parent
 K_NEIGHBORS = 25
 MIN_HIGH_DEMAND = 5
 OCC_THRESHOLD = 0.75
+PRICE_TESTER_STEP = 5
+PORTFOLIO_CURVE_POINTS = 0  # Portfolio grids are the price split edges only (see optimize_prices_batch)
+PREDICTION_CACHE_MAX_ENTRIES = 4096
+PREDICTION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+ANALYZE_MAX_WORKERS = 4
+
+# Headless callers (app/pricing_service.py) set this so occupancy errors
+# reach the client instead of the 0.5 fallback
+RAISE_PREDICTION_ERRORS = False
+
+logger = logging.getLogger(__name__)
+
+# Shared by every session in this server process
+PREDICTION_CACHE = PredictionCache(PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_MAX_BYTES)
+
+# Runs the k-NN stage of analyze_property next to the XGBoost stages
+ANALYZE_POOL = ThreadPoolExecutor(max_workers=ANALYZE_MAX_WORKERS, thread_name_prefix='analyze')
 
 def build_feature_vector(city, property_data, vibe_scores):
     """
@@ -43,7 +74,25 @@ def build_feature_vector(city, property_data, vibe_scores):
 
     return features
 
-@st.cache_data
+def _report_prediction_error(message):
+    """Log a prediction error, and show it on the page when running under Streamlit"""
+    logger.error(message)
+
+    # Only the Streamlit app has it loaded; never import it from here
+    streamlit = sys.modules.get('streamlit')
+    if streamlit is not None:
+        streamlit.error(message)
+
+def get_prediction_cache_stats():
+    """
+    Get hit/miss counters and memory use of the shared prediction cache
+
+    Returns:
+        dict from PredictionCache.stats()
+    """
+    return PREDICTION_CACHE.stats()
+
+@timed()
 def get_knn_price_recommendation(city, property_data):
     """
     Get k-NN price band recommendation
@@ -56,75 +105,118 @@ def get_knn_price_recommendation(city, property_data):
     Returns:
         dict with recommendation results
     """
-    # Load training data
-    train_data = load_training_data(city)
-
-    # Features for k-NN (match original script)
-    knn_features = [
-        'bedrooms', 'bathrooms', 'accommodates', 'amenities_count',
-        'vibe_score', 'walkability_score', 'safety_score', 'nightlife_score',
-        'quietness_score', 'family_friendly_score', 'local_authentic_score',
-        'convenience_score', 'food_scene_score', 'liveliness_score', 'charm_score'
-    ]
+    cache_key = make_cache_key('knn', city, property_data)
+    cached = PREDICTION_CACHE.get(cache_key)
+    if cached is not None:
+        return dict(cached)
 
-    # Filter train data to required features + price + high_demand
-    available_features = [f for f in knn_features if f in train_data.columns]
-    train_subset = train_data[available_features + ['price_clean', 'high_demand_90']].dropna()
+    result = _compute_knn_price_recommendation(city, property_data)
+    PREDICTION_CACHE.put(cache_key, result)
+    return dict(result)
 
-    # Build input feature vector
-    input_features = {}
-    for feat in available_features:
-        if feat in property_data:
-            input_features[feat] = property_data[feat]
-        else:
-            # Use median from training data
-            input_features[feat] = train_subset[feat].median()
+def _compute_knn_price_recommendation(city, property_data):
+    """Run the k-NN comps query behind get_knn_price_recommendation"""
+    # Load pre-fitted comps index
+    index = load_knn_index(city)
 
-    # Create DataFrame for input
-    input_df = pd.DataFrame([input_features])
+    # High-demand comps among the K nearest listings, topped up to MIN_HIGH_DEMAND
+    distances, positions, n_within = query_high_demand_comps(index, property_data, K_NEIGHBORS, MIN_HIGH_DEMAND)
+    n_comps = len(positions)
 
-    # Fit scaler on training data
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(train_subset[available_features])
-    X_input_scaled = scaler.transform(input_df[available_features])
-
-    # Fit k-NN
-    knn = NearestNeighbors(n_neighbors=K_NEIGHBORS, metric='euclidean')
-    knn.fit(X_train_scaled)
-
-    # Find neighbors
-    distances, indices = knn.kneighbors(X_input_scaled)
+    if n_comps >= MIN_HIGH_DEMAND:
+        # Calculate price band
+        prices = pd.Series(index['prices'][positions])
+        band = (prices.quantile(0.25), prices.median(), prices.quantile(0.75))
+        return _knn_result(n_comps, n_within, band, distances.mean(), distances.max())
 
-    # Get neighbor data
-    neighbors = train_subset.iloc[indices[0]]
+    return _knn_result(n_comps, n_within)
 
-    # Filter to high-demand neighbors
-    high_demand_neighbors = neighbors[neighbors['high_demand_90'] == 1]
+def _knn_result(n_comps, n_within, band=None, avg_distance=None, max_distance=None):
+    """Build the k-NN recommendation dict from a comps search"""
+    if n_comps >= MIN_HIGH_DEMAND:
+        p25, p50, p75 = band
 
-    if len(high_demand_neighbors) >= MIN_HIGH_DEMAND:
-        # Calculate price band
-        prices = high_demand_neighbors['price_clean']
-        p25 = prices.quantile(0.25)
-        p50 = prices.median()
-        p75 = prices.quantile(0.75)
+        if n_within >= MIN_HIGH_DEMAND:
+            confidence = 'High' if n_within >= 10 else 'Medium'
+            message = f"Based on {n_comps} similar high-demand properties"
+        else:
+            # Sparse area: the band uses the nearest high-demand listings beyond the K closest
+            confidence = 'Low'
+            message = (f"Based on the {n_comps} nearest high-demand properties "
+                       f"(only {n_within} among the {K_NEIGHBORS} most similar listings)")
 
         return {
             'success': True,
             'price_low': p25,
             'price_mid': p50,
             'price_high': p75,
-            'n_neighbors': len(high_demand_neighbors),
-            'confidence': 'High' if len(high_demand_neighbors) >= 10 else 'Medium',
-            'message': f"Based on {len(high_demand_neighbors)} similar high-demand properties"
+            'n_neighbors': n_comps,
+            'n_within_k': n_within,
+            'avg_distance': float(avg_distance),
+            'max_distance': float(max_distance),
+            'confidence': confidence,
+            'message': message
         }
     else:
         return {
             'success': False,
-            'n_neighbors': len(high_demand_neighbors),
+            'n_neighbors': n_comps,
             'confidence': 'Low',
-            'message': f"Only {len(high_demand_neighbors)} similar high-demand properties found (need {MIN_HIGH_DEMAND}+)"
+            'message': f"Only {n_comps} similar high-demand properties found (need {MIN_HIGH_DEMAND}+)"
         }
 
+@timed()
+def get_knn_price_recommendations_batch(city, properties):
+    """
+    Get k-NN price bands for many properties with one comps search
+
+    Args:
+        city: City name
+        properties: DataFrame with one property per row (k-NN feature columns)
+
+    Returns:
+        List of dicts like get_knn_price_recommendation, one per row
+    """
+    index = load_knn_index(city)
+    distances, positions, counts, n_within = query_high_demand_comps_batch(
+        index, properties, K_NEIGHBORS, MIN_HIGH_DEMAND
+    )
+
+    # Pad each row's comps with NaN past its count, then reduce row-wise
+    is_comp = np.arange(positions.shape[1])[None, :] < counts[:, None]
+    prices = np.where(is_comp, index['prices'][positions].astype(np.float64), np.nan)
+    distances = np.where(is_comp, distances, np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # rows without comps
+        bands = np.nanquantile(prices, [0.25, 0.5, 0.75], axis=1).T if len(properties) and prices.shape[1] else None
+        avg_distances = np.nanmean(distances, axis=1) if distances.shape[1] else None
+        max_distances = np.nanmax(distances, axis=1) if distances.shape[1] else None
+
+    return [
+        _knn_result(int(counts[i]), int(n_within[i]), bands[i], avg_distances[i], max_distances[i])
+        if counts[i] >= MIN_HIGH_DEMAND else _knn_result(int(counts[i]), int(n_within[i]))
+        for i in range(len(properties))
+    ]
+
+@timed()
+def predict_stage1_price(city, property_data):
+    """
+    Predict the OLS stage-1 price used to compute epsilon_price
+
+    Args:
+        city: City name
+        property_data: dict with property features
+
+    Returns:
+        Predicted price from the control-function OLS model
+    """
+    ols_model = load_models(city)['ols']
+
+    # Linear model: apply the coefficients directly to the compiled feature row
+    x_ols = load_feature_layouts(city)['ols'].fill(property_data)
+    return float(ols_model.intercept_ + x_ols @ ols_model.coef_)
+
 def predict_occupancy(city, property_data, price):
     """
     Predict occupancy at a given price using XGBoost
@@ -137,40 +229,80 @@ def predict_occupancy(city, property_data, price):
     Returns:
         Predicted occupancy rate (0-1)
     """
+    return predict_occupancy_batch(city, property_data, [price])[0]
+
+@timed()
+def predict_occupancy_batch(city, property_data, prices):
+    """
+    Predict occupancy at many prices with a single XGBoost call
+
+    Only price_clean, price_per_person and epsilon_price change with price,
+    so the feature row is built once. The partial tree evaluator resolves
+    its non-price branches once and walks only the price splits per point;
+    otherwise the row is tiled across the grid for one XGBoost call.
+    Results are served from the shared prediction cache when the same
+    property and price grid were seen before.
+
+    Args:
+        city: City name
+        property_data: dict with property features
+        prices: Sequence of prices to test
+
+    Returns:
+        numpy array of predicted occupancy rates (0-1), one per price
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    cache_key = make_cache_key('occupancy', city, property_data, prices.tobytes())
+    cached = PREDICTION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.copy()
+
     try:
         # Load models
         models = load_models(city)
-        xgb_model = models['xgboost']
-        ols_model = models['ols']
-
-        # Build full feature vector
-        features = property_data.copy()
-        features['price_clean'] = price
-        features['price_per_person'] = price / max(features.get('accommodates', 1), 1)
+        booster = models['xgboost']
+        layout = load_feature_layouts(city)['xgboost']
 
-        # Compute epsilon_price using OLS
-        ols_features = ['neighbourhood_encoded', 'minimum_nights', 'host_listings_count']
-        X_ols = pd.DataFrame([{f: features.get(f, 0) for f in ols_features}])
-        price_pred = ols_model.predict(X_ols)[0]
-        features['epsilon_price'] = price - price_pred
+        # Compute epsilon_price using OLS (stage-1 inputs don't depend on price)
+        price_pred = predict_stage1_price(city, property_data)
 
-        # Get expected features for XGBoost
-        expected_features = xgb_model.get_booster().feature_names
+        # Write feature vector into the preallocated buffer in model column order
+        base_row = layout.fill(property_data)
 
-        # Build feature vector in correct order
-        X = pd.DataFrame([{f: features.get(f, 0) for f in expected_features}])
+        price_columns = {
+            'price_clean': prices,
+            'price_per_person': prices / max(property_data.get('accommodates', 1), 1),
+            'epsilon_price': prices - price_pred
+        }
 
-        # Predict
-        occ_pred = xgb_model.predict(X)[0]
+        evaluator = load_price_sweep_evaluator(city)
+        if evaluator is not None:
+            # Predict with partial tree evaluation
+            price_matrix = np.column_stack([price_columns[f] for f in evaluator.price_features])
+            occ_pred = evaluator.sweep(base_row, price_matrix)
+        else:
+            # Build the full price grid x features matrix and predict in one call
+            X = layout.tile(base_row, len(prices))
+            for name, values in price_columns.items():
+                if name in layout.index:
+                    X[:, layout.index[name]] = values
+            occ_pred = booster.inplace_predict(X)
 
         # Clip to [0, 1]
-        return np.clip(occ_pred, 0, 1)
+        occ_pred = np.clip(occ_pred, 0, 1)
 
     except Exception as e:
-        st.error(f"Prediction error: {e}")
-        return 0.5  # Default fallback
+        if RAISE_PREDICTION_ERRORS:
+            raise
+        _report_prediction_error(f"Prediction error: {e}")
+        return np.full(len(prices), 0.5)  # Default fallback (not cached)
+
+    PREDICTION_CACHE.put(cache_key, occ_pred)
+    return occ_pred.copy()
 
-def generate_revenue_curve(city, property_data, current_price, n_points=50):
+@timed()
+def generate_revenue_curve(city, property_data, current_price, n_points=50, breakpoints=False):
     """
     Generate revenue curve by testing multiple price points
 
@@ -178,7 +310,10 @@ def generate_revenue_curve(city, property_data, current_price, n_points=50):
         city: City name
         property_data: dict with property features
         current_price: Current/baseline price
-        n_points: Number of price points to test
+        n_points: Number of evenly spaced price points to test
+        breakpoints: Also test the price just below every XGBoost price split,
+                     which makes the optimal price exact (n_points=0 tests
+                     only those edges plus the range ends and current price)
 
     Returns:
         DataFrame with price, occupancy, revenue columns
@@ -188,19 +323,23 @@ def generate_revenue_curve(city, property_data, current_price, n_points=50):
     max_price = current_price * 2.0
     prices = np.linspace(min_price, max_price, n_points)
 
-    results = []
-
-    for price in prices:
-        occ = predict_occupancy(city, property_data, price)
-        revenue = price * occ * 30  # Monthly revenue
+    if breakpoints:
+        # Occupancy is flat between split edges, so revenue peaks at one of them
+        price_transforms = {
+            'price_clean': (1.0, 0.0),
+            'price_per_person': (1.0 / max(property_data.get('accommodates', 1), 1), 0.0),
+            'epsilon_price': (1.0, -predict_stage1_price(city, property_data))
+        }
+        edges = get_price_breakpoints(load_price_splits(city), price_transforms, min_price, max_price)
+        prices = np.unique(np.concatenate([prices, edges, [current_price]]))
 
-        results.append({
-            'price': price,
-            'occupancy': occ,
-            'monthly_revenue': revenue
-        })
+    occupancies = predict_occupancy_batch(city, property_data, prices)
 
-    df = pd.DataFrame(results)
+    df = pd.DataFrame({
+        'price': prices,
+        'occupancy': occupancies,
+        'monthly_revenue': prices * occupancies * 30  # Monthly revenue
+    })
 
     # Find optimal price
     optimal_idx = df['monthly_revenue'].idxmax()
@@ -217,6 +356,104 @@ def generate_revenue_curve(city, property_data, current_price, n_points=50):
 
     return df
 
+@timed()
+def build_price_tester_curve(city, property_data, min_price, max_price, step=PRICE_TESTER_STEP, extra_prices=()):
+    """
+    Precompute occupancy at every price the Interactive Price Tester can select
+
+    Args:
+        city: City name
+        property_data: dict with property features
+        min_price: Slider minimum
+        max_price: Slider maximum
+        step: Slider step
+        extra_prices: Additional prices to include (e.g. the slider's default value)
+
+    Returns:
+        dict with compact float32 'prices' (sorted) and 'occupancy' arrays
+    """
+    prices = np.union1d(np.arange(min_price, max_price + 1, step), [max_price, *extra_prices])
+    occupancies = predict_occupancy_batch(city, property_data, prices)
+
+    return {
+        'prices': prices.astype(np.float32),
+        'occupancy': occupancies.astype(np.float32)
+    }
+
+def _run_in_trace(trace, func, *args):
+    """Run func on a worker thread, recording its stages into the caller's trace"""
+    with use_trace(trace):
+        return func(*args)
+
+@timed()
+def analyze_property(city, property_data, current_price, tester_min_price, tester_max_price, n_points=200):
+    """
+    Run the full Analyze Property flow with the k-NN and XGBoost stages in parallel
+
+    The k-NN comps query runs on ANALYZE_POOL while this thread computes
+    the revenue curve, the optimization summary and the price tester curve
+    (which needs the optimal price), so the wall time is close to the slower
+    of the two branches rather than their sum. Anything that may draw
+    Streamlit output (the occupancy error fallback) stays on this thread.
+
+    Args:
+        city: City name
+        property_data: dict with property features
+        current_price: Current/baseline price
+        tester_min_price: Interactive Price Tester slider minimum
+        tester_max_price: Interactive Price Tester slider maximum
+        n_points: Evenly spaced price points in the revenue curve
+
+    Returns:
+        dict with knn_result, revenue_curve, optimization and price_tester_curve
+    """
+    knn_future = ANALYZE_POOL.submit(_run_in_trace, current_trace(), get_knn_price_recommendation, city, property_data)
+
+    try:
+        revenue_curve = generate_revenue_curve(city, property_data, current_price, n_points=n_points, breakpoints=True)
+        optimization = get_optimization_summary(revenue_curve, current_price)
+
+        # Precompute the price tester so slider moves are a lookup, not a model call
+        price_tester_curve = build_price_tester_curve(
+            city, property_data, tester_min_price, tester_max_price,
+            extra_prices=[int(optimization['optimal_price'])]
+        )
+    finally:
+        # Don't leave the k-NN worker writing into a trace that's finished
+        wait([knn_future])
+
+    return {
+        'knn_result': knn_future.result(),
+        'revenue_curve': revenue_curve,
+        'optimization': optimization,
+        'price_tester_curve': price_tester_curve
+    }
+
+def lookup_price_tester_occupancy(curve, price):
+    """
+    Answer a price tester query from a precomputed curve
+
+    Args:
+        curve: dict from build_price_tester_curve (or None)
+        price: Price selected on the slider
+
+    Returns:
+        Occupancy rate (0-1), or None if the price is outside the curve
+    """
+    if curve is None or len(curve['prices']) == 0:
+        return None
+
+    prices = curve['prices']
+    if price < prices[0] or price > prices[-1]:
+        return None
+
+    i = np.searchsorted(prices, price)
+    if prices[i] == price:
+        return float(curve['occupancy'][i])
+
+    return float(np.interp(price, prices, curve['occupancy']))
+
+@timed()
 def get_optimization_summary(revenue_curve, current_price):
     """
     Get summary of revenue optimization
@@ -255,3 +492,108 @@ def get_optimization_summary(revenue_curve, current_price):
     }
 
     return summary
+
+@timed()
+def optimize_prices_batch(city, properties, current_prices, n_points=PORTFOLIO_CURVE_POINTS):
+    """
+    Revenue-optimal prices for many properties with a single XGBoost call
+
+    Every property is priced on the same grid as the single-property path
+    (generate_revenue_curve with breakpoints=True): the price just below
+    every XGBoost price split in 0.5x-2.0x of its current price, the range
+    ends and the current price itself, so the optimal price is exact and
+    the current metrics match. The grids differ in length, so they are
+    flattened and all properties x prices go through the booster in one
+    inplace_predict call instead of one revenue curve per property.
+
+    Args:
+        city: City name
+        properties: DataFrame with one property per row (model feature columns)
+        current_prices: Current price per row
+        n_points: Extra evenly spaced prices between 0.5x and 2.0x (they don't
+                  change the optimum, only the resolution of the curve)
+
+    Returns:
+        DataFrame with the get_optimization_summary fields, one row per property
+    """
+    models = load_models(city)
+    booster, ols_model = models['xgboost'], models['ols']
+    layouts = load_feature_layouts(city)
+    layout = layouts['xgboost']
+    thresholds = load_price_splits(city)
+
+    current_prices = np.asarray(current_prices, dtype=np.float64)
+    n_rows = len(properties)
+
+    # Price-independent features once per property, then repeated per grid point
+    base = layout.fill_frame(properties)
+    stage1_price = ols_model.intercept_ + layouts['ols'].fill_frame(properties) @ ols_model.coef_
+    accommodates = np.maximum(base[:, layout.index['accommodates']], 1) if 'accommodates' in layout.index else np.ones(n_rows)
+
+    grids = []
+    for current_price, per_person, stage1 in zip(current_prices, accommodates, stage1_price):
+        min_price, max_price = current_price * 0.5, current_price * 2.0
+        price_transforms = {
+            'price_clean': (1.0, 0.0),
+            'price_per_person': (1.0 / per_person, 0.0),
+            'epsilon_price': (1.0, -stage1)
+        }
+        edges = get_price_breakpoints(thresholds, price_transforms, min_price, max_price)
+        grids.append(np.unique(np.concatenate([np.linspace(min_price, max_price, n_points), edges, [current_price]])))
+
+    lengths = np.array([len(grid) for grid in grids], dtype=np.int64)
+    starts = np.r_[0, np.cumsum(lengths)[:-1]]
+    row_of = np.repeat(np.arange(n_rows), lengths)
+    prices = np.concatenate(grids) if grids else np.zeros(0)
+
+    price_columns = {
+        'price_clean': prices,
+        'price_per_person': prices / accommodates[row_of],
+        'epsilon_price': prices - stage1_price[row_of]
+    }
+
+    X = base[row_of]
+    for name, values in price_columns.items():
+        if name in layout.index:
+            X[:, layout.index[name]] = values
+
+    occupancy = np.clip(booster.inplace_predict(X), 0, 1) if len(X) else np.zeros(0)
+    revenue = prices * occupancy * 30
+
+    if n_rows == 0:
+        best = current = np.zeros(0, dtype=np.int64)
+        safe_band_low = safe_band_high = np.zeros(0)
+        has_safe_band = np.zeros(0, dtype=bool)
+    else:
+        # First price reaching each row's maximum revenue (as idxmax does)
+        at_max = np.flatnonzero(revenue == np.maximum.reduceat(revenue, starts)[row_of])
+        best = at_max[np.unique(row_of[at_max], return_index=True)[1]]
+        current = starts + np.array([np.searchsorted(grid, price) for grid, price in zip(grids, current_prices)])
+
+        # Safe band: price range where occupancy stays above the threshold
+        is_safe = occupancy >= OCC_THRESHOLD
+        has_safe_band = np.logical_or.reduceat(is_safe, starts)
+        safe_band_low = np.where(has_safe_band, np.minimum.reduceat(np.where(is_safe, prices, np.inf), starts), np.nan)
+        safe_band_high = np.where(has_safe_band, np.maximum.reduceat(np.where(is_safe, prices, -np.inf), starts), np.nan)
+
+    current_revenue = revenue[current]
+
+    # Lift is undefined at zero current revenue
+    with np.errstate(divide='ignore', invalid='ignore'):
+        revenue_lift_pct = np.where(
+            current_revenue > 0, (revenue[best] - current_revenue) / current_revenue * 100, np.nan
+        )
+
+    return pd.DataFrame({
+        'current_price': current_prices,
+        'current_occ': occupancy[current],
+        'current_revenue': current_revenue,
+        'optimal_price': prices[best],
+        'optimal_occ': occupancy[best],
+        'optimal_revenue': revenue[best],
+        'revenue_lift_pct': revenue_lift_pct,
+        'price_change_pct': (prices[best] - current_prices) / current_prices * 100,
+        'safe_band_low': safe_band_low,
+        'safe_band_high': safe_band_high,
+        'has_safe_band': has_safe_band
+    }, index=properties.index)
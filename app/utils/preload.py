@@ -0,0 +1,144 @@
+"""
+BACKGROUND MODEL PRELOAD
+
+Warms every city's cached loaders in background threads at app startup.
+
+The city pool is filled lazily, so without a warm-up the first visitor
+to each city page pays for loading the models, the vibe table and the
+k-NN index. CityPreloader runs the same cached loaders the pages use, one
+thread per city, so the pool is already filled when a city page asks. The threads run without a
+ScriptRunContext, so no spinners are drawn and the latency traces of
+user sessions are untouched (Streamlit's "missing ScriptRunContext"
+warning is filtered out for these threads only).
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import logging
+import threading
+import time
+
+import streamlit as st
+
+from .model_loader import (
+    load_models,
+    load_feature_layouts,
+    load_price_splits,
+    load_price_sweep_evaluator,
+    load_vibe_index,
+    load_knn_index,
+    load_price_table
+)
+
+APP_CITIES = ('london', 'austin', 'nyc')
+
+# Loaders warmed for each city, in dependency order
+WARMUP_LOADERS = (
+    load_models,
+    load_feature_layouts,
+    load_price_splits,
+    load_price_sweep_evaluator,
+    load_vibe_index,
+    load_knn_index,
+    load_price_table
+)
+
+# Per-city warm-up states
+COLD, WARMING, WARM, FAILED = 'cold', 'warming', 'warm', 'failed'
+
+PRELOAD_THREAD_PREFIX = 'preload-'
+
+class _PreloadThreadFilter(logging.Filter):
+    """Drop the expected missing-ScriptRunContext warnings from preload threads"""
+
+    def filter(self, record):
+        return not record.threadName.startswith(PRELOAD_THREAD_PREFIX)
+
+logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(_PreloadThreadFilter())
+
+class CityPreloader:
+    """
+    Background warm-up of the cached loaders for several cities
+
+    Args:
+        cities: City names to warm
+        loaders: Cached loader functions taking the city name
+    """
+
+    def __init__(self, cities=APP_CITIES, loaders=WARMUP_LOADERS):
+        self.cities = tuple(cities)
+        self.loaders = tuple(loaders)
+        self._lock = threading.Lock()
+        self._status = {
+            city: {'state': COLD, 'seconds': None, 'errors': {}} for city in self.cities
+        }
+        self._threads = []
+
+    def start(self):
+        """
+        Start one daemon thread per city (no-op if already started)
+
+        Returns:
+            self
+        """
+        with self._lock:
+            if self._threads:
+                return self
+            self._threads = [
+                threading.Thread(target=self._warm, args=(city,), name=f'{PRELOAD_THREAD_PREFIX}{city}', daemon=True)
+                for city in self.cities
+            ]
+
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _warm(self, city):
+        """Run every loader for one city, recording failures instead of raising"""
+        with self._lock:
+            self._status[city]['state'] = WARMING
+
+        start = time.perf_counter()
+        errors = {}
+        for loader in self.loaders:
+            try:
+                loader(city)
+            except Exception as e:
+                errors[loader.__name__] = str(e)
+
+        with self._lock:
+            self._status[city].update(
+                state=FAILED if errors else WARM,
+                seconds=time.perf_counter() - start,
+                errors=errors
+            )
+
+    def status(self):
+        """
+        Get the warm-up state of every city
+
+        Returns:
+            dict of city -> {'state', 'seconds', 'errors'}
+        """
+        with self._lock:
+            return {city: dict(status, errors=dict(status['errors'])) for city, status in self._status.items()}
+
+    def is_done(self):
+        """
+        Check whether every city has finished warming (or failed)
+
+        Returns:
+            True when no city is cold or warming
+        """
+        with self._lock:
+            return all(status['state'] in (WARM, FAILED) for status in self._status.values())
+
+@st.cache_resource(show_spinner=False)
+def start_city_preload():
+    """
+    Start the background warm-up once per server process
+
+    Returns:
+        The shared, started CityPreloader
+    """
+    return CityPreloader().start()
@@ -0,0 +1,93 @@
+"""
+PRICE SPLIT BREAKPOINTS
+
+Extracts the price-dependent split thresholds from the XGBoost occupancy
+booster and maps them back to nightly prices.
+
+The occupancy model is a tree ensemble, so for a fixed listing the
+predicted occupancy is piecewise constant in price: it can only change
+where price_clean, price_per_person or epsilon_price crosses a split
+threshold. Revenue (price x occupancy) therefore peaks just below one of
+those breakpoints (or at the top of the price range), and evaluating
+only those edges gives the exact revenue-maximizing price on the range.
+
+This module has no Streamlit dependency so scripts/05_revenue_optimizer.py
+can import it directly.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import json
+
+import numpy as np
+
+# Booster features that move with the nightly price
+PRICE_FEATURES = ['price_clean', 'price_per_person', 'epsilon_price']
+
+# XGBoost compares float32 features with `value < threshold`; stepping a few
+# float32 ulps below the threshold lands on the left (lower-price) branch
+EDGE_ULPS = 4
+
+def get_split_thresholds(booster, features=PRICE_FEATURES):
+    """
+    Collect the split thresholds used for each feature in a booster
+
+    Args:
+        booster: xgboost.Booster
+        features: Feature names to collect thresholds for
+
+    Returns:
+        dict of feature name -> sorted unique float32 thresholds
+    """
+    model = json.loads(booster.save_raw('json'))
+    trees = model['learner']['gradient_booster']['model']['trees']
+
+    feature_names = booster.feature_names
+    wanted = {feature_names.index(f): f for f in features if f in feature_names}
+    collected = {f: [] for f in wanted.values()}
+
+    for tree in trees:
+        left_children = np.asarray(tree['left_children'])
+        split_indices = np.asarray(tree['split_indices'])
+        split_conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_split = left_children != -1
+
+        for feature_idx, name in wanted.items():
+            collected[name].append(split_conditions[is_split & (split_indices == feature_idx)])
+
+    return {
+        name: np.unique(np.concatenate(parts)) if parts else np.array([], dtype=np.float32)
+        for name, parts in collected.items()
+    }
+
+def get_price_breakpoints(thresholds, price_transforms, min_price, max_price):
+    """
+    Map split thresholds to the nightly prices worth evaluating
+
+    Each feature is an affine function of price: feature = price * scale + offset.
+    For every threshold the price just below it (the top of a flat occupancy
+    segment) is returned, together with both ends of the price range.
+
+    Args:
+        thresholds: dict from get_split_thresholds
+        price_transforms: dict of feature name -> (scale, offset)
+        min_price: Lowest price of the range
+        max_price: Highest price of the range
+
+    Returns:
+        Sorted numpy array of candidate prices within [min_price, max_price]
+    """
+    edges = [np.array([min_price, max_price], dtype=np.float64)]
+
+    for feature, (scale, offset) in price_transforms.items():
+        feature_thresholds = thresholds.get(feature)
+        if feature_thresholds is None or len(feature_thresholds) == 0 or scale <= 0:
+            continue
+
+        below = feature_thresholds - EDGE_ULPS * np.spacing(np.abs(feature_thresholds))
+        edges.append((below.astype(np.float64) - offset) / scale)
+
+    prices = np.concatenate(edges)
+    prices = prices[(prices >= min_price) & (prices <= max_price)]
+
+    return np.unique(prices)
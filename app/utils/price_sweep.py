@@ -0,0 +1,230 @@
+"""
+PRICE SWEEP EVALUATOR
+
+Partial tree evaluation of the XGBoost occupancy booster for price sweeps.
+
+When only price changes (price_clean, price_per_person, epsilon_price),
+every split on a non-price feature goes the same way at every grid point.
+The evaluator resolves those branches once per listing: each node is
+short-circuited to the next price split (or leaf) it leads to, trees that
+never reach a price split fold into a constant, and only the remaining
+price sub-paths are walked for each grid point. A resolved listing keeps
+just those sub-paths (the price splits and leaves it can still reach, in
+a compact local table), not full-size copies of the forest's node arrays.
+
+Results match booster.predict up to float rounding in the leaf sum.
+
+This module has no Streamlit dependency so scripts/05_revenue_optimizer.py
+can import it directly.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .price_splits import PRICE_FEATURES
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = ['reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror']
+
+# Resolved listings kept per evaluator (repeat sweeps of the same listing),
+# capped by count and by the bytes of their sub-path tables
+MAX_RESOLVED_LISTINGS = 128
+MAX_RESOLVED_BYTES = 16 * 1024 * 1024
+
+class PriceSweepEvaluator:
+    """
+    Evaluate a booster across a price grid for one listing at a time
+
+    Args:
+        booster: xgboost.Booster (gbtree) trained with an identity objective
+        price_features: Features that vary with price in the sweep
+    """
+
+    def __init__(self, booster, price_features=PRICE_FEATURES):
+        model = json.loads(booster.save_raw('json'))
+        learner = model['learner']
+
+        objective = learner['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for price sweeps: {objective}")
+
+        self.feature_names = booster.feature_names
+        self.price_features = [f for f in price_features if f in self.feature_names]
+        self.price_feature_indices = [self.feature_names.index(f) for f in self.price_features]
+        self.base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+
+        # Flatten all trees into one node table with global child indices
+        left, right, split_indices, split_conditions, default_left, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in learner['gradient_booster']['model']['trees']:
+            tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+            tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+            left.append(np.where(tree_left == -1, -1, tree_left + offset))
+            right.append(np.where(tree_right == -1, -1, tree_right + offset))
+            split_indices.append(np.asarray(tree['split_indices'], dtype=np.int64))
+            split_conditions.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            roots.append(offset)
+            offset += len(tree_left)
+
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.split_indices = np.concatenate(split_indices)
+        # For leaves, split_conditions holds the leaf value
+        self.split_conditions = np.concatenate(split_conditions)
+        self.default_left = np.concatenate(default_left)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.is_leaf = self.left == -1
+
+        # Position of each split's feature in price_features (-1 = not a price split)
+        slot_by_feature = np.full(len(self.feature_names), -1, dtype=np.int64)
+        for slot, name in enumerate(self.price_features):
+            slot_by_feature[self.feature_names.index(name)] = slot
+        self.price_slot = np.where(self.is_leaf, -1, slot_by_feature[self.split_indices])
+        self.is_price_split = self.price_slot >= 0
+
+        self._resolved = OrderedDict()  # key -> (resolved, nbytes)
+        self._resolved_nbytes = 0
+        self._lock = threading.Lock()
+
+    def cache_nbytes(self):
+        """
+        Get the bytes held by the resolved-listing cache
+
+        Returns:
+            Total size of the cached sub-path tables
+        """
+        return self._resolved_nbytes
+
+    def resolve(self, row):
+        """
+        Resolve every non-price branch for one listing
+
+        Args:
+            row: Feature values in booster.feature_names order (NaN = missing);
+                 values of the price features are ignored
+
+        Returns:
+            dict for predict(): bias, plus the reachable price splits and
+            leaves as a local node table (roots, left, right, slot,
+            condition, default_left, is_leaf)
+        """
+        row = np.asarray(row, dtype=np.float32)
+        nodes = np.arange(len(self.left))
+
+        # Direction taken by each non-price split for this listing
+        values = row[self.split_indices]
+        go_left = np.where(np.isnan(values), self.default_left, values < self.split_conditions)
+        fixed_child = np.where(go_left, self.left, self.right)
+
+        # Price splits and leaves are stopping points; jump pointers until stable
+        skip = np.where(self.is_leaf | self.is_price_split, nodes, fixed_child)
+        while True:
+            jumped = skip[skip]
+            if np.array_equal(jumped, skip):
+                break
+            skip = jumped
+
+        root_targets = skip[self.roots]
+        reaches_leaf = self.is_leaf[root_targets]
+        bias = self.base_score + float(self.split_conditions[root_targets[reaches_leaf]].sum(dtype=np.float64))
+
+        # Price splits and leaves reachable from the remaining roots
+        reachable = np.zeros(len(self.left), dtype=bool)
+        frontier = np.unique(root_targets[~reaches_leaf])
+        while len(frontier) > 0:
+            reachable[frontier] = True
+            splits = frontier[self.is_price_split[frontier]]
+            children = np.unique(np.concatenate([skip[self.left[splits]], skip[self.right[splits]]]))
+            frontier = children[~reachable[children]]
+
+        kept = np.flatnonzero(reachable)
+        kept_leaf = self.is_leaf[kept]
+        local = lambda targets: np.searchsorted(kept, targets).astype(np.int32)
+        left = np.where(kept_leaf, 0, local(skip[np.where(kept_leaf, kept, self.left[kept])]))
+        right = np.where(kept_leaf, 0, local(skip[np.where(kept_leaf, kept, self.right[kept])]))
+
+        return {
+            'bias': bias,
+            'roots': local(root_targets[~reaches_leaf]),
+            'left': left.astype(np.int32),
+            'right': right.astype(np.int32),
+            'slot': np.maximum(self.price_slot[kept], 0).astype(np.int8),
+            'condition': self.split_conditions[kept],
+            'default_left': self.default_left[kept],
+            'is_leaf': kept_leaf,
+        }
+
+    def predict(self, resolved, price_matrix):
+        """
+        Predict across a price grid for a resolved listing
+
+        Args:
+            resolved: dict from resolve()
+            price_matrix: (n_points, len(price_features)) array of price feature values
+
+        Returns:
+            numpy array of n_points raw predictions
+        """
+        X = np.asarray(price_matrix, dtype=np.float32).reshape(-1, len(self.price_features))
+        n_points = X.shape[0]
+
+        if len(resolved['roots']) == 0:
+            return np.full(n_points, resolved['bias'])
+
+        rows = np.arange(n_points)[:, None]
+        node = np.broadcast_to(resolved['roots'], (n_points, len(resolved['roots']))).copy()
+        is_leaf, condition = resolved['is_leaf'], resolved['condition']
+
+        while True:
+            is_open = ~is_leaf[node]
+            if not is_open.any():
+                break
+
+            values = X[rows, resolved['slot'][node]]
+            go_left = np.where(np.isnan(values), resolved['default_left'][node], values < condition[node])
+            child = np.where(go_left, resolved['left'][node], resolved['right'][node])
+            node = np.where(is_open, child, node)
+
+        return resolved['bias'] + condition[node].sum(axis=1, dtype=np.float64)
+
+    def sweep(self, row, price_matrix):
+        """
+        Resolve (or reuse) a listing and predict across a price grid
+
+        Args:
+            row: Feature values in booster.feature_names order
+            price_matrix: (n_points, len(price_features)) array of price feature values
+
+        Returns:
+            numpy array of n_points raw predictions
+        """
+        row = np.array(row, dtype=np.float32)
+        row[self.price_feature_indices] = 0
+        key = row.tobytes()
+
+        with self._lock:
+            entry = self._resolved.get(key)
+            if entry is not None:
+                self._resolved.move_to_end(key)
+
+        if entry is not None:
+            resolved = entry[0]
+        else:
+            resolved = self.resolve(row)
+            nbytes = sum(value.nbytes for value in resolved.values() if isinstance(value, np.ndarray))
+            with self._lock:
+                if key not in self._resolved:
+                    self._resolved[key] = (resolved, nbytes)
+                    self._resolved_nbytes += nbytes
+                while self._resolved and (
+                    len(self._resolved) > MAX_RESOLVED_LISTINGS or self._resolved_nbytes > MAX_RESOLVED_BYTES
+                ):
+                    self._resolved_nbytes -= self._resolved.popitem(last=False)[1][1]
+
+        return self.predict(resolved, price_matrix)
@@ -0,0 +1,147 @@
+"""
+MEDIAN PRICE TABLE
+
+Precomputed median nightly prices used to pre-fill the price input.
+
+The table holds the median price for every neighbourhood, every room type
+and every (neighbourhood, room_type) pair seen in the training data, plus
+the overall median, so a lookup is a couple of dict gets instead of
+filtering the training frame on every render.
+
+This module has no Streamlit dependency so the build script in
+scripts/03b_build_knn_index.py can import it directly.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent.parent
+
+# Bump whenever the table layout changes
+PRICE_TABLE_VERSION = 1
+
+# Returned when the training data has no usable prices at all
+DEFAULT_PRICE = 100
+
+def get_price_table_path(city):
+    """
+    Get the artifact path for a city's median price table
+
+    Args:
+        city: City name (london, austin, nyc)
+
+    Returns:
+        Path to the versioned table file in data/{city}/models/
+    """
+    return BASE_DIR / f'data/{city}/models/median_price_table_v{PRICE_TABLE_VERSION}.json'
+
+def _medians(grouped):
+    """Median price per group, skipping groups without a price"""
+    medians = grouped.median().dropna()
+    return {str(key): float(value) for key, value in medians.items()}
+
+def build_price_table(train_data):
+    """
+    Compute median prices by neighbourhood, room type and both
+
+    Args:
+        train_data: DataFrame with price_clean and optionally neighbourhood / room_type
+
+    Returns:
+        dict with version, overall, neighbourhood, room_type and pair
+        (neighbourhood -> room_type -> median) entries
+    """
+    prices = train_data['price_clean'].astype(np.float64)
+    overall = prices.median()
+
+    table = {
+        'version': PRICE_TABLE_VERSION,
+        'overall': None if np.isnan(overall) else float(overall),
+        'neighbourhood': {},
+        'room_type': {},
+        'pair': {}
+    }
+
+    has_neighbourhood = 'neighbourhood' in train_data.columns
+    has_room_type = 'room_type' in train_data.columns
+
+    if has_neighbourhood:
+        table['neighbourhood'] = _medians(prices.groupby(train_data['neighbourhood'].astype(str)))
+
+    if has_room_type:
+        table['room_type'] = _medians(prices.groupby(train_data['room_type'].astype(str)))
+
+    if has_neighbourhood and has_room_type:
+        keys = [train_data['neighbourhood'].astype(str), train_data['room_type'].astype(str)]
+        for (neighbourhood, room_type), value in prices.groupby(keys).median().dropna().items():
+            table['pair'].setdefault(neighbourhood, {})[room_type] = float(value)
+
+    return table
+
+def save_price_table(table, path):
+    """
+    Write a median price table to disk as JSON
+
+    Args:
+        table: dict from build_price_table
+        path: Destination path
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(table, f, indent=2, sort_keys=True)
+
+def read_price_table(path):
+    """
+    Load a median price table if a compatible one exists
+
+    Args:
+        path: Path to the JSON artifact
+
+    Returns:
+        dict from build_price_table, or None if the file is missing or stale
+    """
+    if not path.exists():
+        return None
+
+    with open(path, 'r') as f:
+        table = json.load(f)
+
+    if table.get('version') != PRICE_TABLE_VERSION:
+        return None
+
+    return table
+
+def lookup_median_price(table, neighbourhood=None, room_type=None):
+    """
+    Look up the median price for a neighbourhood and/or room type
+
+    Matches filtering the training data on whichever of the two are given:
+    the (neighbourhood, room_type) pair, the neighbourhood or the room type
+    median, falling back to the overall median when that filter has no
+    priced listings.
+
+    Args:
+        table: dict from build_price_table
+        neighbourhood: Optional neighbourhood name
+        room_type: Optional room type
+
+    Returns:
+        Median price as a float
+    """
+    if neighbourhood and room_type:
+        value = table['pair'].get(str(neighbourhood), {}).get(str(room_type))
+    elif neighbourhood:
+        value = table['neighbourhood'].get(str(neighbourhood))
+    elif room_type:
+        value = table['room_type'].get(str(room_type))
+    else:
+        value = None
+
+    if value is None:
+        value = table['overall']
+
+    return float(DEFAULT_PRICE) if value is None else value
@@ -0,0 +1,146 @@
+"""
+REVIEW SENTIMENT SCORING
+
+Review-level sentiment for the vibe score generator (scripts/01_*).
+
+TextBlob scores one document at a time in pure Python, so scoring a full
+review corpus on one core takes hours. score_sentiments() splits the
+reviews into chunks, scores the chunks in a process pool and returns the
+results in the original review order, so the output is identical to the
+serial loop for any worker count.
+
+Two backends are available: 'textblob' (the reference) and 'lexicon',
+the vectorized LexiconSentiment engine, which scores each chunk with a
+few array operations instead of one TextBlob per review.
+
+The pool uses the fork start method: the vibe scripts run top to bottom
+without a __main__ guard, so spawned workers would re-run the whole
+script. Where fork isn't available (Windows, macOS) scoring stays serial.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from textblob import TextBlob
+
+from .lexicon_sentiment import LexiconSentiment
+
+SENTIMENT_BACKENDS = ('textblob', 'lexicon')
+
+# Reviews per worker task: large enough to amortize the inter-process
+# transfer, small enough to keep every worker busy until the end
+SENTIMENT_CHUNK_SIZE = 2000
+
+def analyze_sentiment_textblob(text):
+    """
+    Analyze sentiment using TextBlob
+
+    Args:
+        text: Review text
+
+    Returns:
+        dict with polarity (-1 to 1) and subjectivity (0 to 1); both are 0
+        for empty or unparseable text
+    """
+    if not text or len(str(text).strip()) < 5:
+        return {'polarity': 0, 'subjectivity': 0}
+    try:
+        blob = TextBlob(str(text))
+        return {
+            'polarity': blob.sentiment.polarity,
+            'subjectivity': blob.sentiment.subjectivity
+        }
+    except Exception:
+        return {'polarity': 0, 'subjectivity': 0}
+
+@functools.lru_cache(maxsize=1)
+def get_lexicon_engine():
+    """
+    Get the process-wide LexiconSentiment (built on first use)
+
+    Returns:
+        LexiconSentiment
+    """
+    return LexiconSentiment()
+
+def _score_chunk(texts, backend='textblob'):
+    """Score one chunk of reviews (runs in a worker process)"""
+    if backend == 'lexicon':
+        polarity, subjectivity = get_lexicon_engine().score(texts)
+        # Same cut-off as analyze_sentiment_textblob for empty / tiny texts
+        too_short = np.array([not text or len(str(text).strip()) < 5 for text in texts], dtype=bool)
+        return np.column_stack([np.where(too_short, 0.0, polarity), np.where(too_short, 0.0, subjectivity)])
+
+    scores = np.zeros((len(texts), 2))
+    for i, text in enumerate(texts):
+        sentiment = analyze_sentiment_textblob(text)
+        scores[i] = sentiment['polarity'], sentiment['subjectivity']
+    return scores
+
+def get_sentiment_workers(n_workers=None):
+    """
+    Resolve the number of sentiment worker processes
+
+    Args:
+        n_workers: Requested workers (None or -1 for all CPU cores)
+
+    Returns:
+        Worker count, 1 if the fork start method isn't available
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return 1
+    if n_workers is None or n_workers < 1:
+        return os.cpu_count() or 1
+    return n_workers
+
+def score_sentiments(texts, n_workers=None, chunk_size=SENTIMENT_CHUNK_SIZE, progress=None, backend='textblob'):
+    """
+    Score the sentiment of many reviews in parallel chunks
+
+    Args:
+        texts: Sequence of review texts
+        n_workers: Worker processes (None or -1 for all CPU cores, 1 for serial)
+        chunk_size: Reviews per worker task
+        progress: Optional callback(done, total) called as chunks finish, in order
+        backend: 'textblob' or 'lexicon' (see SENTIMENT_BACKENDS)
+
+    Returns:
+        Tuple of (polarity, subjectivity) arrays in the order of texts
+    """
+    if backend not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{backend}', expected one of {SENTIMENT_BACKENDS}")
+
+    texts = list(texts)
+    score_chunk = functools.partial(_score_chunk, backend=backend)
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    n_workers = min(get_sentiment_workers(n_workers), max(len(chunks), 1))
+
+    results = []
+    done = 0
+
+    def collect(scores):
+        nonlocal done
+        results.append(scores)
+        done += len(scores)
+        if progress is not None:
+            progress(done, len(texts))
+
+    if n_workers == 1:
+        for chunk in chunks:
+            collect(score_chunk(chunk))
+    else:
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+            # map() yields in submission order, so the merge keeps review order
+            for scores in pool.map(score_chunk, chunks):
+                collect(scores)
+
+    scores = np.concatenate(results) if results else np.zeros((0, 2))
+    return scores[:, 0], scores[:, 1]
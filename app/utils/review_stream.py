@@ -0,0 +1,173 @@
+"""
+STREAMING REVIEW INGESTION
+
+Chunked reading and sampling of an Inside Airbnb reviews dump for the
+vibe score generator (scripts/01_*, steps 1-3).
+
+Loading reviews_{City}.csv whole holds millions of rows of free text in
+memory before anything is filtered or sampled. stream_review_sample()
+reads the file in chunks with only the columns the pipeline uses, joins
+each chunk to the listing -> neighbourhood map, cleans it, drops short
+reviews and keeps a reservoir sample, so peak memory depends on the
+chunk and sample sizes, not on the size of the file.
+
+The reservoir gives every review a uniform random key and keeps the
+reviews with the smallest keys, overall or per stratum (e.g. per
+neighbourhood). That is a uniform sample without replacement, and a
+review whose key can't make the reservoir any more is dropped before it
+is cleaned.
+
+This module has no Streamlit dependency so the scripts can import it.
+
+Author: Vibe-Aware Pricing Team
+"""
+
+import numpy as np
+import pandas as pd
+
+# Rows read from the reviews file per chunk
+REVIEW_CHUNK_ROWS = 200000
+
+_KEY = '_reservoir_key'
+
+class ReviewReservoir:
+    """
+    Reservoir sample of DataFrame rows, optionally stratified
+
+    Args:
+        sample_size: Rows kept overall (None keeps every row), or per
+                     stratum when stratify_by is set
+        stratify_by: Optional column; each of its values keeps its own
+                     reservoir of sample_size rows
+        random_seed: Seed of the row keys
+    """
+
+    def __init__(self, sample_size, stratify_by=None, random_seed=42):
+        self.sample_size = sample_size
+        self.stratify_by = stratify_by
+        self._rng = np.random.default_rng(random_seed)
+        self._sample = None
+
+    def candidates(self, chunk):
+        """
+        Key a chunk and drop the rows that can no longer enter the sample
+
+        Args:
+            chunk: DataFrame of new rows
+
+        Returns:
+            The remaining rows with their keys
+        """
+        chunk = chunk.assign(**{_KEY: self._rng.random(len(chunk))})
+        if self.sample_size is None or self._sample is None:
+            return chunk
+
+        if self.stratify_by is None:
+            if len(self._sample) < self.sample_size:
+                return chunk
+            return chunk[chunk[_KEY] < self._sample[_KEY].max()]
+
+        # Per stratum: only full strata have a cut-off key
+        keys = self._sample.groupby(self.stratify_by)[_KEY].agg(['max', 'size'])
+        cutoff = keys.loc[keys['size'] >= self.sample_size, 'max']
+        return chunk[chunk[_KEY] < chunk[self.stratify_by].map(cutoff).fillna(np.inf)]
+
+    def add(self, rows):
+        """
+        Merge keyed rows (from candidates) into the sample
+
+        Args:
+            rows: DataFrame returned by candidates(), possibly filtered further
+        """
+        sample = rows if self._sample is None else pd.concat([self._sample, rows])
+        if self.sample_size is not None:
+            if self.stratify_by is None:
+                sample = sample.nsmallest(self.sample_size, _KEY)
+            else:
+                rank = sample.groupby(self.stratify_by)[_KEY].rank(method='first')
+                sample = sample[rank <= self.sample_size]
+        self._sample = sample
+
+    def __len__(self):
+        return 0 if self._sample is None else len(self._sample)
+
+    def sample(self):
+        """
+        Get the sampled rows in file order
+
+        Returns:
+            DataFrame without the key column
+        """
+        if self._sample is None:
+            return pd.DataFrame()
+        return self._sample.sort_index().drop(columns=_KEY)
+
+def detect_review_columns(reviews_file, text_candidates):
+    """
+    Find the review text column from the file header only
+
+    Args:
+        reviews_file: Path to the reviews CSV
+        text_candidates: Candidate text column names, in order of preference
+
+    Returns:
+        Tuple of (text column, columns to read)
+    """
+    header = pd.read_csv(reviews_file, nrows=0).columns
+    text_column = next((col for col in text_candidates if col in header), None)
+    if not text_column:
+        raise ValueError(f"No review text column found. Expected one of: {text_candidates}")
+    usecols = ['listing_id', text_column] + (['date'] if 'date' in header else [])
+    return text_column, usecols
+
+def stream_review_sample(reviews_file, listing_neighbourhoods, text_column, preprocess, sample_size, min_words=5,
+                         stratify_by=None, chunk_rows=REVIEW_CHUNK_ROWS, usecols=None, random_seed=42,
+                         progress=None):
+    """
+    Read, join, clean and sample a reviews file chunk by chunk
+
+    Args:
+        reviews_file: Path to the reviews CSV
+        listing_neighbourhoods: Series mapping listing id -> neighbourhood
+        text_column: Review text column
+        preprocess: Function cleaning one review text
+        sample_size: Reviews kept (per stratum if stratify_by is set; None keeps all)
+        min_words: Minimum words of a cleaned review
+        stratify_by: Optional column to stratify the sample on (e.g. 'neighbourhood')
+        chunk_rows: Rows read per chunk
+        usecols: Columns to read (defaults to listing_id and the text column)
+        random_seed: Sampling seed
+        progress: Optional callback(stats) called after each chunk
+
+    Returns:
+        Tuple of (sample, stats): sample has the read columns plus
+        neighbourhood, text_clean and word_count; stats has rows_read,
+        rows_joined (with text and neighbourhood), rows_cleaned (cleaned
+        before the reservoir could reject them), chunks and peak_rows (most
+        rows held at once)
+    """
+    reservoir = ReviewReservoir(sample_size, stratify_by, random_seed)
+    stats = {'rows_read': 0, 'rows_joined': 0, 'rows_cleaned': 0, 'chunks': 0, 'peak_rows': 0}
+
+    reader = pd.read_csv(reviews_file, usecols=usecols or ['listing_id', text_column], chunksize=chunk_rows)
+    for chunk in reader:
+        stats['rows_read'] += len(chunk)
+        stats['chunks'] += 1
+        stats['peak_rows'] = max(stats['peak_rows'], len(reservoir) + len(chunk))
+
+        chunk = chunk.assign(neighbourhood=chunk['listing_id'].map(listing_neighbourhoods))
+        chunk = chunk[chunk[text_column].notna() & chunk['neighbourhood'].notna()]
+        stats['rows_joined'] += len(chunk)
+
+        chunk = reservoir.candidates(chunk)
+        stats['rows_cleaned'] += len(chunk)
+        chunk = chunk.assign(text_clean=chunk[text_column].apply(preprocess))
+        chunk = chunk.assign(word_count=chunk['text_clean'].str.split().str.len())
+        chunk = chunk[chunk['word_count'] >= min_words]
+
+        reservoir.add(chunk)
+
+        if progress is not None:
+            progress(stats)
+
+    return reservoir.sample(), stats
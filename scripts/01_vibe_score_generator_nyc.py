@@ -20,14 +20,30 @@ from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation, NMF
 from sklearn.preprocessing import StandardScaler
 from pathlib import Path
+import sys
+import time
+
+# Review sentiment scoring is shared with the other vibe scripts
+sys.path.append(str(Path(__file__).parent.parent / 'app'))
+from utils.review_sentiment import score_sentiments, get_sentiment_workers, get_lexicon_engine
+from utils.lexicon_sentiment import compare_with_textblob
+from utils.aspect_extraction import AspectMatcher, extract_aspect_sentiments, WINDOW_POLARITY_CACHE
+from utils.review_stream import detect_review_columns, stream_review_sample
 
 # ============================================================================
 # CONFIGURATION - NYC
 # ============================================================================
 
 CITY = 'nyc'  # Fixed for NYC
-SAMPLE_SIZE = 100000
+SAMPLE_SIZE = 100000  # None = all reviews
 RANDOM_SEED = 42
+SENTIMENT_WORKERS = -1  # Processes for sentiment scoring (-1 = all CPU cores, 1 = serial)
+SENTIMENT_CHUNK_SIZE = 2000  # Reviews per sentiment worker task
+SENTIMENT_BACKEND = 'textblob'  # 'textblob' or 'lexicon' (vectorized, ~15x faster per core on a synthetic Austin run)
+LEXICON_VALIDATION_SAMPLE = 1000  # Reviews also scored with TextBlob to report the lexicon backend's agreement
+STREAM_REVIEWS = False  # Read reviews in chunks into a reservoir sample (bounded memory for London / NYC dumps)
+REVIEW_CHUNK_ROWS = 200000  # Reviews read per chunk when streaming
+STRATIFY_SAMPLE = False  # Streaming only: split SAMPLE_SIZE evenly across neighborhoods
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
@@ -54,12 +70,22 @@ print()
 print("[1/9] Loading datasets...")
 
 listings = pd.read_csv(LISTINGS_FILE)
-reviews = pd.read_csv(REVIEWS_FILE)
 neighborhoods = pd.read_csv(NEIGHBORHOODS_FILE)
+text_col_candidates = ['comments', 'review', 'text', 'review_text', 'comment']
+
+if STREAM_REVIEWS:
+    # Only the header is read here; steps 2-3 stream the rows
+    reviews = None
+    text_column, review_columns = detect_review_columns(REVIEWS_FILE, text_col_candidates)
+else:
+    reviews = pd.read_csv(REVIEWS_FILE)
 
 print(f"\n  Datasets loaded:")
 print(f"    Listings:       {len(listings):,} records")
-print(f"    Reviews:        {len(reviews):,} records")
+if STREAM_REVIEWS:
+    print(f"    Reviews:        streamed in chunks of {REVIEW_CHUNK_ROWS:,} rows (columns: {', '.join(review_columns)})")
+else:
+    print(f"    Reviews:        {len(reviews):,} records")
 print(f"    Neighborhoods:  {len(neighborhoods):,} unique areas")
 
 # Auto-detect neighborhood column
@@ -72,22 +98,23 @@ else:
     listing_neighborhood_col = neighborhood_cols[0]
 
 # Find review text column
-text_col_candidates = ['comments', 'review', 'text', 'review_text', 'comment']
-text_column = None
-for col in text_col_candidates:
-    if col in reviews.columns:
-        text_column = col
-        break
+if not STREAM_REVIEWS:
+    text_column = None
+    for col in text_col_candidates:
+        if col in reviews.columns:
+            text_column = col
+            break
 
-if not text_column:
-    raise ValueError(f"No review text column found. Expected one of: {text_col_candidates}")
+    if not text_column:
+        raise ValueError(f"No review text column found. Expected one of: {text_col_candidates}")
 
 print(f"\n  Detected columns:")
 print(f"    Neighborhood: '{listing_neighborhood_col}'")
 print(f"    Review text: '{text_column}'")
 
-non_null = reviews[text_column].notna().sum()
-print(f"    Reviews with text: {non_null:,} ({non_null/len(reviews)*100:.1f}%)")
+if not STREAM_REVIEWS:
+    non_null = reviews[text_column].notna().sum()
+    print(f"    Reviews with text: {non_null:,} ({non_null/len(reviews)*100:.1f}%)")
 print()
 
 # ============================================================================
@@ -99,19 +126,64 @@ print("[2/9] Preparing data...")
 listid = listings[['id', listing_neighborhood_col]].copy()
 listid.rename(columns={listing_neighborhood_col: 'neighbourhood'}, inplace=True)
 
-joinedreviews = reviews.merge(
-    listid,
-    left_on='listing_id',
-    right_on='id',
-    how='left'
-)
+def preprocess_text(text):
+    """Clean text for NLP analysis"""
+    if pd.isna(text):
+        return ""
+    text = str(text).lower()
+    text = re.sub(r'http\S+|www\S+', '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\d+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+if STREAM_REVIEWS:
+    # Join, clean, filter and sample each chunk; only the reservoir is kept
+    if SAMPLE_SIZE is not None and STRATIFY_SAMPLE:
+        reservoir_size = max(1, SAMPLE_SIZE // max(listid['neighbourhood'].nunique(), 1))
+        print(f"  Streaming with a stratified reservoir: up to {reservoir_size:,} reviews per neighborhood")
+    else:
+        reservoir_size = SAMPLE_SIZE
+        print(f"  Streaming with a reservoir of {SAMPLE_SIZE:,} reviews" if SAMPLE_SIZE is not None
+              else "  Streaming all reviews (no sample limit)")
+
+    def report_stream_progress(stats):
+        print(f"    Read {stats['rows_read']:,} reviews ({stats['rows_joined']:,} with text + neighborhood)...")
+
+    sampledrev, stream_stats = stream_review_sample(
+        REVIEWS_FILE,
+        listid.drop_duplicates('id').set_index('id')['neighbourhood'],
+        text_column,
+        preprocess_text,
+        reservoir_size,
+        min_words=5,
+        stratify_by='neighbourhood' if STRATIFY_SAMPLE else None,
+        chunk_rows=REVIEW_CHUNK_ROWS,
+        usecols=review_columns,
+        random_seed=RANDOM_SEED,
+        progress=report_stream_progress
+    )
+
+    print(f"  ✓ Reviews read: {stream_stats['rows_read']:,} in {stream_stats['chunks']} chunks")
+    print(f"  ✓ Reviews with text + neighborhood: {stream_stats['rows_joined']:,}")
+    print(f"  ✓ Peak rows in memory: {stream_stats['peak_rows']:,}")
+    joinedreviews = sampledrev
+else:
+    joinedreviews = reviews.merge(
+        listid,
+        left_on='listing_id',
+        right_on='id',
+        how='left'
+    )
+
+    # Keep only reviews with text and neighborhood
+    joinedreviews = joinedreviews[
+        joinedreviews[text_column].notna() &
+        joinedreviews['neighbourhood'].notna()
+    ].copy()
 
-joinedreviews = joinedreviews[
-    joinedreviews[text_column].notna() &
-    joinedreviews['neighbourhood'].notna()
-].copy()
+    print(f"  ✓ Reviews with text + neighborhood: {len(joinedreviews):,}")
 
-print(f"  ✓ Reviews with text + neighborhood: {len(joinedreviews):,}")
 print(f"  ✓ Unique neighborhoods: {joinedreviews['neighbourhood'].nunique()}")
 
 if 'date' in joinedreviews.columns:
@@ -126,29 +198,26 @@ print()
 
 print("[3/9] Preprocessing review texts...")
 
-def preprocess_text(text):
-    if pd.isna(text):
-        return ""
-    text = str(text).lower()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\d+', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-joinedreviews['text_clean'] = joinedreviews[text_column].apply(preprocess_text)
-joinedreviews['word_count'] = joinedreviews['text_clean'].str.split().str.len()
-joinedreviews = joinedreviews[joinedreviews['word_count'] >= 5].copy()
+if STREAM_REVIEWS:
+    # Already cleaned and sampled chunk by chunk in step 2
+    print(f"  ✓ Cleaned {stream_stats['rows_cleaned']:,} reviews (the rest could no longer enter the sample)")
+    print(f"  ✓ Sampled {len(sampledrev):,} reviews (min 5 words)")
+    print(f"  ✓ Avg words per review: {sampledrev['word_count'].mean():.0f}")
+else:
+    joinedreviews['text_clean'] = joinedreviews[text_column].apply(preprocess_text)
+    joinedreviews['word_count'] = joinedreviews['text_clean'].str.split().str.len()
+    joinedreviews = joinedreviews[joinedreviews['word_count'] >= 5].copy()
 
-print(f"  ✓ Cleaned {len(joinedreviews):,} reviews (min 5 words)")
-print(f"  ✓ Avg words per review: {joinedreviews['word_count'].mean():.0f}")
+    print(f"  ✓ Cleaned {len(joinedreviews):,} reviews (min 5 words)")
+    print(f"  ✓ Avg words per review: {joinedreviews['word_count'].mean():.0f}")
 
-if len(joinedreviews) > SAMPLE_SIZE:
-    print(f"\n  Sampling {SAMPLE_SIZE:,} reviews for analysis...")
-    sampledrev = joinedreviews.sample(n=SAMPLE_SIZE, random_state=RANDOM_SEED)
-else:
-    sampledrev = joinedreviews.copy()
-    print(f"\n  Using all {len(sampledrev):,} reviews (below sample limit)")
+    # Sample for processing if needed
+    if SAMPLE_SIZE is not None and len(joinedreviews) > SAMPLE_SIZE:
+        print(f"\n  Sampling {SAMPLE_SIZE:,} reviews for analysis...")
+        sampledrev = joinedreviews.sample(n=SAMPLE_SIZE, random_state=RANDOM_SEED)
+    else:
+        sampledrev = joinedreviews.copy()
+        print(f"\n  Using all {len(sampledrev):,} reviews (below sample limit)")
 
 print()
 
@@ -162,42 +231,45 @@ print(f"\n  Sample of actual review text (first 3 reviews):")
 for i, text in enumerate(sampledrev[text_column].head(3)):
     print(f"    Review {i+1}: {str(text)[:100]}...")
 
-def analyze_sentiment_textblob(text):
-    if not text or len(str(text).strip()) < 5:
-        return {'polarity': 0, 'subjectivity': 0}
-    try:
-        blob = TextBlob(str(text))
-        return {
-            'polarity': blob.sentiment.polarity,
-            'subjectivity': blob.sentiment.subjectivity
-        }
-    except Exception as e:
-        return {'polarity': 0, 'subjectivity': 0}
-
-print("\n  Analyzing sentiment on original review text...")
-sentiments = []
-nzc = 0
-
-for i, row in sampledrev.iterrows():
-    sentiment = analyze_sentiment_textblob(row[text_column])
-    sentiments.append(sentiment)
-
-    if sentiment['polarity'] != 0 or sentiment['subjectivity'] != 0:
-        nzc += 1
-
-    if len(sentiments) % 10000 == 0:
-        print(f"    Analyzed {len(sentiments):,} reviews (non-zero: {nzc})...")
+n_workers = get_sentiment_workers(SENTIMENT_WORKERS)
+print(f"\n  Analyzing sentiment on original review text ({SENTIMENT_BACKEND} backend, {n_workers} workers, "
+      f"chunks of {SENTIMENT_CHUNK_SIZE:,})...")
+
+def report_sentiment_progress(done, total):
+    if done % 10000 < SENTIMENT_CHUNK_SIZE or done == total:
+        print(f"    Analyzed {done:,} / {total:,} reviews...")
+
+sentiment_start = time.perf_counter()
+polarity, subjectivity = score_sentiments(
+    sampledrev[text_column].tolist(),
+    n_workers=n_workers,
+    chunk_size=SENTIMENT_CHUNK_SIZE,
+    progress=report_sentiment_progress,
+    backend=SENTIMENT_BACKEND
+)
+sentiment_seconds = time.perf_counter() - sentiment_start
 
-sampledrev['sentiment_polarity'] = [s['polarity'] for s in sentiments]
-sampledrev['sentiment_subjectivity'] = [s['subjectivity'] for s in sentiments]
+sampledrev['sentiment_polarity'] = polarity
+sampledrev['sentiment_subjectivity'] = subjectivity
+nzc = int(((polarity != 0) | (subjectivity != 0)).sum())
 
 print(f"\n  ✓ Sentiment analysis complete")
-print(f"    Reviews analyzed: {len(sentiments):,}")
-print(f"    Non-zero sentiments: {nzc:,} ({nzc/len(sentiments)*100:.1f}%)")
+print(f"    Reviews analyzed: {len(sampledrev):,} in {sentiment_seconds:.1f}s ({len(sampledrev)/max(sentiment_seconds, 1e-9):,.0f} reviews/s)")
+print(f"    Non-zero sentiments: {nzc:,} ({nzc/len(sampledrev)*100:.1f}%)")
 print(f"    Mean polarity: {sampledrev['sentiment_polarity'].mean():.3f} (range: -1 to 1)")
 print(f"    Mean subjectivity: {sampledrev['sentiment_subjectivity'].mean():.3f} (range: 0 to 1)")
 print(f"    Polarity std: {sampledrev['sentiment_polarity'].std():.3f}")
 
+if SENTIMENT_BACKEND == 'lexicon':
+    agreement = compare_with_textblob(get_lexicon_engine(), sampledrev[text_column].tolist(), LEXICON_VALIDATION_SAMPLE,
+                                      RANDOM_SEED)
+    print(f"\n  Lexicon backend vs TextBlob ({agreement['n']:,} reviews):")
+    print(f"    Polarity correlation: {agreement['polarity_corr']:.3f} (MAE {agreement['polarity_mae']:.3f}, "
+          f"same sign {agreement['sign_agreement']:.1%})")
+    print(f"    Subjectivity correlation: {agreement['subjectivity_corr']:.3f}")
+    print(f"    Throughput: {agreement['lexicon_per_sec']:,.0f} vs {agreement['textblob_per_sec']:,.0f} reviews/s "
+          f"per core ({agreement['speedup']:.0f}x)")
+
 print(f"\n  Sentiment distribution:")
 print(f"    Positive (>0.1): {(sampledrev['sentiment_polarity'] > 0.1).sum():,}")
 print(f"    Neutral (-0.1 to 0.1): {((sampledrev['sentiment_polarity'] >= -0.1) & (sampledrev['sentiment_polarity'] <= 0.1)).sum():,}")
@@ -273,41 +345,24 @@ ASPECT_KEYWORDS = {
     'charm': ['charming', 'beautiful', 'lovely', 'pretty', 'ugly', 'attractive']
 }
 
-def extract_aspect_sentiment(text, keywords):
-    if not text:
-        return {'mentioned': False, 'sentiment': 0, 'count': 0}
-
-    text_lower = text.lower()
-    words = text_lower.split()
-
-    mentions = []
-    for i, word in enumerate(words):
-        if any(kw in word for kw in keywords):
-            start = max(0, i - 5)
-            end = min(len(words), i + 6)
-            context = ' '.join(words[start:end])
-            sentiment = TextBlob(context).sentiment.polarity
-            mentions.append(sentiment)
-
-    if mentions:
-        return {
-            'mentioned': True,
-            'sentiment': np.mean(mentions),
-            'count': len(mentions)
-        }
-    else:
-        return {'mentioned': False, 'sentiment': 0, 'count': 0}
-
-for aspect, keywords in ASPECT_KEYWORDS.items():
-    print(f"  Processing {aspect}...")
-    aspect_results = sampledrev['text_clean'].apply(
-        lambda x: extract_aspect_sentiment(x, keywords)
-    )
-
-    sampledrev[f'{aspect}_mentioned'] = [r['mentioned'] for r in aspect_results]
-    sampledrev[f'{aspect}_sentiment'] = [r['sentiment'] for r in aspect_results]
-    sampledrev[f'{aspect}_count'] = [r['count'] for r in aspect_results]
+# One pass per review finds the mentions of every aspect at once
+aspect_matcher = AspectMatcher(ASPECT_KEYWORDS)
+print(f"  Matching {sum(len(k) for k in ASPECT_KEYWORDS.values())} keywords across {len(ASPECT_KEYWORDS)} aspects...")
 
+aspect_start = time.perf_counter()
+aspect_results = extract_aspect_sentiments(
+    sampledrev['text_clean'].tolist(),
+    aspect_matcher,
+    batch_polarity=get_lexicon_engine().polarity if SENTIMENT_BACKEND == 'lexicon' else None
+)
+aspect_results.index = sampledrev.index
+sampledrev = pd.concat([sampledrev, aspect_results], axis=1)
+aspect_seconds = time.perf_counter() - aspect_start
+
+print(f"  ✓ {len(sampledrev):,} reviews in {aspect_seconds:.1f}s")
+window_cache = WINDOW_POLARITY_CACHE.stats()
+print(f"  ✓ Window polarity cache: {window_cache['hits']:,} hits / {window_cache['misses']:,} misses "
+      f"({window_cache['hit_rate']:.1%} hit rate, {window_cache['entries']:,} windows, {window_cache['evictions']:,} evicted)")
 print("  ✓ Aspect-based sentiment extraction complete")
 print()
 
@@ -14,6 +14,7 @@ Date: 2025-11-06
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.neighbors import NearestNeighbors
@@ -31,6 +32,16 @@ K_NEIGHBORS = 25  # Number of neighbors to find
 MIN_HIGH_DEMAND_NEIGHBORS = 5  # Minimum for high confidence
 RANDOM_SEED = 42
 
+# Filtered search: read high-demand comps from an index over high-demand
+# listings only, topped up to MIN_HIGH_DEMAND_NEIGHBORS in sparse areas
+# (False = query k neighbors, then filter to high-demand)
+FILTERED_SEARCH = True
+
+# Neighbor search backend: 'exact' (ball_tree) or 'ivf' (approximate, NumPy
+# inverted-file index for large pooled comp sets; see ANN_RECALL_REPORT.md)
+SEARCH_BACKEND = 'exact'
+IVF_N_PROBE = 8
+
 # Paths
 DATA_DIR = Path(f'data/{CITY}')
 PROCESSED_DIR = DATA_DIR / 'processed'
@@ -41,10 +52,16 @@ VIZ_DIR = OUTPUT_DIR / 'visualizations'
 # Create directories
 RECO_DIR.mkdir(parents=True, exist_ok=True)
 
+# Shared filtered-search code lives with the app's k-NN index
+sys.path.append(str(Path(__file__).parent.parent / 'app'))
+from utils.knn_index import high_demand_search
+from utils.ann_index import IVFIndex
+
 print("=" * 80)
 print(f"HIGH-DEMAND TWINS k-NN PRICING ENGINE - {CITY.upper()}")
 print("=" * 80)
 print(f"k = {K_NEIGHBORS} neighbors")
+print(f"Search mode: {'filtered (guaranteed-k high-demand comps)' if FILTERED_SEARCH else 'query k, then filter'}")
 print(f"Minimum high-demand neighbors for confidence: {MIN_HIGH_DEMAND_NEIGHBORS}")
 print("=" * 80)
 
@@ -155,20 +172,38 @@ print(f"  ✓ Test shape:  {X_test.shape}")
 # STEP 4: BUILD k-NN MODEL
 # ============================================================================
 
-print(f"\n[4/8] Building k-NN model with k={K_NEIGHBORS}...")
+print(f"\n[4/8] Building k-NN model with k={K_NEIGHBORS} ({SEARCH_BACKEND} search)...")
 
-# Use ball_tree for efficiency with mixed features
-knn_model = NearestNeighbors(
-    n_neighbors=K_NEIGHBORS,
-    algorithm='ball_tree',
-    metric='euclidean',
-    n_jobs=-1  # Use all CPU cores
-)
+def make_knn_model():
+    """Unfitted neighbors model for the configured backend"""
+    if SEARCH_BACKEND == 'ivf':
+        return IVFIndex(n_probe=IVF_N_PROBE, random_state=RANDOM_SEED)
+
+    # Use ball_tree for efficiency with mixed features
+    return NearestNeighbors(
+        n_neighbors=K_NEIGHBORS,
+        algorithm='ball_tree',
+        metric='euclidean',
+        n_jobs=-1  # Use all CPU cores
+    )
+
+knn_model = make_knn_model()
 
 knn_model.fit(X_train)
 
 print(f"  ✓ k-NN model fitted on {len(X_train):,} training listings")
 
+if FILTERED_SEARCH:
+    # Second index over high-demand listings only
+    train_high_demand_df = train_df[train_df['high_demand_90'] == 1]
+    high_demand_positions = np.flatnonzero((train_df['high_demand_90'] == 1).to_numpy())
+    X_train_high_demand = X_train[high_demand_positions]
+
+    knn_high_demand_model = make_knn_model()
+    knn_high_demand_model.fit(X_train_high_demand)
+
+    print(f"  ✓ High-demand k-NN model fitted on {len(X_train_high_demand):,} listings")
+
 # ============================================================================
 # STEP 5: FIND NEIGHBORS FOR TEST SET
 # ============================================================================
@@ -176,11 +211,18 @@ print(f"  ✓ k-NN model fitted on {len(X_train):,} training listings")
 print(f"\n[5/8] Finding {K_NEIGHBORS} nearest neighbors for each test listing...")
 
 # Find neighbors
-distances, indices = knn_model.kneighbors(X_test)
+distances, indices = knn_model.kneighbors(X_test, n_neighbors=K_NEIGHBORS)
 
 print(f"  ✓ Found neighbors for {len(test_df):,} test listings")
 print(f"  ✓ Distance matrix shape: {distances.shape}")
 
+if FILTERED_SEARCH:
+    hd_distances, hd_indices, hd_counts, hd_within = high_demand_search(
+        knn_model, knn_high_demand_model, high_demand_positions, X_test, K_NEIGHBORS, MIN_HIGH_DEMAND_NEIGHBORS
+    )
+    print(f"  ✓ High-demand comps: median {np.median(hd_counts):.0f} per listing, "
+          f"{(hd_within < MIN_HIGH_DEMAND_NEIGHBORS).mean()*100:.1f}% topped up beyond k")
+
 # ============================================================================
 # STEP 6: FILTER TO HIGH-DEMAND NEIGHBORS & COMPUTE PRICE BANDS
 # ============================================================================
@@ -197,12 +239,30 @@ for i, test_idx in enumerate(test_df.index):
     neighbors = train_df.iloc[neighbor_indices].copy()
     neighbors['distance'] = distances[i]
 
-    # Filter to high-demand neighbors
-    high_demand_neighbors = neighbors[neighbors['high_demand_90'] == 1]
+    if FILTERED_SEARCH:
+        # High-demand comps straight from the high-demand index (true distances)
+        count = hd_counts[i]
+        high_demand_neighbors = train_high_demand_df.iloc[hd_indices[i, :count]].copy()
+        high_demand_neighbors['distance'] = hd_distances[i, :count]
+        n_within_k = int(hd_within[i])
+    else:
+        # Filter to high-demand neighbors
+        high_demand_neighbors = neighbors[neighbors['high_demand_90'] == 1]
+        n_within_k = len(high_demand_neighbors)
     n_high_demand = len(high_demand_neighbors)
 
     # Get prices from high-demand neighbors
-    if n_high_demand >= MIN_HIGH_DEMAND_NEIGHBORS:
+    if n_high_demand >= MIN_HIGH_DEMAND_NEIGHBORS and n_within_k < MIN_HIGH_DEMAND_NEIGHBORS:
+        # Sparse area: band from the nearest high-demand listings beyond k
+        neighbor_prices = high_demand_neighbors['price_clean'].values
+
+        price_low = np.percentile(neighbor_prices, 25)
+        price_high = np.percentile(neighbor_prices, 75)
+        price_median = np.median(neighbor_prices)
+
+        confidence = 'expanded'
+
+    elif n_high_demand >= MIN_HIGH_DEMAND_NEIGHBORS:
         # Sufficient high-demand neighbors
         neighbor_prices = high_demand_neighbors['price_clean'].values
 
@@ -263,6 +323,8 @@ for i, test_idx in enumerate(test_df.index):
         'band_width': price_band_width,
         'n_neighbors_total': K_NEIGHBORS,
         'n_neighbors_high_demand': n_high_demand,
+        'n_high_demand_within_k': n_within_k,
+        'avg_comp_distance': high_demand_neighbors['distance'].mean() if n_high_demand > 0 else np.nan,
         'confidence': confidence,
         'is_within_band': is_within_band,
         'price_gap': price_gap,
@@ -333,7 +395,7 @@ fig.suptitle(f'High-Demand Twins k-NN Pricing Engine - {CITY.capitalize()}',
 # Plot 1: Confidence distribution
 ax1 = axes[0, 0]
 conf_counts = reco_df['confidence'].value_counts()
-colors = {'high': 'green', 'medium': 'orange', 'low': 'yellow',
+colors = {'high': 'green', 'medium': 'orange', 'low': 'yellow', 'expanded': 'gold',
           'very_low_fallback': 'red', 'very_low_all_neighbors': 'darkred'}
 bar_colors = [colors.get(c, 'gray') for c in conf_counts.index]
 ax1.bar(range(len(conf_counts)), conf_counts.values, color=bar_colors, edgecolor='black')
@@ -443,7 +505,7 @@ print("=" * 80)
 
 # Show 5 example recommendations (different confidence levels)
 examples = []
-for conf in ['high', 'medium', 'low']:
+for conf in ['high', 'medium', 'low', 'expanded']:
     sample = reco_df[reco_df['confidence'] == conf].sample(n=min(2, len(reco_df[reco_df['confidence'] == conf])))
     examples.append(sample)
 
@@ -454,7 +516,7 @@ for idx, row in example_df.iterrows():
     print(f"  Room Type: {row['room_type']}, Accommodates: {int(row['accommodates'])}, Vibe: {row['vibe_score']:.0f}")
     print(f"  Actual Price: £{row['actual_price']:.2f}")
     print(f"  Recommended Band: £{row['reco_price_low']:.2f} - £{row['reco_price_high']:.2f} (median: £{row['reco_price_median']:.2f})")
-    print(f"  High-Demand Neighbors: {int(row['n_neighbors_high_demand'])} / {K_NEIGHBORS}")
+    print(f"  High-Demand Neighbors: {int(row['n_neighbors_high_demand'])} ({int(row['n_high_demand_within_k'])} within k={K_NEIGHBORS})")
     print(f"  Confidence: {row['confidence']}")
     print(f"  Within Band: {'✓ Yes' if row['is_within_band'] else '✗ No'}")
 
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Build Persistent k-NN Comps Index for the App
+
+Fits the StandardScaler and NearestNeighbors index used by the app's
+"Market Comparison (k-NN)" section once per city and saves them as a
+versioned artifact in data/{city}/models/. The app then only loads the
+artifact and runs a query instead of refitting on every analysis.
+
+Also writes the median price table (by neighbourhood, room type and
+both) that pre-fills the app's price input.
+
+Re-run after regenerating features_{city}_train.parquet.
+
+Author: Vibe-Aware Pricing Team
+Date: 2025-11-20
+"""
+
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CITIES = ['london', 'austin', 'nyc']
+KNN_BACKEND = 'exact'  # 'ivf' = approximate search for large pooled comp sets
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+
+# Shared index code lives with the app so both sides use the same layout
+sys.path.append(str(BASE_DIR / 'app'))
+from utils.knn_index import build_knn_index, save_knn_index, get_knn_index_path, KNN_INDEX_VERSION
+from utils.price_table import build_price_table, save_price_table, get_price_table_path
+
+print("=" * 80)
+print(f"BUILDING k-NN COMPS INDEX (v{KNN_INDEX_VERSION}, {KNN_BACKEND} backend)")
+print("=" * 80)
+
+for city in CITIES:
+    print(f"\n[{city.upper()}]")
+
+    train_file = BASE_DIR / f'data/{city}/processed/features_{city}_train.parquet'
+    if not train_file.exists():
+        print(f"  ⚠ Skipping: {train_file} not found")
+        continue
+
+    train_df = pd.read_parquet(train_file)
+    print(f"  ✓ Train set: {len(train_df):,} listings")
+
+    start = time.perf_counter()
+    index = build_knn_index(train_df, backend=KNN_BACKEND)
+    print(f"  ✓ Fitted index on {len(index['prices']):,} listings x {len(index['features'])} features "
+          f"({time.perf_counter() - start:.2f}s)")
+
+    index_path = get_knn_index_path(city)
+    save_knn_index(index, index_path)
+    print(f"  ✓ Saved {index_path.relative_to(BASE_DIR)}")
+
+    price_table = build_price_table(train_df)
+    n_pairs = sum(len(room_types) for room_types in price_table['pair'].values())
+    print(f"  ✓ Median price table: {len(price_table['neighbourhood'])} neighbourhoods, "
+          f"{len(price_table['room_type'])} room types, {n_pairs} pairs")
+
+    table_path = get_price_table_path(city)
+    save_price_table(price_table, table_path)
+    print(f"  ✓ Saved {table_path.relative_to(BASE_DIR)}")
+
+print("\n" + "=" * 80)
+print("k-NN COMPS INDEX BUILD COMPLETE ✅")
+print("=" * 80)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+ANN Recall vs Latency Report for the k-NN Comps Search
+
+Compares the IVF approximate backend (app/utils/ann_index.py) against the
+exact sklearn search on the app's k-NN feature space. For every city with
+a train/test split, and for a pooled comp set scaled up with jittered
+copies of the training listings (to mimic pooling scrape snapshots),
+reports recall@k and per-query latency across n_probe settings, and
+writes the results to ANN_RECALL_REPORT.md.
+
+Recall counts a returned neighbor as correct when it is no farther than
+the exact k-th neighbor, so duplicate listings at equal distances are not
+penalized.
+
+Author: Vibe-Aware Pricing Team
+Date: 2025-11-21
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CITIES = ['london', 'austin', 'nyc']
+K_NEIGHBORS = 25
+N_QUERIES = 500
+N_PROBES = [1, 2, 4, 8, 16, 32, 64]
+POOLED_ROWS = 500_000  # Size of the scaled-up pooled comp set (0 = skip)
+POOL_JITTER = 0.05  # Std of the noise added to copied rows (scaled units)
+RANDOM_SEED = 42
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+REPORT_FILE = BASE_DIR / 'ANN_RECALL_REPORT.md'
+
+# Shared index code lives with the app so both sides use the same backends
+sys.path.append(str(BASE_DIR / 'app'))
+from utils.knn_index import build_knn_index
+from utils.ann_index import IVFIndex, IVF_LISTS_PER_SQRT_N, IVF_N_PROBE, make_neighbors_model
+
+rng = np.random.default_rng(RANDOM_SEED)
+
+print("=" * 80)
+print("ANN RECALL vs LATENCY REPORT (IVF vs EXACT)")
+print("=" * 80)
+print(f"k = {K_NEIGHBORS}, {N_QUERIES} queries, n_probe in {N_PROBES}")
+
+def evaluate(name, X_pool, X_queries):
+    """Time the exact and IVF searches on one pool and measure recall"""
+    print(f"\n[{name}] pool: {len(X_pool):,} x {X_pool.shape[1]}")
+
+    start = time.perf_counter()
+    exact = make_neighbors_model(X_pool, 'exact')
+    exact_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact_distances, _ = exact.kneighbors(X_queries, n_neighbors=K_NEIGHBORS)
+    exact_us = (time.perf_counter() - start) / len(X_queries) * 1e6
+    kth_distance = exact_distances[:, -1:]
+
+    start = time.perf_counter()
+    ivf = IVFIndex().fit(X_pool)
+    ivf_build = time.perf_counter() - start
+
+    print(f"  ✓ Exact: built in {exact_build:.2f}s, {exact_us:,.0f} µs/query")
+    print(f"  ✓ IVF: {ivf.n_lists_} lists, built in {ivf_build:.2f}s")
+    print(f"    {'n_probe':>8} {'recall@k':>9} {'µs/query':>10} {'speedup':>8}")
+
+    rows = [{
+        'pool': name, 'pool_rows': len(X_pool), 'backend': 'exact', 'n_lists': None, 'n_probe': None,
+        'recall_at_k': 1.0, 'us_per_query': exact_us, 'build_s': exact_build
+    }]
+    for n_probe in N_PROBES:
+        if n_probe > ivf.n_lists_:
+            continue
+
+        start = time.perf_counter()
+        distances, _ = ivf.kneighbors(X_queries, n_neighbors=K_NEIGHBORS, n_probe=n_probe)
+        ivf_us = (time.perf_counter() - start) / len(X_queries) * 1e6
+
+        recall = (distances <= kth_distance * (1 + 1e-9)).mean()
+        print(f"    {n_probe:>8} {recall:>9.4f} {ivf_us:>10,.0f} {exact_us / ivf_us:>7.1f}x")
+
+        rows.append({
+            'pool': name, 'pool_rows': len(X_pool), 'backend': 'ivf', 'n_lists': ivf.n_lists_, 'n_probe': n_probe,
+            'recall_at_k': recall, 'us_per_query': ivf_us, 'build_s': ivf_build
+        })
+
+    return rows
+
+# ============================================================================
+# PER-CITY POOLS
+# ============================================================================
+
+results = []
+pooled_train, pooled_test = [], []
+
+for city in CITIES:
+    train_file = BASE_DIR / f'data/{city}/processed/features_{city}_train.parquet'
+    test_file = BASE_DIR / f'data/{city}/processed/features_{city}_test.parquet'
+    if not train_file.exists() or not test_file.exists():
+        print(f"\n[{city.upper()}] ⚠ Skipping: train/test parquet not found")
+        continue
+
+    # Same scaled feature space as the app's comps index
+    index = build_knn_index(pd.read_parquet(train_file))
+    features = index['features']
+
+    train_df = pd.read_parquet(train_file, columns=features).dropna()
+    test_df = pd.read_parquet(test_file, columns=features).dropna()
+
+    X_train = index['scaler'].transform(train_df.to_numpy(dtype=np.float64))
+    X_test = index['scaler'].transform(test_df.to_numpy(dtype=np.float64))
+    X_queries = X_test[rng.choice(len(X_test), size=min(N_QUERIES, len(X_test)), replace=False)]
+
+    results += evaluate(city.upper(), X_train, X_queries)
+
+    pooled_train.append(X_train)
+    pooled_test.append(X_queries)
+
+# ============================================================================
+# POOLED, SCALED-UP COMP SET
+# ============================================================================
+
+if POOLED_ROWS and pooled_train:
+    X_pool = np.concatenate(pooled_train)
+    n_copies = int(np.ceil(POOLED_ROWS / len(X_pool)))
+    X_pool = np.concatenate([X_pool] + [
+        X_pool + rng.normal(0, POOL_JITTER, size=X_pool.shape) for _ in range(n_copies - 1)
+    ])[:POOLED_ROWS]
+
+    X_queries = np.concatenate(pooled_test)
+    X_queries = X_queries[rng.choice(len(X_queries), size=min(N_QUERIES, len(X_queries)), replace=False)]
+
+    results += evaluate('POOLED', X_pool, X_queries)
+
+# ============================================================================
+# SAVE REPORT
+# ============================================================================
+
+if results:
+    report_df = pd.DataFrame(results)
+
+    lines = [
+        "# ANN Recall vs Latency Report (k-NN Comps Search)",
+        "",
+        f"Generated by `scripts/03c_ann_recall_report.py`: IVF backend (`app/utils/ann_index.py`, "
+        f"~{IVF_LISTS_PER_SQRT_N}*sqrt(n) lists) vs exact sklearn search, k = {K_NEIGHBORS}, "
+        f"{N_QUERIES} held-out test listings per pool, app k-NN feature space (standardized).",
+        "",
+        "Recall@k counts a returned neighbor as correct when it is no farther than the exact k-th neighbor. "
+        f"The POOLED set stacks every city's training listings plus jittered copies (std {POOL_JITTER}) "
+        f"up to {POOLED_ROWS:,} rows to mimic pooled scrape snapshots. Latencies are single-threaded "
+        f"wall time per query on this machine. The IVF default is n_probe = {IVF_N_PROBE}.",
+    ]
+
+    for pool, pool_df in report_df.groupby('pool', sort=False):
+        exact_row = pool_df[pool_df['backend'] == 'exact'].iloc[0]
+        ivf_rows = pool_df[pool_df['backend'] == 'ivf']
+
+        lines += [
+            "",
+            f"## {pool} ({int(exact_row['pool_rows']):,} listings)",
+            "",
+            f"Exact: {exact_row['us_per_query']:,.0f} µs/query (built in {exact_row['build_s']:.2f}s). "
+            f"IVF: {int(ivf_rows['n_lists'].iloc[0])} lists (built in {ivf_rows['build_s'].iloc[0]:.2f}s).",
+            "",
+            "| n_probe | recall@k | µs/query | speedup vs exact |",
+            "|--------:|---------:|---------:|-----------------:|",
+        ]
+        for _, row in ivf_rows.iterrows():
+            lines.append(f"| {int(row['n_probe'])} | {row['recall_at_k']:.4f} | {row['us_per_query']:,.0f} | "
+                         f"{exact_row['us_per_query'] / row['us_per_query']:.1f}x |")
+
+    with open(REPORT_FILE, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"\n  ✓ Saved {REPORT_FILE.relative_to(BASE_DIR)}")
+
+print("\n" + "=" * 80)
+print("ANN RECALL REPORT COMPLETE ✅")
+print("=" * 80)
@@ -25,9 +25,14 @@ import xgboost as xgb
 import lightgbm as lgb
 import pickle
 import json
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Native model export is shared with the app, which loads these files
+sys.path.append(str(Path(__file__).parent.parent / 'app'))
+from utils.model_export import export_xgboost_native, export_ols_arrays, XGBOOST_NATIVE_FILE, OLS_ARRAYS_FILE
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -253,6 +258,10 @@ with open(ols_file, 'wb') as f:
     pickle.dump(ols_model, f)
 print(f"  ✓ Saved {ols_file.name}")
 
+# Coefficient arrays loaded by the app (no pickle / sklearn needed)
+export_ols_arrays(ols_model, MODELS_DIR / OLS_ARRAYS_FILE)
+print(f"  ✓ Saved {OLS_ARRAYS_FILE}")
+
 # ============================================================================
 # STEP 5: STAGE 2 - PREPARE FEATURES FOR OCCUPANCY PREDICTION
 # ============================================================================
@@ -366,6 +375,10 @@ for name, model in models.items():
     with open(model_file, 'wb') as f:
         pickle.dump(model, f)
 
+    # Native booster loaded by the app
+    if name == 'XGBoost':
+        export_xgboost_native(model, MODELS_DIR / XGBOOST_NATIVE_FILE)
+
 print("\n  Training baseline models WITHOUT vibe features:")
 for name, model_class in [('XGBoost', xgb.XGBRegressor), ('LightGBM', lgb.LGBMRegressor), ('RandomForest', RandomForestRegressor)]:
     print(f"    • {name} (baseline)...", end=' ', flush=True)
@@ -629,6 +642,7 @@ if 'vibe_importance_pct' in metrics and metrics['vibe_importance_pct']:
 print("=" * 80)
 print(f"Outputs saved to: {MODELS_DIR}")
 print(f"  • {best_model_name.lower()}_with_vibe.pkl (best model)")
+print(f"  • {XGBOOST_NATIVE_FILE}, {OLS_ARRAYS_FILE} (native exports loaded by the app)")
 print(f"  • model_comparison.csv")
 print(f"  • model_metrics.json")
 print(f"  • feature_importance.csv")
@@ -22,9 +22,14 @@ from sklearn.preprocessing import LabelEncoder
 import xgboost as xgb
 import pickle
 import json
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Native model export is shared with the app, which loads these files
+sys.path.append(str(Path(__file__).parent.parent / 'app'))
+from utils.model_export import export_xgboost_native
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -379,6 +384,10 @@ with open(model_file, 'wb') as f:
     pickle.dump(xgb_monotonic, f)
 print(f"\n  ✓ Saved monotonic model: {model_file.name}")
 
+native_file = MODELS_DIR / 'xgboost_with_vibe_monotonic.ubj'
+export_xgboost_native(xgb_monotonic, native_file)
+print(f"  ✓ Saved native booster: {native_file.name}")
+
 # Save comparison results
 results = {
     'baseline': {
@@ -459,6 +468,7 @@ print()
 if abs(mae_change) < 5 and monotonic_violations < baseline_violations / 2:
     print("✅ SUCCESS: Monotonicity improved with minimal performance cost!")
     print("   Recommended: Replace xgboost_with_vibe.pkl with xgboost_with_vibe_monotonic.pkl")
+    print("   (and xgboost_with_vibe.ubj with xgboost_with_vibe_monotonic.ubj, or re-run 04c)")
 else:
     print("⚠️  Review results before deploying monotonic model")
 print("=" * 80)
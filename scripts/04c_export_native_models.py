@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Export the Active App Models to Native Formats
+
+Converts each city's active pickled models into the files the app loads:
+  - xgboost_with_vibe.pkl -> xgboost_with_vibe.ubj (XGBoost native UBJSON)
+  - ols_price_control.pkl -> ols_price_control.npz (coefficient arrays)
+
+Scripts 04 and 04b write these alongside the pickles; run this after
+swapping the active model by hand (e.g. deploying the monotonic model)
+or to convert models trained before the native exports existed. Checks
+that the exported models predict the same as the pickles.
+
+Author: Vibe-Aware Pricing Team
+Date: 2025-11-22
+"""
+
+import numpy as np
+import pickle
+from pathlib import Path
+import sys
+import warnings
+warnings.filterwarnings('ignore')
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CITIES = ['london', 'austin', 'nyc']
+N_CHECK_ROWS = 1000  # Random rows used to compare predictions
+RANDOM_SEED = 42
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+
+# Export code lives with the app so both sides use the same formats
+sys.path.append(str(BASE_DIR / 'app'))
+from utils.model_export import (
+    XGBOOST_NATIVE_FILE, OLS_ARRAYS_FILE,
+    export_xgboost_native, export_ols_arrays, load_xgboost_native, load_ols_arrays
+)
+
+rng = np.random.default_rng(RANDOM_SEED)
+
+print("=" * 80)
+print("EXPORTING APP MODELS TO NATIVE FORMATS")
+print("=" * 80)
+
+for city in CITIES:
+    print(f"\n[{city.upper()}]")
+    models_dir = BASE_DIR / f'data/{city}/models'
+
+    xgb_file = models_dir / 'xgboost_with_vibe.pkl'
+    ols_file = models_dir / 'ols_price_control.pkl'
+    if not xgb_file.exists() or not ols_file.exists():
+        print(f"  ⚠ Skipping: pickled models not found in {models_dir}")
+        continue
+
+    # XGBoost booster
+    with open(xgb_file, 'rb') as f:
+        xgb_model = pickle.load(f)
+
+    native_file = models_dir / XGBOOST_NATIVE_FILE
+    export_xgboost_native(xgb_model, native_file)
+    booster = load_xgboost_native(native_file)
+
+    X = rng.normal(size=(N_CHECK_ROWS, booster.num_features())).astype(np.float32)
+    max_diff = np.abs(booster.inplace_predict(X) - xgb_model.predict(X)).max()
+    print(f"  ✓ {native_file.name}: {native_file.stat().st_size / 1024:,.0f} KB "
+          f"({xgb_file.stat().st_size / 1024:,.0f} KB pickled), max prediction diff {max_diff:.2e}")
+
+    # OLS coefficients
+    with open(ols_file, 'rb') as f:
+        ols_model = pickle.load(f)
+
+    arrays_file = models_dir / OLS_ARRAYS_FILE
+    export_ols_arrays(ols_model, arrays_file)
+    linear_model = load_ols_arrays(arrays_file)
+
+    X = rng.normal(size=(N_CHECK_ROWS, len(linear_model.coef_)))
+    max_diff = np.abs(linear_model.predict(X) - ols_model.predict(X)).max()
+    print(f"  ✓ {arrays_file.name}: {arrays_file.stat().st_size:,} bytes, max prediction diff {max_diff:.2e}")
+
+print("\n" + "=" * 80)
+print("NATIVE MODEL EXPORT COMPLETE ✅")
+print("=" * 80)
@@ -27,6 +27,8 @@ CITY = 'austin'
 RANDOM_SEED = 42
 SAMPLE_SIZE = 500  # Number of listings to analyze (use 'all' for full test set)
 N_PRICE_POINTS = 50  # Points in price grid
+PRICE_GRID_MODE = 'breakpoints'  # 'linspace' (N_PRICE_POINTS evenly spaced) or 'breakpoints' (exact optimum at XGBoost price split edges)
+PARTIAL_TREE_EVAL = True  # Resolve non-price tree branches once per listing instead of predicting each grid point
 MIN_OCC_THRESHOLD = 0.75  # Minimum occupancy for "safe" price band
 
 # Paths
@@ -39,6 +41,12 @@ TEST_DATA_PATH = DATA_DIR / f'processed/features_{CITY}_test.parquet'
 OUTPUT_DIR = DATA_DIR / 'outputs/recommendations'
 VIZ_DIR = DATA_DIR / 'outputs/visualizations'
 
+# Shared split-breakpoint code lives with the app
+sys.path.append(str(BASE_DIR / 'app'))
+from utils.price_splits import get_split_thresholds, get_price_breakpoints
+from utils.price_sweep import PriceSweepEvaluator
+from utils.feature_layout import FeatureLayout
+
 # Create output directories
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 VIZ_DIR.mkdir(parents=True, exist_ok=True)
@@ -47,7 +55,7 @@ print("=" * 80)
 print("REVENUE OPTIMIZATION ENGINE - LONDON")
 print("=" * 80)
 print(f"Sample size: {SAMPLE_SIZE}")
-print(f"Price grid points: {N_PRICE_POINTS}")
+print(f"Price grid: {PRICE_GRID_MODE}" + (f" ({N_PRICE_POINTS} points)" if PRICE_GRID_MODE == 'linspace' else ""))
 print(f"Minimum occupancy threshold: {MIN_OCC_THRESHOLD}")
 print("=" * 80)
 print()
@@ -66,6 +74,21 @@ except Exception as e:
     print(f"  ✗ Error loading model: {e}")
     sys.exit(1)
 
+if PRICE_GRID_MODE == 'breakpoints':
+    # Only price_clean and price_per_person move in this sweep
+    # (epsilon_price stays at the listing's observed residual)
+    price_split_thresholds = get_split_thresholds(model.get_booster(), ['price_clean', 'price_per_person'])
+    n_thresholds = sum(len(t) for t in price_split_thresholds.values())
+    print(f"  ✓ Extracted {n_thresholds} price split thresholds")
+
+sweep_evaluator = None
+if PARTIAL_TREE_EVAL:
+    try:
+        sweep_evaluator = PriceSweepEvaluator(model.get_booster(), ['price_clean', 'price_per_person'])
+        print(f"  ✓ Partial tree evaluator ready ({len(sweep_evaluator.roots)} trees)")
+    except Exception as e:
+        print(f"  ⚠ Partial tree evaluation unavailable, predicting each grid point: {e}")
+
 try:
     with open(OLS_MODEL_PATH, 'rb') as f:
         ols_model = pickle.load(f)
@@ -138,19 +161,34 @@ print()
 
 print("[3/7] Defining revenue optimization functions...")
 
-def create_price_grid(current_price, n_points=N_PRICE_POINTS):
+def create_price_grid(current_price, accommodates, n_points=N_PRICE_POINTS, mode=PRICE_GRID_MODE):
     """
     Create price grid from 0.5x to 2.0x current price
 
+    In 'breakpoints' mode the grid holds only the prices just below each
+    XGBoost price split (plus the range ends and current price). Occupancy
+    is flat between splits, so the revenue maximum is always one of them.
+
     Args:
         current_price: Current nightly price
-        n_points: Number of points in grid
+        accommodates: Guest capacity (maps price_per_person splits to price)
+        n_points: Number of points in grid ('linspace' mode)
+        mode: 'linspace' or 'breakpoints'
 
     Returns:
         numpy array of prices
     """
     min_price = current_price * 0.5
     max_price = current_price * 2.0
+
+    if mode == 'breakpoints':
+        price_transforms = {
+            'price_clean': (1.0, 0.0),
+            'price_per_person': (1.0 / accommodates if accommodates > 0 else 1.0, 0.0)
+        }
+        edges = get_price_breakpoints(price_split_thresholds, price_transforms, min_price, max_price)
+        return np.unique(np.append(edges, current_price))
+
     return np.linspace(min_price, max_price, n_points)
 
 
@@ -170,36 +208,36 @@ def generate_revenue_curve(model, listing_row, feature_columns, n_points=N_PRICE
     current_price = listing_row['price_clean']
     accommodates = listing_row['accommodates']
 
-    price_grid = create_price_grid(current_price, n_points)
-    results = []
+    price_grid = create_price_grid(current_price, accommodates, n_points)
+    price_per_person = price_grid / accommodates if accommodates > 0 else price_grid
 
-    # Prepare feature vector (need to match training features)
-    for price in price_grid:
-        # Create a copy of the listing features
-        features = listing_row[feature_columns].copy()
+    # Listing features in model column order (read once, not per grid point)
+    row = listing_row[feature_columns].to_numpy(dtype=np.float32)
 
-        # Update price-related features
-        features['price_clean'] = price
-        features['price_per_person'] = price / accommodates if accommodates > 0 else price
+    if sweep_evaluator is not None:
+        # Non-price branches are resolved once; only price splits vary across the grid
+        predicted_occ = sweep_evaluator.sweep(row, np.column_stack([price_grid, price_per_person]))
+    else:
+        # Write the whole grid into one float32 buffer and predict in a single call
+        X = feature_layout.tile(row, len(price_grid))
+        for name, values in [('price_clean', price_grid), ('price_per_person', price_per_person)]:
+            if name in feature_layout.index:
+                X[:, feature_layout.index[name]] = values
 
-        # Predict occupancy
         try:
-            predicted_occ = model.predict([features])[0]
-            predicted_occ = np.clip(predicted_occ, 0, 1)  # Ensure [0, 1] range
+            predicted_occ = model.predict(X)
         except Exception as e:
             print(f"    ⚠ Prediction error for listing {listing_row['id']}: {e}")
-            predicted_occ = 0
+            predicted_occ = np.zeros(len(price_grid))
 
-        # Calculate monthly revenue (30 days)
-        monthly_revenue = price * predicted_occ * 30
+    predicted_occ = np.clip(predicted_occ, 0, 1)  # Ensure [0, 1] range
 
-        results.append({
-            'price': price,
-            'predicted_occ_90': predicted_occ,
-            'monthly_revenue': monthly_revenue
-        })
-
-    return pd.DataFrame(results)
+    # Calculate monthly revenue (30 days)
+    return pd.DataFrame({
+        'price': price_grid,
+        'predicted_occ_90': predicted_occ,
+        'monthly_revenue': price_grid * predicted_occ * 30
+    })
 
 
 def optimize_price(revenue_curve, current_price, min_occ=MIN_OCC_THRESHOLD):
@@ -282,6 +320,8 @@ except Exception as e:
     # Remove target and ID columns
     feature_names = [f for f in feature_names if f not in ['id', 'occ_90', 'high_demand_90', 'price_clean', 'price_per_person']]
 
+feature_layout = FeatureLayout(feature_names)
+
 print()
 
 # ============================================================================